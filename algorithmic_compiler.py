@@ -1,20 +1,26 @@
 """
 Uses the Compiler class to compile the project into Algorithmic code.
 """
-from compiler import Compiler
+from compiler import Compiler, CompileOptions
+from diagnostics import DiagnosticsCollector
+from emitter import Emitter
 
 
 class AlgorithmicCompiler(Compiler):
-	def __init__(self, instruction_names:dict, var_types:dict, other_instructions:list, stdscr, translations, translate_method, app, tab_char:str="\t"):
-		super().__init__(instruction_names, var_types, other_instructions, stdscr, translations, translate_method, tab_char)
+	dedented_instructions = ("else", "elif", "fx_start", "vars")
+	unit_list_attributes = ("fxtext", "fxtext_sources")
+	unit_line_attributes = ("fxtext_sources",)
+
+	def __init__(self, instruction_names:dict, var_types:dict, other_instructions:list, options:CompileOptions=None,
+	             translations:dict=None, diagnostics:DiagnosticsCollector=None):
+		super().__init__(instruction_names, var_types, other_instructions, options, translations, diagnostics)
 		self.fxtext = []
-		self.app = app
-		self.use_ptrs_and_malloc = self.app.use_ptrs_and_malloc
+		self.fxtext_sources = []  # The source line of each line of fxtext
 
 
 	def prepare_new_compilation(self):
 		self.fxtext.clear()
-		self.use_ptrs_and_malloc = self.app.use_ptrs_and_malloc
+		self.fxtext_sources.clear()
 
 
 	def analyze_const(self, instruction_name:str, instruction_params:list, line_number:int):
@@ -26,10 +32,10 @@ class AlgorithmicCompiler(Compiler):
 		""" Noms, séparés, par, des, virgules : Type(s) """
 		# Finding the type of the variable
 		if instruction[0][-1] == "*":
-			if self.use_ptrs_and_malloc:
+			if self.options.use_ptrs_and_malloc:
 				var_type = f"Pointeur sur {self.var_types[instruction[0][:-1]]}"
 			else:
-				return self.error(f"Error line {line_number + 1} : Use of pointers was disabled.")
+				return self.error(f"Error line {line_number + 1} : Use of pointers was disabled.", line_number, "pointers_disabled")
 		else:
 			var_type = self.var_types[instruction[0]]
 
@@ -79,6 +85,7 @@ class AlgorithmicCompiler(Compiler):
 			self.instructions_list[line_number] = f"Fin {self.instruction_names[last_elem]}"
 			if last_elem in ("fx", "proc"):
 				self.fxtext.append(self.instructions_list[line_number] + "\n" * 2)
+				self.fxtext_sources.append(line_number)
 				self.instructions_list[line_number] = ""
 
 
@@ -117,10 +124,10 @@ class AlgorithmicCompiler(Compiler):
 	def analyze_case(self, instruction_name:str, instruction_params:list, line_number:int):
 		""" Cas element """
 		# If there is no switch in the instruction stack, we error out to the user
-		if "switch" not in self.instructions_stack:
-			self.error(self.translate_method("compiler", "cpp", "errors", "case_outside_switch").format(
+		if self.instructions_stack.depth("switch") == 0:
+			self.error(self.translate_method("compilers", "cpp", "errors", "case_outside_switch").format(
 				line_number=line_number + 1
-			))
+			), line_number, "case_outside_switch")
 
 		# If there is no error, we continue
 		else:
@@ -131,10 +138,10 @@ class AlgorithmicCompiler(Compiler):
 	def analyze_default(self, instruction_name:str, instruction_params:list, line_number:int):
 		""" Autrement : """
 		# If there is no switch in the instruction stack, we error out to the user
-		if "switch" not in self.instructions_stack:
-			self.error(self.translate_method("compiler", "cpp", "errors", "default_outside_switch").format(
+		if self.instructions_stack.depth("switch") == 0:
+			self.error(self.translate_method("compilers", "cpp", "errors", "default_outside_switch").format(
 				line_number=line_number + 1
-			))
+			), line_number, "default_outside_switch")
 
 		# If there is no error, we continue
 		else:
@@ -180,16 +187,16 @@ class AlgorithmicCompiler(Compiler):
 	def analyze_return(self, instruction_name:str, instruction_params:list, line_number:int):
 		""" Retourner elements """
 		# Checks we're not in a procedure
-		if "proc" in self.instructions_stack:
-			self.error(self.translate_method("compiler", "cpp", "errors", "return_in_procedure").format(
+		if self.instructions_stack.depth("proc") != 0:
+			self.error(self.translate_method("compilers", "cpp", "errors", "return_in_procedure").format(
 				line_number=line_number + 1
-			))
+			), line_number, "return_in_procedure")
 
 		# Checks we're inside a function
-		elif "fx" not in self.instructions_stack:
-			self.error(self.translate_method("compiler", "cpp", "errors", "return_outside_function").format(
+		elif self.instructions_stack.depth("fx") == 0:
+			self.error(self.translate_method("compilers", "cpp", "errors", "return_outside_function").format(
 				line_number=line_number + 1
-			))
+			), line_number, "return_outside_function")
 
 		# Writes the line correctly
 		else:
@@ -228,15 +235,15 @@ class AlgorithmicCompiler(Compiler):
 
 		# If the statement does not have all its parameters set
 		except IndexError:
-			self.error(self.translate_method("compiler", "cpp", "errors", "arr_missing_params").format(
+			self.error(self.translate_method("compilers", "cpp", "errors", "arr_missing_params").format(
 				line_number=line_number + 1
-			))
+			), line_number, "arr_missing_params")
 
 		# If the variable type doesn't exist
 		except KeyError:
-			self.error(self.translate_method("compiler", "cpp", "errors", "unrecognized_var_type").format(
+			self.error(self.translate_method("compilers", "cpp", "errors", "unrecognized_var_type").format(
 				line_number=line_number + 1, type=instruction_params[0]
-			))
+			), line_number, "unrecognized_var_type")
 
 
 	def analyze_fx(self, instruction_name:str, instruction_params:list, line_number:int):
@@ -245,52 +252,58 @@ class AlgorithmicCompiler(Compiler):
 		while instruction_params[-1] == "": instruction_params.pop()
 
 		# Function to handle the parameters, whether they are arrays or standard variables
-		def handle_params(instruction_params):
+		def handle_params():
 			# The list of parameters
 			params = []
 
-			# Fetches each parameter (going two by two, because each param goes <type> <name>)
-			for i in range(2, len(instruction_params), 2):
+			# Fetches each parameter, already parsed into its type and name
+			for param in self.syntax_tree[line_number].parameters:
+				# A parameter without a name is ignored
+				if param.name is None:
+					continue
+
 				# Adds the parameter to the list of parameters
-				params.append(f"{instruction_params[i + 1]} : ")
+				param_text = f"{param.name} : "
 
-				# Try block in case there is an IndexError
-				try:
-					# Pointers
-					if self.use_ptrs_and_malloc and instruction_params[i][-1] == '*':
-						params[-1] += "Pointeur sur "
-						instruction_params[i] = instruction_params[i][:-1]
+				# Pointers can only be used if enabled
+				if param.is_pointer:
+					if not self.options.use_ptrs_and_malloc:
+						self.unrecognized_var_type(param.type, line_number)
+						return ""
+					param_text += "Pointeur sur "
 
-					# Constants
-					if instruction_params[i].startswith("const_"):
-						params[-1] += "Constante "
-						instruction_params[i] = instruction_params[i][6:]
+				# Constants
+				if param.is_const:
+					param_text += "Constante "
 
+				# Try block in case the type is unknown
+				try:
 					# If the param is an array, we parse it correctly
-					if instruction_params[i].startswith("arr"):
-						params[-1] += f"Tableau[{']['.join(instruction_params[i].split('_')[2:])}] de " \
-						              f"{self.var_types[instruction_params[i].split('_')[1]]}s"
+					if param.is_array:
+						param_text += f"Tableau[{']['.join(param.array_dims)}] de {self.var_types[param.array_type]}s"
 
 					# If the param is a structure, we parse it correctly
-					elif instruction_params[i].startswith("struct_"):
-						params[-1] += f"Structure {instruction_params[i][7:]}"
+					elif param.struct_name is not None:
+						param_text += f"Structure {param.struct_name}"
 
 					# If the param is NOT an array nor a structure
 					else:
-						# We add it to the params as the type, followed by the name, of whose we remove the
-						# first char if it is '&' (no datar mode in algorithmic)
-						params[-1] += self.var_types[instruction_params[i]][instruction_params[i][0] == '&':]
+						param_text += self.var_types[param.base_type]
+
+				# If the type is unknown, we error out
+				except KeyError:
+					self.unrecognized_var_type(param.type, line_number)
+					return ""
 
-				# If an IndexError is encountered, we remove the last param from the params list and continue
-				except IndexError:
-					params.pop()
+				params.append(param_text)
 
 			# We merge back the params and return them
 			params = ", ".join(params)
 			return params
 
 		# Getting the parameters string
-		params = handle_params(instruction_params)
+		params = handle_params()
+		if self.errored: return None
 
 		# Branching on whether it is a procedure or a function
 		if instruction_params[0] != "void":
@@ -299,7 +312,7 @@ class AlgorithmicCompiler(Compiler):
 			self.instructions_list[line_number] = f"Fonction {instruction_params[1]} ({params}) : "
 
 			# Pointers
-			if self.use_ptrs_and_malloc and instruction_params[0][-1] == '*':
+			if self.options.use_ptrs_and_malloc and instruction_params[0][-1] == '*':
 				self.instructions_list[line_number] += "Pointeur sur "
 				instruction_params[0] = instruction_params[0][:-1]
 
@@ -319,9 +332,9 @@ class AlgorithmicCompiler(Compiler):
 				try:
 					self.instructions_list[line_number] += f"Tableau de {self.var_types[instruction_params[0][0]]}"
 					for e in instruction_params[0][1:]:
-						self.instructions_list += f"[{e}]"
+						self.instructions_list[line_number] += f"[{e}]"
 				except KeyError:
-					self.error(f"Error on line {line_number + 1} : Var type '{instruction_params[0][0]}' unknown.")
+					self.error(f"Error on line {line_number + 1} : Var type '{instruction_params[0][0]}' unknown.", line_number, "unrecognized_var_type")
 
 			# If the return type is not a structure
 			else:
@@ -329,7 +342,7 @@ class AlgorithmicCompiler(Compiler):
 				try:
 					self.instructions_list[line_number] += self.var_types[instruction_params[0]]
 				except KeyError:
-					self.error(f"Error on line {line_number + 1} : Var type '{instruction_params[0]}' unknown.")
+					self.error(f"Error on line {line_number + 1} : Var type '{instruction_params[0]}' unknown.", line_number, "unrecognized_var_type")
 
 		else:  # Procedure
 			self.instructions_stack.append("proc")
@@ -338,62 +351,64 @@ class AlgorithmicCompiler(Compiler):
 
 
 	def analyze_struct(self, instruction_name:str, instruction_params:list, line_number:int):
-		""" Creates a function definition """
+		""" Creates a structure definition """
 		# Prevents a crash when extra spaces are at the end of the line
 		while instruction_params[-1] == "": instruction_params.pop()
 
 		# Function to handle the parameters, whether they are arrays or standard variables
-		def handle_params(instruction_params):
+		def handle_params():
 			# The list of parameters
 			params = []
 
-			# Fetches each parameter (going two by two, because each param goes <type> <name>)
-			for i in range(1, len(instruction_params), 2):
-				# Adds the parameter to the list of parameters
-				try:
-					params.append(f"{instruction_params[i + 1]} : ")
-				except IndexError:
-					self.error(self.translate_method("compiler", "algo", "errors", "structure_def_unnamed_param").format(
+			# Fetches each field, already parsed into its type and name
+			for param in self.syntax_tree[line_number].parameters:
+				# Every field needs a name
+				if param.name is None:
+					self.error(self.translate_method("compilers", "algo", "errors", "structure_def_unnamed_param").format(
 						line_number=line_number + 1
-					))
+					), line_number, "structure_def_unnamed_param")
 					return []
 
-				# Try block in case there is an IndexError
-				try:
-					# If the param is an array, we parse it correctly
-					if instruction_params[i].startswith("arr"):
-						try:
-							vtype = self.var_types[instruction_params[i].split('_')[1]]
-						except KeyError:
-							vtype = instruction_params[i].split('_')[1]
-						params[-1] += f"Tableau[{']['.join(instruction_params[i].split('_')[2:])}] de " \
-						              f"{vtype}s"
-
-					# If the param is a structure, we parse it correctly
-					elif instruction_params[i].startswith("struct_"):
-						params[-1] += f"Structure {instruction_params[i][7:]}"
+				# If the param is an array, we parse it correctly
+				if param.is_array:
+					vtype = self.var_types.get(param.array_type, param.array_type)
+					params.append(f"{param.name} : Tableau[{']['.join(param.array_dims)}] de {vtype}s")
 
-					# If the param is NOT an array
-					else:
-						# We add it to the params as the type, followed by the name, of whose we remove the
-						# first char if it is '&' (no datar mode in algorithmic)
-						params[-1] += self.var_types[instruction_params[i]][instruction_params[i][0] == '&':]
+				# If the param is a structure, we parse it correctly
+				elif param.struct_name is not None:
+					params.append(f"{param.name} : Structure {param.struct_name}")
 
-				# If an IndexError is encountered, we remove the last param from the params list and continue
-				except IndexError:
-					params.pop()
+				# If the param is NOT an array
+				else:
+					try:
+						params.append(f"{param.name} : {self.var_types[param.type]}")
+					except KeyError:
+						self.unrecognized_var_type(param.type, line_number)
+						return []
 
 			# We return the params
 			return params
 
 		# Getting the parameters string
-		params = handle_params(instruction_params)
+		params = handle_params()
+		if self.errored: return None
 
 		# We write the line as a structure
-		self.instructions_list[line_number] = f"Structure {instruction_params[0]}\n"
-		for param in params:
-			self.instructions_list[line_number] += self.tab_char * (len(self.instructions_stack) + 2) + param + "\n"
-		self.instructions_list[line_number] += self.tab_char * (len(self.instructions_stack) + 1) + "Fin Structure"
+		param_indentation = self.tab_char * (len(self.instructions_stack) + 2)
+		self.instructions_list[line_number] = "".join((
+			f"Structure {instruction_params[0]}\n",
+			*(param_indentation + param + "\n" for param in params),
+			self.tab_char * (len(self.instructions_stack) + 1) + "Fin Structure"
+		))
+
+
+	def unrecognized_var_type(self, var_type:str, line_number:int):
+		""" Errors out because of an unknown variable type. """
+		# Points at the word of the line containing the type
+		column = next((token.column for token in self.syntax_tree[line_number].tokens if var_type and var_type in token), None)
+		self.error(self.translate_method("compilers", "cpp", "errors", "unrecognized_var_type").format(
+			line_number=line_number + 1, type=var_type
+		), line_number, "unrecognized_var_type", column)
 
 
 	def analyze_CODE_RETOUR(self, instruction_name:str, instruction_params:list, line_number:int):
@@ -404,39 +419,41 @@ class AlgorithmicCompiler(Compiler):
 	def analyze_init(self, instruction_name:str, instruction_params:list, line_number:int):
 		""" Analyzes the structure initialization. """
 		if len(instruction_params) < 2:  # Error for missing parameters
-			self.error(self.translate_method("compiler", "algo", "errors", "struct_missing_args").format(
-				line_number=line_number + 1
-			))
+			self.error(self.translate_method("compilers", "cpp", "errors", "struct_missing_args").format(
+				line_number=line_number + 1, param_amount=len(instruction_params)
+			), line_number, "struct_missing_args")
 		elif len(instruction_params) % 2 == 1:  # Error for missing parameters
-			self.error(self.translate_method("compiler", "algo", "errors", "struct_args_not_even").format(
-				line_number=line_number + 1
-			))
+			self.error(self.translate_method("compilers", "cpp", "errors", "struct_args_not_even").format(
+				line_number=line_number + 1, param_amount=len(instruction_params)
+			), line_number, "struct_args_not_even")
 		else:
-			# Creates the structure initialization
-			self.instructions_list[line_number] = f"{instruction_params[1]} : Structure {instruction_params[0]}"
-
-			# Then for each extra couple of arguments, adds a initialization to this line
-			for i in range(2, len(instruction_params), 2):
-				self.instructions_list[line_number] += "\n" + self.tab_char * (len(self.instructions_stack) + 1)
-				self.instructions_list[line_number] += f"{instruction_params[1]}.{instruction_params[i]} <- {instruction_params[i + 1]}"
+			# Creates the structure initialization, followed by an initialization for each extra couple of arguments
+			indentation = "\n" + self.tab_char * (len(self.instructions_stack) + 1)
+			self.instructions_list[line_number] = indentation.join((
+				f"{instruction_params[1]} : Structure {instruction_params[0]}",
+				*(
+					f"{instruction_params[1]}.{instruction_params[i]} <- {instruction_params[i + 1]}"
+					for i in range(2, len(instruction_params), 2)
+				)
+			))
 
 
 	def analyze_delete(self, instruction_name:str, instruction_params:list, line_number:int):
 		""" Delete keyword. Syntax : delete <var> or delete arr <var>. """
-		if self.use_ptrs_and_malloc:
+		if self.options.use_ptrs_and_malloc:
 			if len(instruction_params) != 0 and instruction_params[0] == "arr":
 				if len(instruction_params) == 2:
 					self.instructions_list[line_number] = f"Libérer tableau {instruction_params[1]}"
 				else:
-					self.error(f"Error on line {line_number + 1} : Missing parameter 'var_name'.")
+					self.error(f"Error on line {line_number + 1} : Missing parameter 'var_name'.", line_number, "delete_missing_var_name")
 			else:
 				if len(instruction_params) != 0:
 					self.instructions_list[line_number] = f"Libérer {instruction_params[0]}"
 				else:
-					self.error(f"Error on line {line_number+1} : Missing parameter 'var_name'.")
+					self.error(f"Error on line {line_number+1} : Missing parameter 'var_name'.", line_number, "delete_missing_var_name")
 		else:
 			self.error(f"Error on line {line_number+1} : Unknown keyword 'delete'. "
-			            "Maybe you forgot to enable the use of pointers and malloc ?")
+			            "Maybe you forgot to enable the use of pointers and malloc ?", line_number, "unknown_delete")
 
 
 	def var_assignation(self, instruction:list, line_number:int):
@@ -449,7 +466,7 @@ class AlgorithmicCompiler(Compiler):
 		# Assigns the value to the variable
 		instruction[1] = "<-"
 		# If pointers are enabled and the user gets the address of the variable
-		if self.use_ptrs_and_malloc:
+		if self.options.use_ptrs_and_malloc:
 			if instruction[2][0] == "&":
 				instruction[2] = "Adresse mémoire de " + instruction[2][1:]
 			# NEW keyword
@@ -468,7 +485,7 @@ class AlgorithmicCompiler(Compiler):
 					except KeyError:
 						pass
 				else:
-					self.error(f"Error on line {line_number+1} : Cannot allocate nothing.")
+					self.error(f"Error on line {line_number+1} : Cannot allocate nothing.", line_number, "malloc_nothing")
 		self.instructions_list[line_number] = " ".join(instruction)
 
 	def final_trim(self, instruction_name:str, line_number:int):
@@ -479,14 +496,14 @@ class AlgorithmicCompiler(Compiler):
 		# Adds the correct tabbing (amount of tabs is equal to amount of instructions in the instructions stack,
 		# minus one if the current instruction is in the instruction names)
 		tab_amount = len(self.instructions_stack)
-		if instruction_name in (*self.instruction_names.keys(), "else", "elif", "fx_start", "vars"):
+		if instruction_name in self.dedented_instruction_names:
 			tab_amount -= 1
 		if len(self.instructions_stack) != 0 and (
-			"fx" in self.instructions_stack or
-			"proc" in self.instructions_stack or
+			self.instructions_stack.inside("fx", "proc") or
 			(instruction_name == "end" and self.instructions_stack[-1] in ("fx", "proc"))
 		):
 			self.fxtext.append(self.tab_char * tab_amount + self.instructions_list[line_number])
+			self.fxtext_sources.append(line_number)
 			if instruction_name == "end":
 				self.fxtext[-1] += "\n"
 			self.instructions_list[line_number] = ""
@@ -494,11 +511,14 @@ class AlgorithmicCompiler(Compiler):
 			self.instructions_list[line_number] = self.tab_char * tab_amount + self.instructions_list[line_number]
 
 
-	def final_touches(self):
-		""" Concatenates everything into one string """
+	def final_touches(self, emitter:Emitter):
+		""" Writes everything into the emitter """
 		# Adds the function text
-		final_text = "".join(instruction + "\n" for instruction in self.fxtext)
-		# Adds the main
-		final_text += "Début\n"
-		final_text += "".join(self.tab_char + instruction + "\n" for instruction in self.instructions_list if instruction != "")
-		return final_text + "Fin"
+		for instruction, source_line in zip(self.fxtext, self.fxtext_sources):
+			emitter.write(instruction + "\n", source_line)
+		# Adds the main, each line of which comes from the source line at the same index
+		emitter.write("Début\n")
+		for source_line, instruction in enumerate(self.instructions_list):
+			if instruction != "":
+				emitter.write(self.tab_char + instruction + "\n", source_line)
+		emitter.write("Fin")
@@ -0,0 +1,180 @@
+"""
+Contains the BackgroundCompiler class, which compiles the code of the editor on a worker thread while the user types.
+A compilation is only started once the edits have settled for a short delay, and a compilation whose code was edited
+again in the meantime is cancelled, so that the worker only ever spends time on the latest code. The last result is
+kept, so that the explicit compile commands can show it right away if the code did not change since.
+"""
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Union
+
+from compiler import CompilationCancelled, Compiler, CompileOptions
+from diagnostics import Diagnostic, DiagnosticsCollector
+from source_map import SourceMap
+from syntax_tree import SyntaxTree, parse_program
+
+
+class CompilationResult(NamedTuple):
+	"""
+	The result of a background compilation, by name of compiler.
+	"""
+	source: str  # The compiled source code
+	options: CompileOptions  # The options it was compiled with
+	compiled_codes: Dict[str, Optional[str]]  # The compiled code, or None if an error occurred
+	diagnostics: Dict[str, DiagnosticsCollector]  # The errors of the compilation
+	source_maps: Dict[str, Optional[SourceMap]]  # The map of the compiled lines to the source lines
+	instructions_lists: Dict[str, list]  # The compiled lines, as left in the compiler's instructions_list
+	duration: float  # The time taken by the whole compilation, in seconds
+
+
+class BackgroundCompiler:
+	def __init__(self, compilers: Dict[str, Compiler], lock: threading.Lock, delay: float = 0.3):
+		"""
+		Creates a new background compiler ; it has to be started with start().
+		:param compilers: The compilers to run, by name. They are shared with the editor, so that the code they
+			compiled in the background is reused by its compilations.
+		:param lock: The lock held while the compilers are running ; anyone else running them has to hold it too.
+		:param delay: How long the code has to stay unchanged before it is compiled, in seconds.
+		"""
+		self.compilers = compilers
+		self.lock = lock
+		self.delay = delay
+		self.result: Optional[CompilationResult] = None  # The result of the last completed compilation
+
+		self._condition = threading.Condition()  # Wakes the worker up when a compilation is requested or it is stopped
+		self._pending: Optional[tuple] = None  # The (source or function returning it, options) waiting to be compiled
+		self._requested: Optional[tuple] = None  # The (source or function returning it, options) of the last request
+		self._request_time = 0.  # When the last request was made, as given by time.monotonic()
+		self._generation = 0  # Increased with each request, so that the compilations of an outdated code can stop
+		self._running = False  # Whether a compilation is running
+		self._stopped = False
+		self._syntax_tree: Optional[SyntaxTree] = None  # The last parsed code, so that only the changed lines are parsed
+		self._thread = threading.Thread(target=self._run, name="background-compiler", daemon=True)
+
+
+	def start(self):
+		"""
+		Starts the worker thread.
+		"""
+		self._thread.start()
+
+
+	def stop(self):
+		"""
+		Stops the worker thread, cancelling the running compilation if any.
+		"""
+		with self._condition:
+			self._stopped = True
+			self._generation += 1
+			self._condition.notify()
+
+
+	def request(self, source: Union[str, Callable[[], str]], options: CompileOptions):
+		"""
+		Asks for the given code to be compiled once it stays unchanged for the delay. Nothing happens if it is the
+		code of the last request.
+		:param source: The source code, or a function returning it, e.g. TextBuffer.snapshot(). The function is only
+			called by the worker once the delay expired, so that the editor does not build the whole text on each edit.
+		:param options: The options of the compilation.
+		"""
+		with self._condition:
+			if self._requested is not None and (self._requested[0] is source or self._requested[0] == source) and \
+					self._requested[1] == options:
+				return None
+			self._requested = self._pending = (source, options)
+			self._request_time = time.monotonic()
+			self._generation += 1
+			self._condition.notify()
+
+
+	@property
+	def busy(self) -> bool:
+		"""
+		Whether a compilation is waiting for the delay or running, i.e. whether the result is about to change.
+		"""
+		with self._condition:
+			return self._pending is not None or self._running
+
+
+	def get_result(self, source: str, options: CompileOptions) -> Optional[CompilationResult]:
+		"""
+		Returns the result of the last completed compilation if it compiled the given code with the given options,
+		None otherwise.
+		"""
+		result = self.result
+		if result is not None and (result.source is source or result.source == source) and result.options == options:
+			return result
+		return None
+
+
+	def _run(self):
+		"""
+		The loop of the worker thread : waits for the edits to settle, then compiles the latest code.
+		"""
+		while True:
+			with self._condition:
+				# Waits for a request
+				while self._pending is None and not self._stopped:
+					self._condition.wait()
+				if self._stopped:
+					return None
+
+				# Waits until the code stayed unchanged for the delay, starting over if it changes in the meantime
+				remaining_time = self._request_time + self.delay - time.monotonic()
+				if remaining_time > 0:
+					self._condition.wait(remaining_time)
+					continue
+
+				(source, options), generation = self._pending, self._generation
+				self._pending = None
+				self._running = True
+
+			try:
+				# Builds the text now that the edits settled, outside of the editor's thread
+				if callable(source):
+					source = source()
+				result = self._compile(source, options, generation)
+			finally:
+				with self._condition:
+					self._running = False
+
+			# Only keeps the result if the code was not edited during the compilation
+			with self._condition:
+				if result is not None and generation == self._generation:
+					self.result = result
+
+
+	def _compile(self, source: str, options: CompileOptions, generation: int) -> Optional[CompilationResult]:
+		"""
+		Compiles the code with each compiler.
+		:param source: The source code.
+		:param options: The options of the compilation.
+		:param generation: The generation of the request ; the compilation is cancelled as soon as it is outdated.
+		:return: The result, or None if the compilation was cancelled.
+		"""
+		start_time = time.perf_counter()
+		self._syntax_tree = parse_program(source, self._syntax_tree)
+
+		compiled_codes, diagnostics, source_maps, instructions_lists = {}, {}, {}, {}
+		with self.lock:
+			for compiler_name, compiler in self.compilers.items():
+				compiler.should_cancel = lambda: self._generation != generation
+				try:
+					compiled_codes[compiler_name] = compiler.compile(self._syntax_tree, options)
+					diagnostics[compiler_name] = compiler.diagnostics.copy()
+				except CompilationCancelled:
+					return None
+				# A failing compiler (e.g. because of a plugin's instruction) must not stop the worker
+				except Exception as e:
+					compiled_codes[compiler_name] = None
+					diagnostics[compiler_name] = DiagnosticsCollector()
+					diagnostics[compiler_name].report(Diagnostic(f"{type(e).__name__} {e}", code="exception"))
+				finally:
+					compiler.should_cancel = None
+				source_maps[compiler_name] = compiler.source_map if compiled_codes[compiler_name] is not None else None
+				instructions_lists[compiler_name] = compiler.instructions_list
+
+		return CompilationResult(
+			source, options, compiled_codes, diagnostics, source_maps, instructions_lists,
+			time.perf_counter() - start_time
+		)
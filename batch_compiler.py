@@ -0,0 +1,186 @@
+"""
+Compiles many files at once, without the editor nor a terminal.
+Usage : python -m batch_compiler [options] <files or directories...>
+Each '.algo' file is compiled to Algorithmic French ('.txt') and/or C++ ('.cpp'), next to the file or into an output
+directory. The compilers are sent to a pool of processes the files are spread across, and the time and errors of
+each file are reported.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from compile_cache import CompileCache
+from compiler import Compiler, CompileOptions
+from compiler_factory import create_compilers, load_translations
+
+SOURCE_EXTENSION = ".algo"  # The extension of the files searched for in the given directories
+OUTPUT_EXTENSIONS = {"algorithmic": ".txt", "C++": ".cpp"}  # The extension of the compiled files, by compiler
+
+
+# The compilers of the current worker process, given by _init_worker
+_worker_compilers: Dict[str, Compiler] = {}
+
+
+def _init_worker(compilers: Dict[str, Compiler], cache_directory: Optional[str]):
+	"""
+	Receives the compilers of a worker process.
+	:param compilers: The compilers to use, by name.
+	:param cache_directory: The directory of the compilation cache shared by the workers, or None for no cache.
+	"""
+	global _worker_compilers
+	_worker_compilers = compilers
+	if cache_directory is not None:
+		cache = CompileCache(directory=cache_directory)
+		for compiler in _worker_compilers.values():
+			compiler.cache = cache
+
+
+def compile_file(source_path: str, output_paths: Dict[str, str]) -> Tuple[str, Dict[str, float], List[str]]:
+	"""
+	Compiles a file with the compilers of the current worker process, and writes the compiled code.
+	:param source_path: The path of the file to compile.
+	:param output_paths: The path of the compiled file, by name of the compiler to use.
+	:return: A tuple (source path, compilation time in seconds by compiler, error messages).
+	"""
+	timings = {}
+	errors = []
+	try:
+		with open(source_path, "r", encoding="utf-8") as f:
+			source = f.read()
+	except (OSError, UnicodeDecodeError) as e:
+		return source_path, timings, [str(e)]
+
+	for compiler_name, output_path in output_paths.items():
+		compiler = _worker_compilers[compiler_name]
+		start_time = time.perf_counter()
+
+		# Writes the compiled code straight into a temporary file, which only replaces the output file if the compilation
+		# succeeded
+		temporary_path = f"{output_path}.{os.getpid()}.tmp"
+		compiled = False
+		try:
+			os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+			with open(temporary_path, "w", encoding="utf-8") as f:
+				compiled = compiler.compile_to(source.split("\n"), f)
+			if compiled:
+				os.replace(temporary_path, output_path)
+		except OSError as e:
+			errors.append(f"{compiler_name} : {e}")
+		except Exception as e:
+			errors.append(f"{compiler_name} : {type(e).__name__} {e}")
+		else:
+			errors.extend(f"{compiler_name} : {message}" for message in compiler.diagnostics.messages)
+		finally:
+			if os.path.exists(temporary_path):
+				os.remove(temporary_path)
+		timings[compiler_name] = time.perf_counter() - start_time
+
+	return source_path, timings, errors
+
+
+def find_sources(paths: List[str], output_directory: Optional[str], compiler_names: List[str]) -> List[Tuple[str, Dict[str, str]]]:
+	"""
+	Finds the files to compile, and where to write their compiled code.
+	:param paths: The files and directories given by the user ; the directories are searched recursively for '.algo' files.
+	:param output_directory: The directory in which the compiled files are written, following the tree of the source
+		files. If None, each compiled file is written next to its source file.
+	:param compiler_names: The names of the compilers to use.
+	:return: A list of tuples (source path, output path by compiler name).
+	"""
+	sources = []
+	for path in paths:
+		# Lists the files along with the directory their path is relative to in the output directory
+		if os.path.isdir(path):
+			root = path
+			files = sorted(
+				os.path.join(directory, filename)
+				for directory, _, filenames in os.walk(path)
+				for filename in filenames
+				if filename.endswith(SOURCE_EXTENSION)
+			)
+		else:
+			root = os.path.dirname(path)
+			files = [path]
+
+		for source_path in files:
+			if output_directory is None:
+				output_base = os.path.splitext(source_path)[0]
+			else:
+				output_base = os.path.join(output_directory, os.path.splitext(os.path.relpath(source_path, root))[0])
+			sources.append((source_path, {
+				compiler_name: output_base + OUTPUT_EXTENSIONS[compiler_name]
+				for compiler_name in compiler_names
+			}))
+	return sources
+
+
+def main(argv: List[str] = None) -> int:
+	"""
+	Runs the batch compiler from the command line.
+	:param argv: The command line arguments, without the program name. If None, sys.argv is used.
+	:return: The exit code ; 1 if any file could not be compiled, 0 otherwise.
+	"""
+	parser = argparse.ArgumentParser(prog="python -m batch_compiler", description="Compiles many .algo files at once.")
+	parser.add_argument("paths", nargs="+", help="The files to compile, or directories to search for .algo files.")
+	parser.add_argument("-t", "--target", choices=("algo", "cpp", "both"), default="both", help="The language to compile to.")
+	parser.add_argument("-o", "--output", default=None, help="The directory to write the compiled files to, instead of next to each file.")
+	parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="The amount of worker processes.")
+	parser.add_argument("--language", default="en", help="The language of the error messages.")
+	parser.add_argument("--tab-char", default="\t", help="The character used to indent the compiled code.")
+	parser.add_argument("--ptrs", action="store_true", help="Enables the pointers and memory allocations.")
+	parser.add_argument("--std", action="store_true", help="Uses the std namespace in the C++ code.")
+	parser.add_argument("--struct-keyword", action="store_true", help="Uses the struct keyword in the C++ functions.")
+	parser.add_argument("--cache-dir", default=None, help="A directory in which to keep the compiled codes across runs.")
+	args = parser.parse_args(argv)
+
+	compiler_names = {"algo": ["algorithmic"], "cpp": ["C++"], "both": ["algorithmic", "C++"]}[args.target]
+	sources = find_sources(args.paths, args.output, compiler_names)
+	compilers = create_compilers(
+		CompileOptions(
+			tab_char=args.tab_char,
+			use_ptrs_and_malloc=args.ptrs,
+			using_namespace_std=args.std,
+			use_struct_keyword=args.struct_keyword,
+			language=args.language
+		),
+		load_translations(os.path.join(os.path.dirname(os.path.abspath(__file__)), "translations"))
+	)
+	compilers = {compiler_name: compilers[compiler_name] for compiler_name in compiler_names}
+
+	# Compiles the files, in this process if only one job is wanted
+	start_time = time.perf_counter()
+	if args.jobs <= 1 or len(sources) <= 1:
+		_init_worker(compilers, args.cache_dir)
+		results = (compile_file(source_path, output_paths) for source_path, output_paths in sources)
+		executor = None
+	else:
+		executor = ProcessPoolExecutor(args.jobs, initializer=_init_worker, initargs=(compilers, args.cache_dir))
+		results = executor.map(
+			compile_file,
+			[source_path for source_path, _ in sources],
+			[output_paths for _, output_paths in sources],
+			chunksize=max(1, len(sources) // (args.jobs * 4))
+		)
+
+	# Reports the result of each file as soon as it is compiled
+	failed_files = 0
+	try:
+		for source_path, timings, errors in results:
+			timings_text = ", ".join(f"{compiler_name} {timing * 1000:.1f}ms" for compiler_name, timing in timings.items())
+			print(f"{'ERROR' if errors else 'OK'} {source_path} ({timings_text})")
+			for error in errors:
+				print(f"\t{error}")
+			failed_files += bool(errors)
+	finally:
+		if executor is not None:
+			executor.shutdown()
+
+	print(f"{len(sources)} files compiled in {time.perf_counter() - start_time:.2f}s, {failed_files} with errors.")
+	return 1 if failed_files else 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Measures the time taken by App.display_text to draw a frame, for documents from 100 to 1,000,000 lines.
+As only the visible lines are fetched from the buffer, the frame time should stay flat whatever the size of the document.
+Must be run from a terminal, after the setup : python benchmarks/display_text_benchmark.py
+"""
+import curses
+import os
+import sys
+import timeit
+
+# Runs from the root of the editor, like main.py does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from main import App
+
+
+DOCUMENT_SIZES = (100, 1_000, 10_000, 100_000, 1_000_000)  # The amount of lines of each benchmarked document
+FRAMES = 200  # The amount of frames drawn for each measure
+SAMPLE_PROGRAM = (
+	"fx int carre int x",
+	"desc Returns the square of x",
+	"vars",
+	"int y",
+	"fx_start",
+	"y = x * x",
+	"print \"Square :\" & y & (ENDL)",
+	"return y",
+	"end",
+	"arr int t 5",
+	"t[0] = puissance(2, 3) + racine(4)",
+)  # The lines the documents are made of
+
+
+def benchmark(stdscr) -> list:
+	"""
+	Draws frames of documents of increasing sizes and measures the time taken by each frame.
+	:param stdscr: The standard screen.
+	:return: A list of tuples (document size, time per frame in seconds).
+	"""
+	# Creates the app without its plugins, so only the editor's rendering is measured
+	app = App()
+	app.plugins = {}
+	app.stdscr = stdscr
+	app.rows, app.cols = stdscr.getmaxyx()
+	app._declare_color_pairs()
+
+	results = []
+	for size in DOCUMENT_SIZES:
+		app.current_text = "\n".join(SAMPLE_PROGRAM[i % len(SAMPLE_PROGRAM)] for i in range(size))
+
+		# Puts the cursor and the view in the middle of the document
+		app.min_display_line = size // 2
+		app.current_index = app.buffer.line_start(app.min_display_line)
+
+		def draw_frame():
+			# Types then erases a character before drawing, like the main loop does on each keypress
+			app.add_char_to_text("a")
+			app.handle_regular_key("KEY_BACKSPACE")
+			app.display_text()
+
+		time_per_frame = min(timeit.repeat(draw_frame, number=FRAMES, repeat=5)) / FRAMES
+		results.append((size, time_per_frame))
+	return results
+
+
+if __name__ == "__main__":
+	for document_size, frame_time in curses.wrapper(benchmark):
+		print(f"{document_size:>9} lines : {frame_time * 1000:.3f} ms per frame")
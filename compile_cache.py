@@ -0,0 +1,226 @@
+"""
+Contains the CompileCache class, which keeps the compiled code of the sources compiled recently.
+The entries are addressed by a hash of the source code along with the options the compiled code depends on, so that
+compiling the same code with the same options again returns the previous result right away.
+The most recently used entries are kept in memory, and can also be written to a directory to be reused across sessions.
+"""
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+CACHE_VERSION = 2  # Changes each time the compilers' output changes, so that the entries written on disk by an older version are not used
+CACHE_FILE_EXTENSION = ".algocache"  # The extension of the files of the cache, so that the other files of the directory are left alone
+
+
+class CompileCache:
+	def __init__(self, max_entries: int = 64, directory: Optional[str] = None, max_disk_bytes: int = 16 << 20):
+		"""
+		Creates a new cache.
+		:param max_entries: The maximum amount of compiled codes kept in memory.
+		:param directory: The directory in which the compiled codes are also written, or None to only keep them in memory.
+		:param max_disk_bytes: The maximum size of the files in the directory, in bytes ; the least recently used ones
+			are removed when it is exceeded.
+		"""
+		self.max_entries = max_entries
+		self.directory = directory
+		self.max_disk_bytes = max_disk_bytes
+		self._entries = OrderedDict()  # The compiled codes by key, from least to most recently used
+		self._disk_size: Optional[int] = None  # The total size of the files in the directory, computed when first needed
+
+		# Counters of the cache's effectiveness
+		self.memory_hits = 0
+		self.disk_hits = 0
+		self.misses = 0
+
+		# Only keeps the compiled codes in memory if the directory cannot be created
+		if self.directory is not None:
+			try:
+				os.makedirs(self.directory, exist_ok=True)
+			except OSError:
+				self.directory = None
+
+
+	@staticmethod
+	def make_key(source_lines: Sequence[str], *options) -> str:
+		"""
+		Computes the key of a compilation.
+		:param source_lines: The lines of the source code.
+		:param options: Everything the compiled code depends on, other than the source code ; their repr() is hashed.
+		:return: The key, as a hexadecimal string.
+		"""
+		hasher = hashlib.sha256(repr((CACHE_VERSION, options)).encode("utf-8"))
+		hasher.update("\n".join(source_lines).encode("utf-8"))
+		return hasher.hexdigest()
+
+
+	@property
+	def hits(self) -> int:
+		"""
+		The amount of compilations found in the cache, either in memory or on disk.
+		"""
+		return self.memory_hits + self.disk_hits
+
+
+	def stats(self) -> dict:
+		"""
+		Returns the counters of the cache, along with the amount of entries in memory.
+		"""
+		return {
+			"hits": self.hits,
+			"memory_hits": self.memory_hits,
+			"disk_hits": self.disk_hits,
+			"misses": self.misses,
+			"entries": len(self._entries)
+		}
+
+
+	def get(self, key: str) -> Optional[str]:
+		"""
+		Returns the compiled code stored at the given key.
+		:param key: The key of the compilation, as returned by make_key.
+		:return: The compiled code, or None if it is not in the cache.
+		"""
+		# Looks in memory first
+		compiled_code = self._entries.get(key)
+		if compiled_code is not None:
+			self._entries.move_to_end(key)
+			self.memory_hits += 1
+			return compiled_code
+
+		# Then on disk
+		if self.directory is not None:
+			path = self._get_path(key)
+			try:
+				with open(path, "r", encoding="utf-8", newline="") as file:
+					compiled_code = file.read()
+				# Marks the file as recently used
+				os.utime(path)
+			except OSError:
+				compiled_code = None
+			if compiled_code is not None:
+				self._remember(key, compiled_code)
+				self.disk_hits += 1
+				return compiled_code
+
+		self.misses += 1
+		return None
+
+
+	def put(self, key: str, compiled_code: str):
+		"""
+		Stores the compiled code at the given key.
+		:param key: The key of the compilation, as returned by make_key.
+		:param compiled_code: The compiled code.
+		"""
+		self._remember(key, compiled_code)
+
+		# Writes it on disk if wanted ; the cache still works in memory if the directory is not writable
+		if self.directory is not None:
+			path = self._get_path(key)
+			temporary_path = f"{path}.{os.getpid()}.tmp"  # Several processes can share the directory
+			# Gets the size of the file being overwritten, if any, so that it is not counted twice
+			try:
+				previous_size = os.path.getsize(path)
+			except OSError:
+				previous_size = 0
+			try:
+				with open(temporary_path, "w", encoding="utf-8", newline="") as file:
+					file.write(compiled_code)
+				os.replace(temporary_path, path)
+				size = os.path.getsize(path)
+			except OSError:
+				return None
+			self._disk_size = self._get_disk_size() if self._disk_size is None else self._disk_size + size - previous_size
+			if self._disk_size > self.max_disk_bytes:
+				self._evict_from_disk()
+
+
+	def clear(self):
+		"""
+		Removes every entry from the cache, including the ones on disk, and resets the counters.
+		"""
+		self._entries.clear()
+		self.memory_hits = self.disk_hits = self.misses = 0
+		if self.directory is not None:
+			for path in self._get_files():
+				try:
+					os.remove(path)
+				except OSError:
+					pass
+			self._disk_size = 0
+
+
+	def _remember(self, key: str, compiled_code: str):
+		"""
+		Keeps the compiled code in memory, forgetting the least recently used entry if there are too many.
+		"""
+		self._entries[key] = compiled_code
+		self._entries.move_to_end(key)
+		while len(self._entries) > self.max_entries:
+			self._entries.popitem(last=False)
+
+
+	def _get_path(self, key: str) -> str:
+		"""
+		Returns the path of the file storing the given key.
+		"""
+		return os.path.join(self.directory, key + CACHE_FILE_EXTENSION)
+
+
+	def _get_files(self) -> list:
+		"""
+		Returns the paths of the files of the cache in the directory, i.e. the files named after a key ; any other file
+		is never listed, and so never removed.
+		"""
+		try:
+			return [
+				os.path.join(self.directory, filename) for filename in os.listdir(self.directory)
+				if filename.endswith(CACHE_FILE_EXTENSION) and _is_key(filename[:-len(CACHE_FILE_EXTENSION)])
+			]
+		except OSError:
+			return []
+
+
+	def _get_disk_size(self) -> int:
+		"""
+		Computes the total size of the files of the cache in the directory.
+		"""
+		total_size = 0
+		for path in self._get_files():
+			try:
+				total_size += os.path.getsize(path)
+			except OSError:
+				pass
+		return total_size
+
+
+	def _evict_from_disk(self):
+		"""
+		Removes the least recently used files until the directory is back under its maximum size.
+		"""
+		files = []
+		for path in self._get_files():
+			try:
+				stat = os.stat(path)
+			except OSError:
+				continue
+			files.append((stat.st_mtime, stat.st_size, path))
+		files.sort()
+
+		self._disk_size = sum(size for _, size, _ in files)
+		for _, size, path in files:
+			if self._disk_size <= self.max_disk_bytes:
+				break
+			try:
+				os.remove(path)
+			except OSError:
+				continue
+			self._disk_size -= size
+
+
+def _is_key(name: str) -> bool:
+	"""
+	Tells whether the given name is a key returned by CompileCache.make_key, i.e. a SHA-256 hexadecimal digest.
+	"""
+	return len(name) == 64 and all(character in "0123456789abcdef" for character in name)
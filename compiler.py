@@ -1,15 +1,140 @@
-from typing import Union
+from typing import Union, Callable, Dict, Iterable, Optional, TextIO, Tuple, NamedTuple
+
+from compile_cache import CompileCache
+from diagnostics import Diagnostic, DiagnosticsCollector
+from emitter import Emitter, TeeEmitter
+from source_map import SourceMap
+from syntax_tree import BLOCK_OPENERS, Instruction, SyntaxTree, Token, tokenize_line, join_tokens, parse_program
 # TODO : Interpreter
 
 
+class CompileOptions(NamedTuple):
+	"""
+	The settings the compiled code depends on. They are immutable, so they can be shared between threads, sent to other
+	processes, and used as cache keys.
+	"""
+	tab_char: str = "\t"  # The character used to indent the compiled code
+	use_ptrs_and_malloc: bool = False  # Whether the pointers and memory allocations are enabled
+	using_namespace_std: bool = False  # Whether the C++ code uses the std namespace
+	use_struct_keyword: bool = False  # Whether the C++ code uses the struct keyword in the functions' return type and arguments
+	language: str = "en"  # The language of the error messages
+
+
+class CompilationCancelled(Exception):
+	"""
+	Raised by Compiler.compile_to when the compilation is cancelled through Compiler.should_cancel.
+	"""
+
+
+class BlockStack(list):
+	"""
+	The stack of the blocks the compiled line is in, from the outermost to the innermost one.
+	It is a list of block names, which also counts how many blocks of each name it contains, so that knowing whether the
+	line is inside a given block does not require scanning the stack.
+	"""
+	def __init__(self, blocks: Iterable[str] = ()):
+		super().__init__(blocks)
+		self._depths: Dict[str, int] = {}  # The amount of blocks in the stack, by name
+		self._recount()
+
+
+	def depth(self, block_name: str) -> int:
+		"""
+		Returns the amount of blocks of the given name the line is in.
+		"""
+		return self._depths.get(block_name, 0)
+
+
+	def inside(self, *block_names: str) -> bool:
+		"""
+		Returns whether the line is inside any block of the given names.
+		"""
+		return any(self._depths.get(block_name, 0) for block_name in block_names)
+
+
+	def append(self, block_name: str):
+		super().append(block_name)
+		self._depths[block_name] = self._depths.get(block_name, 0) + 1
+
+
+	def pop(self, index: int = -1) -> str:
+		block_name = super().pop(index)
+		self._depths[block_name] -= 1
+		return block_name
+
+
+	def clear(self):
+		super().clear()
+		self._depths.clear()
+
+
+	def __contains__(self, block_name: str) -> bool:
+		return self._depths.get(block_name, 0) != 0
+
+
+	# The other modifications are rare, so the blocks are simply counted again after them
+	def _recount(self):
+		self._depths.clear()
+		for block_name in self:
+			self._depths[block_name] = self._depths.get(block_name, 0) + 1
+
+
+	def extend(self, block_names: Iterable[str]):
+		super().extend(block_names)
+		self._recount()
+
+
+	def insert(self, index: int, block_name: str):
+		super().insert(index, block_name)
+		self._recount()
+
+
+	def remove(self, block_name: str):
+		super().remove(block_name)
+		self._recount()
+
+
+	def __setitem__(self, index, value):
+		super().__setitem__(index, value)
+		self._recount()
+
+
+	def __delitem__(self, index):
+		super().__delitem__(index)
+		self._recount()
+
+
+	def __iadd__(self, block_names: Iterable[str]):
+		self.extend(block_names)
+		return self
+
+
+	def __reduce__(self):
+		return BlockStack, (list(self),)
+
+
 class Compiler:
-	def __init__(self, instruction_names: Union[dict, tuple], var_types:dict, other_instructions:list, stdscr, translations: dict, translate_method, tab_char:str= "\t"):
+	# The instructions written one indentation level to the left of their block, along with the block instructions
+	dedented_instructions: Tuple[str, ...] = ("else", "elif")
+	# The list attributes the instructions of a unit can append to, and the attributes they can set ; the changes a
+	# unit makes to them are cached along with its compiled lines
+	unit_list_attributes: Tuple[str, ...] = ()
+	unit_value_attributes: Tuple[str, ...] = ()
+	# The list attributes among unit_list_attributes holding source line numbers, which are cached relative to the unit
+	# so that the unit can be reused wherever it moves in the code
+	unit_line_attributes: Tuple[str, ...] = ()
+
+	def __init__(self, instruction_names: Union[dict, tuple], var_types:dict, other_instructions:list, options: CompileOptions = None,
+	             translations: dict = None, diagnostics: DiagnosticsCollector = None):
 		"""
 		Initializes a new compiler.
 		:param instruction_names: Dictionaries containing the translation of the instructions
 			Keys : ('for', 'if', 'while', 'switch', 'arr', 'case', 'default', 'fx', 'proc', 'const')
 		:param var_types: Dictionaries containing the translation of the variable names
 			Keys : ('int', 'float', 'string', 'bool', 'char')
+		:param options: The default options of the compilations. If None, the default CompileOptions.
+		:param translations: The translations of the error messages, by language (see the translations folder).
+		:param diagnostics: The collector the errors are reported to. If None, a new collector only keeping them.
 		"""
 		# Dictionaries containing the translation of the variable names and the translation of the instructions
 		self.instruction_names = instruction_names
@@ -18,49 +143,219 @@ class Compiler:
 
 		# Compilation-related variables
 		self.instructions_list = []  # The list of instructions to be compiled
-		self.instructions_stack = []  # The stack of the instructions (indicates the number of tabs and the last instruction block's name)
+		self.syntax_tree: Optional[SyntaxTree] = None  # The parsed code being compiled
+		self.instructions_stack = BlockStack()  # The stack of the instructions (indicates the number of tabs and the last instruction block's name)
+		self.dedented_instruction_names = frozenset()  # The block instructions and the dedented instructions, computed on each compilation
 
 		# Use variables
-		self.stdscr = stdscr
+		self.options = CompileOptions() if options is None else options  # The options of the current compilation
+		self.diagnostics = DiagnosticsCollector() if diagnostics is None else diagnostics  # The errors of the last compilation
 		self.errored = False
-		self.tab_char = tab_char
-		self.translations = translations
-		self.translate_method = translate_method
+		self.tab_char = self.options.tab_char
+		self.translations = {} if translations is None else translations
+		self.translate_method = self.translate
+
+		# Dispatch table giving the handler of each instruction, built on first compilation
+		self._instruction_handlers: Optional[dict] = None
+		self._custom_instruction_handlers = {}  # The handlers given to register_instruction(), by instruction name
+
+		# The compiled units of the last compilation by source lines, along with the options they were compiled with
+		self._unit_cache = {}
+		self._unit_cache_options_key: Optional[tuple] = None
+		# The cache of the whole compiled codes, or None to always compile ; it can be shared between compilers
+		self.cache: Optional[CompileCache] = None
+		# The map of the lines written by the last compilation to their source lines
+		self.source_map: Optional[SourceMap] = None
+		# A function telling whether the compilation should stop, e.g. when its code is already outdated ; checked before
+		# each line or unit. If None, the compilation always runs to the end.
+		self.should_cancel: Optional[Callable[[], bool]] = None
 
 
-	def compile(self, instructions_list:list):
+	def register_instruction(self, instruction_name: str, handler: Callable[[str, list, int], None] = None):
 		"""
-		Dispatches the compilation to the correct functions based on the instruction params.
-		:param instructions_list: The list of instructions, a list of strings.
+		Adds a new instruction to the compiler.
+		:param instruction_name: The name of the instruction, i.e. the first word of the line.
+		:param handler: A function called with the instruction's name, its params (a list of Token) and the line number, like the
+			analyze_* methods. If None, the analyze_{instruction_name} method of the compiler is used.
+		"""
+		if instruction_name not in self.other_instructions:
+			self.other_instructions.append(instruction_name)
+		if handler is not None:
+			self._custom_instruction_handlers[instruction_name] = handler
+		# The dispatch table has to be built again, and the units compiled with the previous one are outdated
+		self._instruction_handlers = None
+		self._unit_cache.clear()
+
+
+	def _build_instruction_handlers(self) -> dict:
+		"""
+		Resolves the handler of each instruction once, so that dispatching a line only takes a dict lookup.
+		:return: A dict giving the handler of each instruction, or None if it has no analyze_* method.
+		"""
+		handlers = {
+			instruction_name: getattr(self, f"analyze_{instruction_name}", None)
+			for instruction_name in (*self.instruction_names, *self.other_instructions)
+		}
+		handlers.update(self._custom_instruction_handlers)
+		return handlers
+
+
+	def compile(self, instructions_list:Union[list, SyntaxTree], options: CompileOptions = None) -> Optional[str]:
+		"""
+		Compiles the code into a string ; see compile_to.
+		:param instructions_list: The list of instructions, a list of strings, or the SyntaxTree of the code.
+		:param options: The options of this compilation. If None, the options of the previous compilation are kept.
+		:return: The compiled code, or None if an error occurred ; the errors are then in self.diagnostics.
+		"""
+		emitter = Emitter()
+		if not self.compile_to(instructions_list, emitter, options):
+			return None
+		return emitter.getvalue()
+
+
+	def compile_to(self, instructions_list:Union[list, SyntaxTree], output:Union[Emitter, TextIO], options: CompileOptions = None) -> bool:
 		"""
-		# Resets the errored state
+		Dispatches the compilation to the correct functions based on the instruction params.
+		The analyze_* methods receive the tokens following the instruction's name as params, and write the compiled line
+		into self.instructions_list. The parsed line is also available through self.syntax_tree[line_number].
+		If the compiled code is found in self.cache, it is written without analyzing anything, and self.instructions_list
+		is left as the source code.
+		:param instructions_list: The list of instructions, a list of strings, or the SyntaxTree of the code if it was
+			already parsed (e.g. to compile the same code to another language).
+		:param output: The emitter the compiled code is written to, or a text stream (e.g. a file) to write it into as it
+			is produced. Nothing is written if an error occurs. The source line of each compiled line is mapped into
+			the emitter's source map (one is given to it if it has none), also kept in self.source_map.
+		:param options: The options of this compilation. If None, the options of the previous compilation are kept.
+		:return: Whether the code was compiled, i.e. False if an error occurred ; the errors are then in self.diagnostics.
+			The compilation does not stop at the first error : the line is skipped and the compilation resumes at the next
+			one, so that every error of the code is found at once.
+		:raises CompilationCancelled: If self.should_cancel asked to stop ; nothing is written then.
+		"""
+		# Writes into the stream through an emitter, which maps each compiled line to its source line
+		if not isinstance(output, Emitter):
+			output = Emitter(output, SourceMap())
+		elif output.source_map is None:
+			output.source_map = SourceMap()
+		self.source_map = output.source_map
+
+		# Uses the given options
+		if options is not None:
+			self.options = options
+		self.tab_char = self.options.tab_char
+
+		# Resets the errored state, and the blocks left open by a previous compilation that errored out
 		self.errored = False
+		self.diagnostics.clear()
+		self.instructions_stack.clear()
+
+		# Parses the code if it was not done yet
+		if isinstance(instructions_list, SyntaxTree):
+			self.syntax_tree = instructions_list
+		else:
+			self.syntax_tree = parse_program(instructions_list)
 
 		# Calls the pre-compilation cleaning method
 		self.prepare_new_compilation()
 
-		# Keeps as an attribute the list of instructions
-		self.instructions_list = instructions_list
+		# The list of compiled lines, which starts as the source code
+		self.instructions_list = list(self.syntax_tree.lines)
+
+		# Resolves the handler of each instruction if not done yet
+		if self._instruction_handlers is None:
+			self._instruction_handlers = self._build_instruction_handlers()
+		# Also gathers the instructions written one level to the left, as they are looked up on each line
+		self.dedented_instruction_names = frozenset((*self.instruction_names, *self.dedented_instructions))
+
+		# Returns the compiled code right away if the same code was already compiled with the same options
+		options_key = self.get_options_key()
+		if self.cache is not None:
+			cache_key = self.cache.make_key(self.syntax_tree.lines, type(self).__name__, options_key)
+			cached_entry = self.cache.get(cache_key)
+			if cached_entry is not None:
+				# The entry is the encoded source map, followed by the compiled code
+				encoded_map, final_compiled_code = cached_entry.split("\n", 1)
+				output.write_mapped(final_compiled_code, SourceMap.decode(encoded_map))
+				return True
+
+		# Interprets each instruction one by one, reusing the compiled units that did not change since the last compilation,
+		# unless they were compiled with other options
+		if options_key != self._unit_cache_options_key:
+			self._unit_cache = {}
+			self._unit_cache_options_key = options_key
+		instructions = self.syntax_tree.instructions
+		unit_cache = {}
+		line_number = 0
+		while line_number < len(instructions):
+			# Stops if the compilation is not wanted anymore, keeping the units of the previous compilation
+			if self.should_cancel is not None and self.should_cancel():
+				raise CompilationCancelled()
+
+			# Compiles a whole unit at once if one starts here, outside of any block
+			unit_end = self.syntax_tree.units.get(line_number) if not self.instructions_stack else None
+			if unit_end is not None:
+				unit_key = self.syntax_tree.lines[line_number:unit_end]
+				compiled_unit = self._unit_cache.get(unit_key)
+				if compiled_unit is None:
+					compiled_unit = self._compile_unit(line_number, unit_end)
+				else:
+					self._apply_unit(compiled_unit, line_number)
+				if compiled_unit is not None:
+					unit_cache[unit_key] = compiled_unit
+				line_number = unit_end
+
+			else:
+				self._compile_instruction(instructions[line_number])
+				line_number += 1
+
+		# Only keeps the units of this compilation, so the cache does not grow with each edit
+		self._unit_cache = unit_cache
+
+		# Also checks if an error occurred
+		if self.errored:
+			return False
+
+		# Makes the final adjustments to each line and puts everything together into the output
+		if self.cache is None:
+			self.final_touches(output)
+
+		# Or also keeps a copy of the compiled code as it is written, for the next time the same code is compiled
+		else:
+			cache_emitter = Emitter(None, SourceMap())
+			self.final_touches(TeeEmitter(output, cache_emitter))
+			self.cache.put(cache_key, cache_emitter.source_map.encode() + "\n" + cache_emitter.getvalue())
+
+		# Finally tells the compilation succeeded
+		return True
+
 
-		# Creates the instruction names
-		instruction_names = self.instruction_names
-		if isinstance(self.instruction_names, dict):
-			instruction_names = instruction_names.keys()
+	def _compile_instruction(self, instruction: Instruction):
+		"""
+		Compiles a single line, by dispatching it to the correct function.
+		:param instruction: The parsed line.
+		"""
+		# Copies the tokens, as the analyze_* methods are allowed to modify them
+		i = instruction.line_number
+		line = list(instruction.tokens)
+		instruction_name = instruction.name
+		instruction_params = line[1:]
 
-		# Interprets each instruction one by one
-		for i, line in enumerate(self.instructions_list):
-			# Checks if no error occurred
-			if self.errored: break
+		# The handlers see self.errored as whether this line errored, whatever happened on the previous lines
+		errored_before = self.errored
+		self.errored = False
+		stack_depth = len(self.instructions_stack)
 
-			line = line.split(' ')
-			instruction_name = line[0]
-			instruction_params = line[1:]
+		try:
+			# An 'end' closing no block is reported instead of emptying the stack
+			if instruction_name == "end" and not self.instructions_stack:
+				self.error(self.translate_method("compilers", "errors", "unmatched_end").format(
+					line_number=(i + 1)
+				), i, "unmatched_end")
 
 			# Based on the instruction's name, dispatches to the correct functions
-			if instruction_name in (*instruction_names, *self.other_instructions):
-				# Turns the fx_name into a callback function : The analyze_%name% method of this class.
-				try: fx_name = getattr(self, f"analyze_{instruction_name}")
-				except Exception: raise NotImplementedError(f"Function {instruction_name} not implemented")
+			elif instruction_name in self._instruction_handlers:
+				# Gets the callback function : The analyze_%name% method of this class, or a registered handler.
+				fx_name = self._instruction_handlers[instruction_name]
+				if fx_name is None: raise NotImplementedError(f"Function {instruction_name} not implemented")
 				# Calls the callback function and gives it the instruction's name and params, along with the line number
 				fx_name(instruction_name, instruction_params, i)
 
@@ -75,18 +370,102 @@ class Compiler:
 				if instruction_params[0].endswith("="):
 					self.var_assignation(line, i)
 
-			# Makes the final trimming to the line
+		# A handler failing on a malformed line (e.g. missing parameters) is an error of this line
+		except (IndexError, KeyError):
+			self.error(self.translate_method("compilers", "errors", "invalid_syntax").format(
+				line_number=(i + 1), instruction=instruction_name
+			), i, "invalid_syntax")
+
+		# Makes the final trimming to the line
+		if not self.errored:
 			self.final_trim(instruction_name, i)
 
-		# Also checks if an error occurred
-		if self.errored:
+		# Otherwise resynchronizes on the next line, making sure the block the line opens is still closed by its 'end'
+		else:
+			del self.instructions_stack[stack_depth + (instruction_name in BLOCK_OPENERS):]
+			if instruction_name in BLOCK_OPENERS and len(self.instructions_stack) == stack_depth:
+				self.instructions_stack.append(instruction_name)
+
+		self.errored = self.errored or errored_before
+
+
+	def _compile_unit(self, start: int, end: int) -> Optional[tuple]:
+		"""
+		Compiles the lines of a unit, and records what they changed so that the unit can be reused as long as its
+		source code does not change.
+		:param start: The index of the first line of the unit.
+		:param end: The index after the last line of the unit.
+		:return: The compiled unit, or None if it cannot be reused (if an error occurred, or if it did not close all
+			its blocks).
+		"""
+		# Remembers the state of the attributes the unit may change
+		errors_count = len(self.diagnostics)
+		list_lengths = [len(getattr(self, attribute)) for attribute in self.unit_list_attributes]
+		unset = object()
+		previous_values = [getattr(self, attribute) for attribute in self.unit_value_attributes]
+		for attribute in self.unit_value_attributes:
+			setattr(self, attribute, unset)
+
+		# Compiles the lines one by one
+		for instruction in self.syntax_tree.instructions[start:end]:
+			self._compile_instruction(instruction)
+
+		# Gets the values set by the unit, and restores the others
+		new_values = []
+		for attribute, previous_value in zip(self.unit_value_attributes, previous_values):
+			value = getattr(self, attribute)
+			if value is unset:
+				setattr(self, attribute, previous_value)
+			new_values.append(value)
+
+		if len(self.diagnostics) != errors_count or self.instructions_stack:
 			return None
 
-		# Makes the final adjustments to each line and puts everything together
-		final_compiled_code = self.final_touches()
-
-		# Finally returns the compiled code
-		return final_compiled_code
+		# Gets what the unit added to each list, with the source lines relative to the unit
+		list_additions = []
+		for attribute, length in zip(self.unit_list_attributes, list_lengths):
+			additions = getattr(self, attribute)[length:]
+			if additions and attribute in self.unit_line_attributes:
+				additions = [line_number - start for line_number in additions]
+			list_additions.append(tuple(additions))
+		return tuple(self.instructions_list[start:end]), tuple(list_additions), tuple(new_values), unset
+
+
+	def _apply_unit(self, compiled_unit: tuple, start: int):
+		"""
+		Writes a previously compiled unit into the current compilation.
+		:param compiled_unit: The unit, as returned by _compile_unit.
+		:param start: The index of the first line of the unit.
+		"""
+		compiled_lines, list_additions, new_values, unset = compiled_unit
+		self.instructions_list[start:start + len(compiled_lines)] = compiled_lines
+		for attribute, additions in zip(self.unit_list_attributes, list_additions):
+			if not additions:
+				continue
+			if attribute in self.unit_line_attributes:
+				additions = [line_number + start for line_number in additions]
+			getattr(self, attribute).extend(additions)
+		for attribute, value in zip(self.unit_value_attributes, new_values):
+			if value is not unset:
+				setattr(self, attribute, value)
+
+
+	def get_options_key(self) -> tuple:
+		"""
+		Returns the options the compiled code depends on, so that the codes and units compiled with other options are
+		not reused.
+		The language is left out : it only changes the error messages, and a code or unit with errors is never reused.
+		"""
+		return (
+			self.options._replace(language=None),
+			tuple(self.var_types.items()),
+			tuple(self.instruction_names.items()) if isinstance(self.instruction_names, dict) else tuple(self.instruction_names),
+			tuple(self.other_instructions),
+			tuple(
+				(instruction_name, getattr(handler, "__qualname__", repr(handler)))
+				for instruction_name, handler in self._custom_instruction_handlers.items()
+			)
+		)
 
 
 	def prepare_new_compilation(self):
@@ -285,9 +664,9 @@ class Compiler:
 		pass
 
 
-	def final_touches(self):
+	def final_touches(self, emitter:Emitter):
 		"""
-		Makes the final touches to the line.
+		Makes the final touches to the line, and writes the whole compiled code into the emitter.
 		"""
 		pass
 
@@ -306,11 +685,58 @@ class Compiler:
 		pass
 
 
-	def error(self, message:str="Error."):
+	def error(self, message:str="Error.", line_number:int=None, code:str="error", column:int=None):
 		"""
-		Errors out to the user.
+		Errors out to the user, by reporting the error to self.diagnostics.
+		:param message: The message of the error.
+		:param line_number: The index of the line the error is on, if known.
+		:param code: A short name identifying the kind of error, usually the key of its translation.
+		:param column: The index of the character the error starts at. If None, the start of the line's instruction.
 		"""
-		self.stdscr.clear()
-		self.stdscr.addstr(0, 0, message)
-		self.stdscr.getch()
+		if column is None:
+			column = 0
+			if line_number is not None and self.syntax_tree is not None and line_number < len(self.syntax_tree):
+				# Skips the indentation of the line
+				column = next((token.column for token in self.syntax_tree[line_number].tokens if token != ""), 0)
+		self.diagnostics.report(Diagnostic(message, line_number, column, code))
 		self.errored = True
+
+
+	def translate(self, *keys: str, **format_keys) -> str:
+		"""
+		Returns the translation of the given string in the language of the options, falling back to english.
+		:param keys: Every key, in order, towards the translation.
+		:param format_keys: Parameters that would be used in the str.format() method.
+		:return: The translation.
+		"""
+		for language in (self.options.language, "en"):
+			try:
+				string = self.translations[language]
+				for key in keys:
+					string = string[key]
+				break
+			except KeyError:
+				continue
+		else:
+			raise KeyError(f"Translation for {keys} not found !")
+
+		if format_keys:
+			string = string.format(**format_keys)
+		return string
+
+
+	def __getstate__(self) -> dict:
+		# The dispatch table is built again in the other process, and the last compilation is not sent
+		state = self.__dict__.copy()
+		state["_instruction_handlers"] = None
+		state["translate_method"] = None
+		state["syntax_tree"] = None
+		state["instructions_list"] = []
+		state["_unit_cache"] = {}
+		state["_unit_cache_options_key"] = None
+		return state
+
+
+	def __setstate__(self, state: dict):
+		self.__dict__.update(state)
+		self.translate_method = self.translate
@@ -0,0 +1,92 @@
+"""
+Creates the compilers of the editor, so that the editor and the batch compiler use the same instructions and types.
+"""
+import json
+import os
+from typing import Callable
+
+from algorithmic_compiler import AlgorithmicCompiler
+from compiler import CompileOptions
+from cpp_compiler import CppCompiler
+from diagnostics import Diagnostic, DiagnosticsCollector
+
+# The translation of the block instructions and of the variable types into Algorithmic French
+ALGORITHMIC_INSTRUCTION_NAMES = {
+	"for": "Pour",
+	"if": "Si",
+	"while": "Tant Que",
+	"switch": "Selon",
+	"arr": "Tableau",
+	"case": "Cas",
+	"default": "Autrement",
+	"fx": "Fonction",
+	"proc": "Procédure",
+	"const": "Constante"
+}
+ALGORITHMIC_VAR_TYPES = {
+	"int": "Entier",
+	"float": "Réel",
+	"string": "Chaîne de caractères",
+	"bool": "Booléen",
+	"char": "Caractère"
+}
+ALGORITHMIC_OTHER_INSTRUCTIONS = (
+	"print", "input", "end", "elif", "else", "fx_start", "vars", "precond", "data", "datar", "result",
+	"return", "desc", "CODE_RETOUR", "init", "struct", "const", "delete"
+)
+
+# The block instructions and the translation of the variable types into C++
+CPP_INSTRUCTION_NAMES = ('for', 'if', 'while', 'switch', 'arr', 'case', 'default', 'fx', 'proc', 'struct')
+CPP_VAR_TYPES = {
+	"int": "int",
+	"float": "float",
+	"string": "std::string",
+	"bool": "bool",
+	"char": "char"
+}
+CPP_OTHER_INSTRUCTIONS = (
+	"print", "input", "end", "elif", "else", "fx_start", "vars", "precond", "data", "datar", "result",
+	"return", "desc", "CODE_RETOUR", "init", "const", "delete"
+)
+
+
+def create_compilers(options: CompileOptions, translations: dict, on_error: Callable[[Diagnostic], None] = None) -> dict:
+	"""
+	Creates a new instance of each compiler.
+	:param options: The default options of the compilations.
+	:param translations: The translations of the error messages, by language.
+	:param on_error: A function called with each error as soon as it is found, e.g. to show it to the user. If None,
+		the errors are only collected in the diagnostics of each compiler.
+	:return: A dict containing the compilers, with the keys 'algorithmic' and 'C++'.
+	"""
+	return {
+		"algorithmic": AlgorithmicCompiler(
+			dict(ALGORITHMIC_INSTRUCTION_NAMES),
+			dict(ALGORITHMIC_VAR_TYPES),
+			list(ALGORITHMIC_OTHER_INSTRUCTIONS),
+			options,
+			translations,
+			DiagnosticsCollector(on_error)
+		),
+		"C++": CppCompiler(
+			CPP_INSTRUCTION_NAMES,
+			dict(CPP_VAR_TYPES),
+			list(CPP_OTHER_INSTRUCTIONS),
+			options,
+			translations,
+			DiagnosticsCollector(on_error)
+		)
+	}
+
+
+def load_translations(directory: str) -> dict:
+	"""
+	Loads the translations of every language.
+	:param directory: The path to the translations folder.
+	:return: The translations as dictionaries, by language code ; e.g. 'translations_en.json' gives result['en'].
+	"""
+	translations = {}
+	for translation_file in os.listdir(directory):
+		with open(os.path.join(directory, translation_file), "r", encoding="utf8") as f:
+			translations[translation_file[13:15]] = json.load(f)
+	return translations
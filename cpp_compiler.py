@@ -1,35 +1,68 @@
 """
 Uses the Compiler class to compile the project into C++.
 """
-from compiler import Compiler
-
-
-def ifsanitize(string:str) -> str:
+import re
+from typing import Union
+
+from compiler import Compiler, CompileOptions, tokenize_line, join_tokens
+from diagnostics import DiagnosticsCollector
+from emitter import Emitter
+
+# Matches, in a single scan of a compiled line, the string literals and everything final_trim rewrites outside of them
+BUILTINS_REGEX = re.compile(
+	r'(?P<string>"(?:\\.|[^"\\])*"?|\'(?:\\.|[^\'\\])*\'?)'
+	r'|(?<!\w)len\((?P<len>[^)]*)\)'
+	r'|(?<!\w)(?P<function>puissance|racine|aleatoire|alea)\('
+	r'|(?P<null>\bNULL\b)'
+	r'|(?P<endl>\(ENDL\))'
+	r'|(?P<std>std::)'
+)
+# The translation of the algorithmic functions, along with the feature they use
+BUILTIN_FUNCTIONS = {
+	"puissance": ("pow(", "math"),
+	"racine": ("sqrt(", "math"),
+	"aleatoire": ("rand(", "random"),
+	"alea": ("rand(", "random")
+}
+# The headers included for each feature, in order
+FEATURE_INCLUDES = {
+	"math": ("math.h",),
+	"random": ("stdlib.h", "time.h"),
+	"len": ("stdlib.h",)
+}
+
+
+def ifsanitize(tokens:Union[str, list]) -> str:
 	"""
-	Transforms all ET into &&, etc.
-	:param string: The string to sanitize.
+	Transforms all ET into &&, etc., leaving the string literals untouched.
+	:param tokens: The tokens to sanitize, or a string.
 	:return: The sanitized string.
 	"""
-	return string.replace('ET', '&&').replace('OU', '||').replace('NON', '!')
+	if isinstance(tokens, str):
+		tokens = tokenize_line(tokens)
+	return join_tokens(tokens, {'ET': '&&', 'OU': '||', 'NON': '!'})
 
 
 class CppCompiler(Compiler):
-	def __init__(self, instruction_names:tuple, var_types:dict, other_instructions:list, stdscr, app,
-	                use_struct_keyword:bool=True):
-		super().__init__(instruction_names, var_types, other_instructions, stdscr, app.translations, app.get_translation, app.tab_char)
+	unit_list_attributes = ("constants", "constants_sources", "fxtext", "fxtext_sources", "used_features")
+	unit_value_attributes = ("return_code",)
+	unit_line_attributes = ("constants_sources", "fxtext_sources")
 
-		# Creates a list of constants
+	def __init__(self, instruction_names:tuple, var_types:dict, other_instructions:list, options:CompileOptions=None,
+	             translations:dict=None, diagnostics:DiagnosticsCollector=None):
+		super().__init__(instruction_names, var_types, other_instructions, options, translations, diagnostics)
+
+		# Creates a list of constants, along with the source line of each
 		self.constants = []
-		# Creates a list of function lines
+		self.constants_sources = []
+		# Creates a list of function lines, along with the source line of each
 		self.fxtext = []
+		self.fxtext_sources = []
 		# Creates the return code
 		self.return_code = "0"
-
-		# Chooses whether we use the struct keyword in the functions' return type and arguments
-		self.use_struct_keyword = use_struct_keyword
-
-		# Creates some use variables
-		self.app = app
+		# The features of C++ used by the code, which decide the headers to include ; a feature is recorded on each use,
+		# so that each compiled unit keeps the features it uses even if an earlier unit used them too
+		self.used_features = []
 
 
 	def prepare_new_compilation(self):
@@ -37,14 +70,21 @@ class CppCompiler(Compiler):
 		Resets everything before compilation.
 		"""
 		self.constants.clear()
+		self.constants_sources.clear()
 		self.fxtext.clear()
+		self.fxtext_sources.clear()
 		self.return_code = "0"
+		self.used_features.clear()
+
+		# Modifies the std::string use of std:: based on its use
+		self.var_types["string"] = ("std::" if self.options.using_namespace_std is False else "") + "string"
 
 
 	def analyze_const(self, instruction_name:str, instruction_params:list, line_number:int):
 		""" Constante : Nom : Paramètres """
 		# Adds a constant to the list of constants
-		self.constants.append(f"const {' '.join(instruction_params)};")
+		self.constants.append(BUILTINS_REGEX.sub(self._rewrite_builtin, f"const {' '.join(instruction_params)};"))
+		self.constants_sources.append(line_number)
 
 		# Empties the line
 		self.instructions_list[line_number] = ""
@@ -54,10 +94,10 @@ class CppCompiler(Compiler):
 		""" Noms, séparés, par, des, virgules : Type(s) """
 		# Finding the type of the variable
 		if instruction[0][-1] == "*":
-			if self.app.use_ptrs_and_malloc:
+			if self.options.use_ptrs_and_malloc:
 				var_type = f"{self.var_types[instruction[0][:-1]]}*"
 			else:
-				return self.error(f"Error line {line_number + 1} : Use of pointers was disabled.")
+				return self.error(f"Error line {line_number + 1} : Use of pointers was disabled.", line_number, "pointers_disabled")
 		else:
 			var_type = self.var_types[instruction[0]]
 
@@ -98,6 +138,7 @@ class CppCompiler(Compiler):
 
 		elif last_elem in ("fx", "proc"):
 			self.fxtext.append("}\n")
+			self.fxtext_sources.append(line_number)
 			self.instructions_list[line_number] = ""
 
 		# Otherwise it's just a curly bracket
@@ -109,14 +150,14 @@ class CppCompiler(Compiler):
 		""" Tant Que condition """
 		self.instructions_stack.append("while")
 		# Rewrites the line for the while loop
-		self.instructions_list[line_number] = f"while ({ifsanitize(' '.join(instruction_params))}) " + "{"
+		self.instructions_list[line_number] = f"while ({ifsanitize(instruction_params)}) " + "{"
 
 
 	def analyze_if(self, instruction_name:str, instruction_params:list, line_number:int):
 		""" Si condition """
 		self.instructions_stack.append("if")
 		# Rewrites the line
-		self.instructions_list[line_number] = f"if ({ifsanitize(' '.join(instruction_params))}) " + "{"
+		self.instructions_list[line_number] = f"if ({ifsanitize(instruction_params)}) " + "{"
 
 
 	def analyze_else(self, instruction_name:str, instruction_params:list, line_number:int):
@@ -128,7 +169,7 @@ class CppCompiler(Compiler):
 	def analyze_elif(self, instruction_name:str, instruction_params:list, line_number:int):
 		""" Sinon Si condition """
 		# Rewrites the line
-		self.instructions_list[line_number] = "} " + f"else if ({ifsanitize(' '.join(instruction_params))}) " + " {"
+		self.instructions_list[line_number] = "} " + f"else if ({ifsanitize(instruction_params)}) " + " {"
 
 
 	def analyze_switch(self, instruction_name:str, instruction_params:list, line_number:int):
@@ -141,10 +182,10 @@ class CppCompiler(Compiler):
 	def analyze_case(self, instruction_name:str, instruction_params:list, line_number:int):
 		""" Cas element """
 		# If there is no switch in the instruction stack, we error out to the user
-		if "switch" not in self.instructions_stack:
+		if self.instructions_stack.depth("switch") == 0:
 			self.error(self.translate_method("compilers", "cpp", "errors", "case_outside_switch").format(
 				line_number=(line_number + 1)
-			))
+			), line_number, "case_outside_switch")
 
 		# If there is no error, we continue
 		else:
@@ -155,10 +196,10 @@ class CppCompiler(Compiler):
 	def analyze_default(self, instruction_name:str, instruction_params:list, line_number:int):
 		""" Autrement : """
 		# If there is no switch in the instruction stack, we error out to the user
-		if "switch" not in self.instructions_stack:
+		if self.instructions_stack.depth("switch") == 0:
 			self.error(self.translate_method("compilers", "cpp", "errors", "default_outside_switch").format(
 				line_number=(line_number + 1)
-			))
+			), line_number, "default_outside_switch")
 
 		# If there is no error, we continue
 		else:
@@ -168,11 +209,11 @@ class CppCompiler(Compiler):
 
 	def analyze_print(self, instruction_name:str, instruction_params:list, line_number:int):
 		""" Afficher(elements) """
-		# Creates the string to print
-		string_to_print = ' '.join(instruction_params)
-
-		# Turns all & into <<
-		string_to_print = string_to_print.replace(' & ', ' << ')
+		# Creates the string to print, turning all & between two elements into <<
+		string_to_print = ' '.join(
+			"<<" if token == "&" and 0 < i < len(instruction_params) - 1 else token
+			for i, token in enumerate(instruction_params)
+		)
 
 		# Rewrites the string
 		self.instructions_list[line_number] = f"std::cout << {string_to_print}"
@@ -211,16 +252,16 @@ class CppCompiler(Compiler):
 	def analyze_return(self, instruction_name:str, instruction_params:list, line_number:int):
 		""" Retourner elements """
 		# Checks we're not in a procedure
-		if "proc" in self.instructions_stack:
+		if self.instructions_stack.depth("proc") != 0:
 			self.error(self.translate_method("compilers", "cpp", "errors", "return_in_procedure").format(
 				line_number=(line_number + 1)
-			))
+			), line_number, "return_in_procedure")
 
 		# Checks we're inside a function
-		elif "fx" not in self.instructions_stack:
+		elif self.instructions_stack.depth("fx") == 0:
 			self.error(self.translate_method("compilers", "cpp", "errors", "return_outside_function").format(
 				line_number=(line_number + 1)
-			))
+			), line_number, "return_outside_function")
 
 		# Writes the line correctly
 		else:
@@ -253,13 +294,22 @@ class CppCompiler(Compiler):
 		except IndexError:
 			self.error(self.translate_method("compilers", "cpp", "errors", "arr_missing_params").format(
 				line_number=(line_number + 1)
-			))
+			), line_number, "arr_missing_params")
 
 		# If the variable type doesn't exist
 		except KeyError:
 			self.error(self.translate_method("compilers", "cpp", "errors", "unrecognized_var_type").format(
 				line_number=(line_number + 1), type=instruction_params[0]
-			))
+			), line_number, "unrecognized_var_type")
+
+
+	def unrecognized_var_type(self, var_type:str, line_number:int):
+		""" Errors out because of an unknown variable type. """
+		# Points at the word of the line containing the type
+		column = next((token.column for token in self.syntax_tree[line_number].tokens if var_type and var_type in token), None)
+		self.error(self.translate_method("compilers", "cpp", "errors", "unrecognized_var_type").format(
+			line_number=(line_number + 1), type=var_type
+		), line_number, "unrecognized_var_type", column)
 
 
 	def analyze_init(self, instruction_name:str, instruction_params:list, line_number:int):
@@ -268,38 +318,40 @@ class CppCompiler(Compiler):
 		if len(instruction_params) < 2:  # Error for missing parameters
 			self.error(self.translate_method("compilers", "cpp", "errors", "struct_missing_args").format(
 				line_number=(line_number + 1), param_amount=len(instruction_params)
-			))
+			), line_number, "struct_missing_args")
 		elif len(instruction_params) % 2 == 1:  # Error for missing parameters
 			self.error(self.translate_method("compilers", "cpp", "errors", "struct_args_not_even").format(
 				line_number=(line_number + 1), param_amount=len(instruction_params)
-			))
+			), line_number, "struct_args_not_even")
 		else:
-			# Creates the structure initialization
-			self.instructions_list[line_number] = f"struct {instruction_params[0]} {instruction_params[1]};"
-
-			# Then for each extra couple of arguments, adds a initialization to this line
-			for i in range(2, len(instruction_params), 2):
-				self.instructions_list[line_number] += "\n" + self.tab_char * (len(self.instructions_stack) + 1)
-				self.instructions_list[line_number] += f"{instruction_params[1]}.{instruction_params[i]} = {instruction_params[i + 1]};"
-			self.instructions_list[line_number] = self.instructions_list[line_number][:-1]
+			# Creates the structure initialization, followed by an initialization for each extra couple of arguments ;
+			# the last semicolon is added by final_trim
+			indentation = "\n" + self.tab_char * (len(self.instructions_stack) + 1)
+			self.instructions_list[line_number] = indentation.join((
+				f"struct {instruction_params[0]} {instruction_params[1]};",
+				*(
+					f"{instruction_params[1]}.{instruction_params[i]} = {instruction_params[i + 1]};"
+					for i in range(2, len(instruction_params), 2)
+				)
+			))[:-1]
 
 
 	def analyze_delete(self, instruction_name:str, instruction_params:list, line_number:int):
 		""" Analyzes the delete keyword. """
-		if self.app.use_ptrs_and_malloc:
+		if self.options.use_ptrs_and_malloc:
 			if len(instruction_params) != 0:
 				if instruction_params[0] == "arr":
 					if len(instruction_params) == 2:
 						self.instructions_list[line_number] = f"delete[] {instruction_params[1]}"
 					else:
-						self.error(f"Error on line {line_number + 1} : Missing parameter 'var_name'.")
+						self.error(f"Error on line {line_number + 1} : Missing parameter 'var_name'.", line_number, "delete_missing_var_name")
 				else:
 					self.instructions_list[line_number] = f"delete {instruction_params[0]}"
 			else:
-				self.error(f"Error on line {line_number+1} : Missing parameter 'var_name'.")
+				self.error(f"Error on line {line_number+1} : Missing parameter 'var_name'.", line_number, "delete_missing_var_name")
 		else:
 			self.error(f"Error on line {line_number + 1} : Unknown keyword 'delete'. "
-			           "Maybe you forgot to enable the use of pointers and malloc ?")
+			           "Maybe you forgot to enable the use of pointers and malloc ?", line_number, "unknown_delete")
 
 
 	def analyze_fx(self, instruction_name:str, instruction_params:list, line_number:int):
@@ -308,60 +360,56 @@ class CppCompiler(Compiler):
 		while instruction_params[-1] == "": instruction_params.pop()
 
 		# Function to handle the parameters, whether they are arrays or standard variables
-		def handle_params(instruction_params):
+		def handle_params():
 			# The list of parameters
 			params = []
 
-			# Fetches each parameter (going two by two, because each param goes <type> <name>)
-			for i in range(2, len(instruction_params), 2):
-				# Adds the parameter to the list of parameters
-				params.append("")
+			# Fetches each parameter, already parsed into its type and name
+			for param in self.syntax_tree[line_number].parameters:
+				# A parameter without a name is ignored
+				if param.name is None:
+					continue
 
-				if self.app.use_ptrs_and_malloc and instruction_params[i][-1] == '*':
-					is_pointer = '*'
-					instruction_params[i] = instruction_params[i][:-1]
-				else:
-					is_pointer = ''
+				# Pointers can only be used if enabled
+				if param.is_pointer and not self.options.use_ptrs_and_malloc:
+					self.unrecognized_var_type(param.type, line_number)
+					return ""
+				is_pointer = '*' if param.is_pointer else ''
+				is_const = "const " if param.is_const else ""
 
-				if instruction_params[i].startswith('const_'):
-					is_const = "const "
-					instruction_params[i] = instruction_params[i][6:]
-				else:
-					is_const = ""
-
-				# Try block in case there is an IndexError
+				# Try block in case the type is unknown
 				try:
 					# If the param is an array, we parse it correctly
-					if instruction_params[i].startswith("arr"):
-						current_array_param = instruction_params[i].split("_")
-						params[-1] += f"{is_const}{self.var_types[current_array_param[1]]}{is_pointer} {instruction_params[i + 1]}[{']['.join(current_array_param[2:])}]"
+					if param.is_array:
+						params.append(f"{is_const}{self.var_types[param.array_type]}{is_pointer} {param.name}[{']['.join(param.array_dims)}]")
 
 					# If the param is a structure, we parse it correctly
-					elif instruction_params[i].startswith("struct_"):
-						params[-1] += is_const + "struct " * self.use_struct_keyword + f"{instruction_params[i][7:]}{is_pointer} {instruction_params[i + 1]}"
+					elif param.struct_name is not None:
+						params.append(is_const + "struct " * self.options.use_struct_keyword + f"{param.struct_name}{is_pointer} {param.name}")
 
 					# If the param is NOT an array
 					else:
-						# We add it to the params as the type, followed by the name, of whose we remove the
-						# first char if it is '&' (no datar mode in algorithmic)
-						params[-1] += is_const + self.var_types[instruction_params[i]] + is_pointer + " " + instruction_params[i + 1][instruction_params[i][0] == '&':]
+						# We add it to the params as the type, followed by the name
+						params.append(is_const + self.var_types[param.base_type] + is_pointer + " " + param.name)
 
-				# If an IndexError is encountered, we remove the last param from the params list and continue
-				except IndexError:
-					params.pop()
+				# If the type is unknown, we error out
+				except KeyError:
+					self.unrecognized_var_type(param.type, line_number)
+					return ""
 
 			# We merge back the params and return them
 			params = ", ".join(params)
 			return params
 
 		# Getting the parameters string
-		params = handle_params(instruction_params)
+		params = handle_params()
+		if self.errored: return None
 
 		# Branching on whether it is a procedure or a function
 		if instruction_params[0] != "void":
 			self.instructions_stack.append("fx")
 
-			if self.app.use_ptrs_and_malloc and instruction_params[0][-1] == '*':
+			if self.options.use_ptrs_and_malloc and instruction_params[0][-1] == '*':
 				is_pointer = '*'
 				instruction_params[0] = instruction_params[0][:-1]
 			else:
@@ -369,13 +417,15 @@ class CppCompiler(Compiler):
 
 			# If the return type is not a structure
 			if not instruction_params[0].startswith("struct_"):
-				# We add the return type
+				# We add the return type, if it exists
+				if instruction_params[0] not in self.var_types:
+					return self.unrecognized_var_type(instruction_params[0], line_number)
 				self.instructions_list[line_number] = self.var_types[instruction_params[0]]
 
 			# If the return type is a structure
 			else:
 				# We add the structure message followed by the return type
-				self.instructions_list[line_number] = "struct " * self.use_struct_keyword + instruction_params[0][7:]
+				self.instructions_list[line_number] = "struct " * self.options.use_struct_keyword + instruction_params[0][7:]
 
 			# Check pointers
 			self.instructions_list[line_number] += is_pointer
@@ -390,7 +440,7 @@ class CppCompiler(Compiler):
 
 		# If the name of the function/procedure is 'main', we error out
 		if instruction_params[1] == "main":
-			self.error(f"Error on line {line_number + 1} : Cannot name function/procedure 'main'.")
+			self.error(f"Error on line {line_number + 1} : Cannot name function/procedure 'main'.", line_number, "fx_named_main")
 
 
 
@@ -400,53 +450,50 @@ class CppCompiler(Compiler):
 		while instruction_params[-1] == "": instruction_params.pop()
 
 		# Function to handle the parameters, whether they are arrays or standard variables
-		def handle_params(instruction_params):
+		def handle_params():
 			# The list of parameters
 			params = []
 
-			# Fetches each parameter (going two by two, because each param goes <type> <name>)
-			for i in range(1, len(instruction_params), 2):
-				# Adds the parameter to the list of parameters
-				params.append("")
+			# Fetches each field, already parsed into its type and name
+			for param in self.syntax_tree[line_number].parameters:
+				# A field without a name is ignored
+				if param.name is None:
+					continue
 
-				# Try block in case there is an IndexError
-				try:
-					# If the param is an array, we parse it correctly
-					if instruction_params[i].startswith("arr"):
-						current_array_param = instruction_params[i].split("_")
-						try:
-							vtype = self.var_types[instruction_params[i].split('_')[1]]
-						except KeyError:
-							vtype = instruction_params[i].split('_')[1]
-						params[-1] += f"{vtype} {current_array_param[2]}[{']['.join(current_array_param[2:])}]"
+				# If the param is an array, we parse it correctly
+				if param.is_array:
+					vtype = self.var_types.get(param.array_type, param.array_type)
+					params.append(f"{vtype} {param.name}[{']['.join(param.array_dims)}]")
 
-					# If the param is a structure, we parse it correctly
-					elif instruction_params[i].startswith("struct_"):
-						params[-1] += "struct " * self.use_struct_keyword + f"{instruction_params[i][7:]} {instruction_params[i + 1]}"
+				# If the param is a structure, we parse it correctly
+				elif param.struct_name is not None:
+					params.append("struct " * self.options.use_struct_keyword + f"{param.struct_name} {param.name}")
 
-					# If the param is NOT an array
-					else:
-						# We add it to the params as the type, followed by the name, of whose we remove the
-						# first char if it is '&' (no datar mode in algorithmic)
-						params[-1] += self.var_types[instruction_params[i]] + " " + instruction_params[i + 1][instruction_params[i][0] == '&':]
-
-				# If an IndexError is encountered, we remove the last param from the params list and continue
-				except IndexError:
-					params.pop()
+				# If the param is NOT an array
+				else:
+					# We add it to the params as the type, followed by the name
+					try:
+						params.append(self.var_types[param.type] + " " + param.name)
+					except KeyError:
+						self.unrecognized_var_type(param.type, line_number)
+						return []
 
 			# We return back the parameters
 			return params
 
 		# Getting the parameters string
-		params = handle_params(instruction_params)
+		params = handle_params()
+		if self.errored: return None
 
 		# Branching on whether it is a procedure or a function
 		# We write the line as a structure
-		self.constants.append("")
-		self.constants[-1] += f"struct {instruction_params[0]}" + " {\n"
-		for param in params:
-			self.constants[-1] += self.tab_char * (len(self.instructions_stack) + 1) + param + ";\n"
-		self.constants[-1] += self.tab_char * len(self.instructions_stack) + "};"
+		param_indentation = self.tab_char * (len(self.instructions_stack) + 1)
+		self.constants.append("".join((
+			f"struct {instruction_params[0]}" + " {\n",
+			*(param_indentation + param + ";\n" for param in params),
+			self.tab_char * len(self.instructions_stack) + "};"
+		)))
+		self.constants_sources.append(line_number)
 		self.instructions_list[line_number] = ""
 
 
@@ -458,127 +505,115 @@ class CppCompiler(Compiler):
 
 	def final_trim(self, instruction_name:str, line_number:int):
 		""" Adds the line ends, transforms the function names, and adds the correct indentation """
-		# Adds the end of line
-		self.instructions_list[line_number] = self.instructions_list[line_number].replace("(ENDL)", "\\n")
-
-		# Adds the power, sqrt, and rand functions
-		for algo_function, cpp_function in (
-				("puissance(", "pow("),
-				("racine(", "sqrt("),
-				("aleatoire(", "rand("),
-				("alea(", "rand("),
-				("NULL", "nullptr")
-		):
-			self.instructions_list[line_number] = self.instructions_list[line_number].replace(algo_function, cpp_function)
-
-		# Function to find all the instances of a substring in a string
-		def find_all(full_string: str, search: str):
-			"""
-			Finds all instances of a substring in a string.
-			:param full_string: The string to search into.
-			:param search: The string of whom to find all the instances.
-			:return: A generator containing all the indexes of the substring.
-			"""
-			start = 0
-			while True:
-				start = full_string.find(search, start)
-				if start == -1: return
-				yield start
-				start += len(search)
-
-		# Adds the len function
-		if "len(" in self.instructions_list[line_number]:
-			for index in find_all(self.instructions_list[line_number], "len("):
-				var_name = self.instructions_list[line_number][
-		           index + 4 :
-		           index + 4 + self.instructions_list[line_number][index + 4:].find(")")
-		        ]
-				self.instructions_list[line_number] = self.instructions_list[line_number].replace(
-					f"len({var_name})",
-					f"(sizeof({var_name})/sizeof({var_name}[0]))",
-					1
-				)
-
+		# Adds the line ends, the power, sqrt, rand and len functions, and removes the std:: if we use the std namespace,
+		# all in one scan of the line
+		self.instructions_list[line_number] = BUILTINS_REGEX.sub(self._rewrite_builtin, self.instructions_list[line_number])
 
 		# Adds the correct tabbing (amount of tabs is equal to amount of instructions in the instructions stack,
 		# minus one if the current instruction is in the instruction names)
 		tab_amount = len(self.instructions_stack)
-		if instruction_name in (*self.instruction_names, "else", "elif"):
+		if instruction_name in self.dedented_instruction_names:
 			tab_amount -= 1
 
 		# Adds a semicolon if necessary
 		if not (
 				self.instructions_list[line_number].startswith("//") or
 				self.instructions_list[line_number].endswith("}") or
-				instruction_name in (*self.instruction_names, "else", "elif")
+				instruction_name in self.dedented_instruction_names
 		):
 			self.instructions_list[line_number] += ";"
 
 		# Writes the line
-		self.instructions_list[line_number] = self.app.tab_char * tab_amount + self.instructions_list[line_number]
-
-		# Removes the std:: if we use the std namespace
-		if self.app.using_namespace_std:
-			self.instructions_list[line_number] = self.instructions_list[line_number].replace("std::", "")
+		self.instructions_list[line_number] = self.tab_char * tab_amount + self.instructions_list[line_number]
 
 		# Adds it to fxtext if necessary
 		if len(self.instructions_stack) != 0 and (
-			"fx" in self.instructions_stack or
-			"proc" in self.instructions_stack or
+			self.instructions_stack.inside("fx", "proc") or
 			(instruction_name == "end" and self.instructions_stack[-1] in ("fx", "proc"))
 		):
 			self.fxtext.append(self.instructions_list[line_number])
+			self.fxtext_sources.append(line_number)
 			if instruction_name == "end":
 				self.fxtext[-1] += "\n"
 			self.instructions_list[line_number] = ""
 
 
-	def final_touches(self):
-		""" Concatenates everything into one string """
-		# Initializes the final compiled code
-		final_compiled_code = "#include <iostream>\n"
+	def _rewrite_builtin(self, match:re.Match) -> str:
+		""" Gives the C++ translation of an element matched by BUILTINS_REGEX. """
+		kind = match.lastgroup
+
+		# The string literals are left untouched, except for their line ends
+		if kind == "string":
+			return match.group().replace("(ENDL)", "\\n")
+		elif kind == "len":
+			self.use_feature("len")
+			var_name = match.group("len")
+			return f"(sizeof({var_name})/sizeof({var_name}[0]))"
+		elif kind == "function":
+			cpp_function, feature = BUILTIN_FUNCTIONS[match.group("function")]
+			self.use_feature(feature)
+			return cpp_function
+		elif kind == "null":
+			return "nullptr"
+		elif kind == "endl":
+			return "\\n"
+		# std::
+		else:
+			return "" if self.options.using_namespace_std else "std::"
 
-		# We import math.h if we use power or sqrt in the code
-		if "puissance(" in self.app.current_text or "racine(" in self.app.current_text:
-			final_compiled_code += "#include <math.h>\n"
 
-		# If we use random in the code, we import stdlib.h and time.h
-		if 'aleatoire(' in self.app.current_text or 'alea(' in self.app.current_text:
-			final_compiled_code += "#include <stdlib.h>\n#include <time.h>\n"
+	def use_feature(self, feature:str):
+		""" Records that the code uses a feature of FEATURE_INCLUDES, so that its headers are included. """
+		# Not deduplicated across the code, as a reused unit only brings back the features it recorded itself
+		self.used_features.append(feature)
 
-		# If we use len in the code, we import stdlib.h
-		if 'len(' in self.app.current_text:
-			final_compiled_code += "#include <stdlib.h>\n"
+
+	def final_touches(self, emitter:Emitter):
+		""" Writes everything into the emitter """
+		# Starts the final compiled code
+		emitter.write("#include <iostream>\n")
+
+		# We import the headers of the features found while analyzing the code (math.h for power or sqrt, stdlib.h and
+		# time.h for random, stdlib.h for len), each once
+		used_features = set(self.used_features)
+		headers = []
+		for feature, feature_headers in FEATURE_INCLUDES.items():
+			if feature in used_features:
+				headers.extend(header for header in feature_headers if header not in headers)
+		for header in headers:
+			emitter.write(f"#include <{header}>\n")
 
 		# If we use the std namespace, we put it there
-		if self.app.using_namespace_std:
-			final_compiled_code += "using namespace std;\n"
+		if self.options.using_namespace_std:
+			emitter.write("using namespace std;\n")
 
 		# We add a simple blank line
-		final_compiled_code += "\n"
+		emitter.write("\n")
 
-		# We add the constants text to the final_compiled_code
-		final_compiled_code += "\n".join(self.constants)
+		# We add the constants text to the final compiled code
+		emitter.write_joined("\n", self.constants, self.constants_sources)
 		# We also add another newline if there are constants declared
 		if len(self.constants) != 0:
-			final_compiled_code += "\n\n"
+			emitter.write("\n\n")
 
 		# We then add the function's text
-		final_compiled_code += "\n".join(text for text in self.fxtext if text.replace(self.tab_char, "") != ";")
+		functions = [
+			(text, source_line) for text, source_line in zip(self.fxtext, self.fxtext_sources)
+			if text.replace(self.tab_char, "") != ";"
+		]
+		emitter.write_joined("\n", (text for text, _ in functions), (source_line for _, source_line in functions))
 
 		# We start to add the main function
-		final_compiled_code += "\n\nint main() {\n"
+		emitter.write("\n\nint main() {\n")
 
 		# We add the srand(time(NULL)) statement if we are using random
-		if "aleatoire(" in self.app.current_text or "alea(" in self.app.current_text:
-			final_compiled_code += self.tab_char + "srand(time(NULL));\n"
+		if "random" in used_features:
+			emitter.write(self.tab_char + "srand(time(NULL));\n")
 
-		# We then add each instruction along with a tab
-		for instruction in self.instructions_list:
+		# We then add each instruction along with a tab ; each comes from the source line at the same index
+		for source_line, instruction in enumerate(self.instructions_list):
 			if instruction.replace(self.tab_char, "") != ";" and instruction != "":
-				final_compiled_code += self.tab_char + instruction + "\n"
+				emitter.write(self.tab_char + instruction + "\n", source_line)
 
 		# We complete the compilation
-		final_compiled_code += self.tab_char + f"return {self.return_code};\n" + "}"
-
-		return final_compiled_code
+		emitter.write(self.tab_char + f"return {self.return_code};\n" + "}")
@@ -0,0 +1,100 @@
+"""
+Contains the diagnostics reported by the compilers, and the collector they are reported to.
+The compilers never show the errors themselves : whoever runs them (the editor, the batch compiler, a worker...)
+chooses what to do with them through the collector.
+"""
+from typing import Callable, Iterator, List, Optional
+
+
+class Diagnostic:
+	"""
+	An error found during the compilation.
+	"""
+	__slots__ = ("message", "line_number", "column", "code")
+
+	def __init__(self, message: str, line_number: Optional[int] = None, column: int = 0, code: str = "error"):
+		"""
+		:param message: The message shown to the user.
+		:param line_number: The index of the line the error is on, or None if it is unknown.
+		:param column: The index of the character of the line the error starts at.
+		:param code: A short name identifying the kind of error, e.g. 'case_outside_switch'.
+		"""
+		self.message = message
+		self.line_number = line_number
+		self.column = column
+		self.code = code
+
+
+	def __repr__(self) -> str:
+		return f"Diagnostic({self.message!r}, line_number={self.line_number!r}, column={self.column!r}, code={self.code!r})"
+
+
+class DiagnosticsCollector:
+	"""
+	Collects the diagnostics of a compilation.
+	"""
+	def __init__(self, on_report: Optional[Callable[[Diagnostic], None]] = None):
+		"""
+		:param on_report: A function called with each diagnostic as soon as it is reported, e.g. to show it to the user.
+			If None, the diagnostics are only collected.
+		"""
+		self.on_report = on_report
+		self._diagnostics: List[Diagnostic] = []
+
+
+	def report(self, diagnostic: Diagnostic):
+		"""
+		Adds a diagnostic to the collector.
+		"""
+		self._diagnostics.append(diagnostic)
+		if self.on_report is not None:
+			self.on_report(diagnostic)
+
+
+	def copy(self) -> "DiagnosticsCollector":
+		"""
+		Returns a new collector with the same diagnostics, which stays the same when this one is cleared.
+		"""
+		diagnostics = DiagnosticsCollector(self.on_report)
+		diagnostics._diagnostics = list(self._diagnostics)
+		return diagnostics
+
+
+	def clear(self):
+		"""
+		Forgets the diagnostics of the previous compilation.
+		"""
+		self._diagnostics.clear()
+
+
+	@property
+	def messages(self) -> List[str]:
+		"""
+		The messages of the diagnostics, in the order they were reported.
+		"""
+		return [diagnostic.message for diagnostic in self._diagnostics]
+
+
+	@property
+	def line_numbers(self) -> List[int]:
+		"""
+		The indexes of the lines containing at least one error, in ascending order.
+		"""
+		return sorted({diagnostic.line_number for diagnostic in self._diagnostics if diagnostic.line_number is not None})
+
+
+	def __len__(self) -> int:
+		return len(self._diagnostics)
+
+
+	def __iter__(self) -> Iterator[Diagnostic]:
+		return iter(self._diagnostics)
+
+
+	def __getitem__(self, index: int) -> Diagnostic:
+		return self._diagnostics[index]
+
+
+	def __getstate__(self) -> dict:
+		# The callback usually belongs to the editor, and cannot be sent to another process
+		return {"on_report": None, "_diagnostics": self._diagnostics}
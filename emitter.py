@@ -0,0 +1,124 @@
+"""
+Contains the Emitter class, which receives the compiled code fragment by fragment as the compilers produce it.
+The fragments are either kept in a list, to be joined once at the end, or written right away into any text stream (a
+file, a pipe, a socket opened with makefile()...), so that the compiled code never has to be held in memory as a whole.
+"""
+from itertools import repeat
+from typing import Iterable, List, Optional, TextIO
+
+from source_map import NO_SOURCE, SourceMap
+
+
+class Emitter:
+	def __init__(self, stream: Optional[TextIO] = None, source_map: Optional[SourceMap] = None):
+		"""
+		Creates a new emitter.
+		:param stream: The text stream the fragments are written to. If None, the fragments are kept in a list.
+		:param source_map: The map receiving the source line of each line written, or None not to map the lines.
+		"""
+		self.stream = stream
+		self.source_map = source_map
+		self.fragments: List[str] = []  # The fragments written so far, if there is no stream
+		self.length = 0  # The amount of characters written so far
+		self.line = 0  # The index of the line being written
+
+
+	def write(self, fragment: str, source_line: int = NO_SOURCE):
+		"""
+		Writes a fragment of the compiled code.
+		:param fragment: The text to write.
+		:param source_line: The index of the source line the fragment comes from, for the source map. A line made of
+			several fragments is mapped to the source line of its first fragment.
+		"""
+		if self.source_map is not None and fragment:
+			# Maps the lines the fragment writes on, except the one it starts on if a previous fragment already mapped it ;
+			# the line after a final line break is left to the next fragment
+			line_breaks = fragment.count("\n")
+			self.source_map.append(
+				source_line,
+				line_breaks + (not fragment.endswith("\n")) - (self.source_map.line_count > self.line)
+			)
+			self.line += line_breaks
+
+		if self.stream is None:
+			self.fragments.append(fragment)
+		else:
+			self.stream.write(fragment)
+		self.length += len(fragment)
+
+
+	def write_joined(self, separator: str, fragments: Iterable[str], source_lines: Iterable[int] = None):
+		"""
+		Writes the given fragments with a separator between each of them, like separator.join(fragments), without
+		building the joined string.
+		:param source_lines: The source line of each fragment, for the source map. If None, they have no source line.
+		"""
+		if source_lines is None:
+			source_lines = repeat(NO_SOURCE)
+		first = True
+		for fragment, source_line in zip(fragments, source_lines):
+			if not first:
+				self.write(separator)
+			self.write(fragment, source_line)
+			first = False
+
+
+	def write_mapped(self, text: str, source_map: Optional[SourceMap]):
+		"""
+		Writes a text starting on a new line, along with the source map of its lines.
+		:param text: The text to write.
+		:param source_map: The map of the lines of the text, or None if it is unknown.
+		"""
+		if self.source_map is None or source_map is None or not text:
+			self.write(text)
+			return None
+		self.source_map.extend(source_map)
+		# Maps the lines the text's map does not cover
+		self.line += text.count("\n")
+		self.source_map.append(
+			NO_SOURCE, self.line + (not text.endswith("\n")) - self.source_map.line_count
+		)
+		if self.stream is None:
+			self.fragments.append(text)
+		else:
+			self.stream.write(text)
+		self.length += len(text)
+
+
+	def getvalue(self) -> str:
+		"""
+		Returns everything written so far, if the fragments are kept in a list.
+		"""
+		if self.stream is not None:
+			raise ValueError("The fragments written to a stream are not kept.")
+		# Keeps the joined fragments, so that they are not joined again on the next call
+		if len(self.fragments) > 1:
+			self.fragments[:] = ["".join(self.fragments)]
+		return self.fragments[0] if self.fragments else ""
+
+
+class TeeEmitter(Emitter):
+	def __init__(self, *emitters: Emitter):
+		"""
+		Creates an emitter writing each fragment into all the given emitters, e.g. into a file while keeping a copy of
+		the compiled code to cache it. Each of them maps the lines into its own source map.
+		:param emitters: The emitters to write into.
+		"""
+		super().__init__()
+		self.emitters = emitters
+
+
+	def write(self, fragment: str, source_line: int = NO_SOURCE):
+		for emitter in self.emitters:
+			emitter.write(fragment, source_line)
+		self.length += len(fragment)
+
+
+	def write_mapped(self, text: str, source_map: Optional[SourceMap]):
+		for emitter in self.emitters:
+			emitter.write_mapped(text, source_map)
+		self.length += len(text)
+
+
+	def getvalue(self) -> str:
+		raise ValueError("The fragments written to a TeeEmitter are only kept by its emitters.")
@@ -8,20 +8,45 @@ from functools import partial
 import os
 import importlib
 import json
-from typing import Union, Optional, Callable, Any
+from typing import Union, Optional, Callable, Any, Tuple
 from configparser import ConfigParser
-from collections import deque
+from collections import OrderedDict
+from types import MappingProxyType
 from traceback import print_exception
 import re
 import datetime
-
-from algorithmic_compiler import AlgorithmicCompiler
-from cpp_compiler import CppCompiler
-from utils import display_menu, input_text, get_screen_middle_coords, browse_files
+import time
+import math
+import threading
+
+from background_compiler import BackgroundCompiler
+from compile_cache import CompileCache
+from compiler import CompileOptions
+from compiler_factory import create_compilers
+from diagnostics import Diagnostic, DiagnosticsCollector
+from output_pager import OutputPager
+from preview_pane import PreviewPane
+from source_map import SourceMap
+from syntax_tree import SyntaxTree, parse_program
+from text_buffer import TextBuffer
+from undo import UndoAction, UndoHistory
+from utils import display_menu, input_text, get_screen_middle_coords, browse_files, find_text_difference
 
 
 # Constants
 CRASH_FILE_NAME = ".crash"
+SYNTAX_HIGHLIGHT_CACHE_SIZE = 4096  # The maximum amount of lines whose syntax highlighting is kept in cache
+BACKGROUND_STATUS_REFRESH_MS = 100  # How often the status of a running background compilation is refreshed, in milliseconds
+# Splits a line into the tokens the syntax highlighting looks for : quotes, brackets, '&', the built-in functions calls,
+# and the text between them
+HIGHLIGHT_TOKEN_REGEX = re.compile(
+	r'(?P<quote>")|(?P<bracket>[\[\]])|(?P<ampersand>&)|(?P<builtin>(?:puissance|racine|aleatoire|alea|len)(?=\())'
+	r'|(?P<text>(?:(?!(?:puissance|racine|aleatoire|alea|len)\()[^"\[\]&])+)'
+)
+# The priority of each highlighting rule ; where several rules apply, the color of the highest one is used
+HIGHLIGHT_PRIORITIES = {
+	"keyword": 1, "bracket": 2, "string": 3, "assignation": 4, "ampersand": 5, "builtin": 6, "instruction": 7
+}
 
 
 class App:
@@ -51,7 +76,7 @@ class App:
 				# e.g. translation_file = 'translations_en.json', self.translations['en'] = {...}
 				self.translations[translation_file[13:15]] = json.load(f)
 
-		self.current_text = ""  # The text being displayed in the window
+		self.buffer = TextBuffer()  # The buffer containing the text being displayed in the window
 		self.stdscr: Optional[_curses.window] = None  # The standard screen (see curses library)
 		self.rows, self.cols = 0, 0  # The number of rows and columns in the window
 		self.lines = 1  # The number of lines containing text in the window
@@ -69,6 +94,7 @@ class App:
 			"op": (self.options, self.get_translation("commands", "op"), False),
 			"h": (self.display_commands, self.get_translation("commands", "h"), False),
 			"z": (self.undo, self.get_translation("commands", "z"), False),
+			"y": (self.redo, self.get_translation("commands", "y"), True),
 			"a": (self.repeat_last_command, self.get_translation("commands", "a"), False),
 			# "t": (self.modify_tab_char, self.get_translation("commands", "t"), True),
 			# "j": (self.toggle_std_use, self.get_translation("commands", "j"), True),
@@ -77,12 +103,17 @@ class App:
 			"is": (self.insert_text, self.get_translation("commands", "is"), True),
 			"rlt": (self.reload_theme, self.get_translation("commands", "rlt"), True),
 			"m": (self.mark_line, self.get_translation("commands", "m"), True),
+			"gl": (self.go_to_compiled_line, self.get_translation("commands", "gl"), True),
+			"pv": (self.toggle_preview, self.get_translation("commands", "pv"), True),
 			# To add the command symbol to the text
 			self.command_symbol: (partial(self.add_char_to_text, self.command_symbol), self.command_symbol, True)
 		}  # A dictionary of all the commands, either built-in or plugin-defined.
 		self.last_used_command: Optional[str] = None  # The prefix of the last command used
 		self.instructions_list = []  # The list of instructions for compilation, is only used by the compilation functions
+		self._syntax_tree: Optional[SyntaxTree] = None  # The last parsed code, shared by the compilers
+		self._syntax_tree_source: Optional[str] = None  # The text the last syntax tree was parsed from
 		self.tab_char = "\t"  # The tab character
+		self.max_fps = 60  # The maximum amount of frames drawn per second ; the keys typed in between are applied all at once. 0 for no limit.
 		self.using_namespace_std = False  # Whether to use the std namespace during the C++ compilation
 		self.use_struct_keyword = False  # Whether to use the struct keyword in the functions' return type during the C++ compilation
 		self.logs = True  # Whether to log
@@ -91,13 +122,30 @@ class App:
 		self.min_display_char = 0  # Useless at the moment
 		self.last_save_action = "clipboard"  # What the user did the last time he saved some code from the editor ; can be 'clipboard' or the pah to a file.
 		self.compilers = {}  # A dictionary of compilers for the editor
-		self.undo_actions = deque([], maxlen=21)  # All the actions that can be used to undo
+		self.compile_cache = CompileCache()  # The compiled codes of the last compilations, shared by the compilers
+		self.last_source_map: Optional[SourceMap] = None  # The map of the last compiled code's lines to the source lines
+		self.compile_lock = threading.Lock()  # Held while the compilers are running, as the background compiler shares them
+		self.background_compiler: Optional[BackgroundCompiler] = None  # Compiles the code while typing, if enabled
+		self.background_compilation_delay = 0.3  # How long the code has to stay unchanged before it is compiled in the background, in seconds
+		self._background_request = None  # The version of the buffer and the options last sent to the background compiler
+		self.preview: Optional[PreviewPane] = None  # The pane showing the compiled code next to the editor, if enabled
+		self._preview_geometry = None  # The size and position of the preview's window, to create it again when they change
+		self.undo_actions = UndoHistory()  # All the actions that can be used to undo or redo
 		self.is_crash_reboot = False  # Whether the editor has been rebooted from a crash. Can only be used through a plugin's init() method, will always be False otherwise.
 		self.marked_lines = []  # Which lines are currently marked by the user
+		self.error_marked_lines = []  # Which of the marked lines were marked because of a compilation error
 		self.left_placement_shift = 0  # By how many columns the line numbers should be shifted to the right
 		self.top_placement_shift = 0  # By how many lines the top of the code should be shifted from the top
 		self.input_locked = False  # If True, will disable all keyboard input except for commands and plugins
 		self.use_ptrs_and_malloc = False  # If True, will enable the pointers and memory allocations
+		self._full_redraw = True  # If True, the screen will be cleared and entirely redrawn on the next frame
+		self._drawn_rows = {}  # The state of each text row as it was last drawn on the screen, to only redraw the rows that changed
+		self._drawn_footer = None  # The state of the footer as it was last drawn on the screen
+		self._status_line_dirty = False  # Whether a command left a message on the last row, to be erased on the next keypress
+		self._last_frame_time = 0.  # When the last frame was drawn, as given by time.monotonic()
+		self._highlight_cache = OrderedDict()  # The syntax highlighting runs of the last drawn lines, from least to most recently used
+		self._keyword_colors = None  # The name of the color pair of each keyword, built from color_control_flow when first needed
+		self._variable_types = None  # The set of the basic variable types, built along with the keyword colors
 
 		# Changes the class variable of browse_files to be the config's class variable
 		if self.plugins_config["BASE_CONFIG"]["default_save_location"] != "":
@@ -123,11 +171,27 @@ class App:
 		else:
 			self.plugins_config["BASE_CONFIG"]["tab_char"] = self.tab_char
 
-		# Creates a maximum length for the queue of the undo actions based on the config
-		if "max_undo_size" in self.plugins_config["BASE_CONFIG"].keys():
-			self.undo_actions = deque([], maxlen=self.plugins_config["BASE_CONFIG"]["max_undo_size"] + 1)
+		# Sets the maximum memory used by the undo actions based on the config
+		if "max_undo_bytes" in self.plugins_config["BASE_CONFIG"].keys():
+			self.undo_actions.max_bytes = self.plugins_config["BASE_CONFIG"]["max_undo_bytes"]
+		else:
+			self.plugins_config["BASE_CONFIG"]["max_undo_bytes"] = self.undo_actions.max_bytes
+
+		# Limits the frame rate based on the config
+		if "max_fps" in self.plugins_config["BASE_CONFIG"].keys():
+			self.max_fps = self.plugins_config["BASE_CONFIG"]["max_fps"]
+		else:
+			self.plugins_config["BASE_CONFIG"]["max_fps"] = self.max_fps
+
+		# Keeps the compiled codes on disk across sessions if a directory is set in the config
+		if self.plugins_config["BASE_CONFIG"].get("compile_cache_directory", "") != "":
+			self.compile_cache = CompileCache(
+				directory=self.plugins_config["BASE_CONFIG"]["compile_cache_directory"],
+				max_disk_bytes=self.plugins_config["BASE_CONFIG"].get("compile_cache_max_bytes", self.compile_cache.max_disk_bytes)
+			)
 		else:
-			self.plugins_config["BASE_CONFIG"]["max_undo_size"] = self.undo_actions.maxlen - 1
+			self.plugins_config["BASE_CONFIG"]["compile_cache_directory"] = ""
+		self.plugins_config["BASE_CONFIG"].setdefault("compile_cache_max_bytes", self.compile_cache.max_disk_bytes)
 
 		# Whether to a=enable pointers and memory allocations based on the config
 		if "use_ptrs_and_malloc" in self.plugins_config["BASE_CONFIG"].keys():
@@ -135,15 +199,23 @@ class App:
 		else:
 			self.plugins_config["BASE_CONFIG"]["use_ptrs_and_malloc"] = self.use_ptrs_and_malloc
 
+		# Whether to compile the code in the background while typing, based on the config
+		self.plugins_config["BASE_CONFIG"].setdefault("background_compilation", False)
+		self.background_compilation_delay = self.plugins_config["BASE_CONFIG"].setdefault(
+			"background_compilation_delay", self.background_compilation_delay
+		)
+
 		# Generates the list of options the user has access to
 		self.options_list = [
 			(self.get_translation('commands', 'std_use'), lambda: self.using_namespace_std, self.toggle_std_use),
 			(self.get_translation('commands', 'struct_use'), lambda: self.use_struct_keyword, self.use_struct_keyword),
 			(self.get_translation('commands', 'modify_tab_char'), lambda: repr(self.tab_char), self.modify_tab_char),
 			(self.get_translation('commands', 'use_ptrs_and_malloc'), lambda: self.use_ptrs_and_malloc, self.toggle_use_ptrs_and_malloc),
+			(self.get_translation('commands', 'background_compilation'), lambda: self.background_compiler is not None,
+			 self.toggle_background_compilation),
 			(self.get_translation('language', 'language'), lambda: self.language, self.change_language),
 			(self.get_translation('change_max_undo_size', 'max_undo'),
-			 lambda: self.plugins_config['BASE_CONFIG']['max_undo_size'], self.change_max_undo_size),
+			 lambda: self.plugins_config['BASE_CONFIG']['max_undo_bytes'], self.change_max_undo_size),
 		]  # The list of options the user has access to ; Follows the scheme <name> <current_state> <callback_trigger>
 
 
@@ -200,6 +272,10 @@ class App:
 		# Initializes each plugin, if they have an init function
 		self._init_plugins()
 
+		# Starts compiling in the background if enabled
+		if self.plugins_config["BASE_CONFIG"]["background_compilation"]:
+			self.start_background_compilation()
+
 		# If the app had not previously crashed, we display the welcome page
 		if self.is_crash_reboot is False:
 			self.show_welcome_page()
@@ -214,43 +290,133 @@ class App:
 			# Gets the current screen size
 			self.rows, self.cols = self.stdscr.getmaxyx()
 
-			# Key input
-			key = self.stdscr.getkey()
-
-			# If the undo is full, dumping the earliest element of queue
-			if len(self.undo_actions) == self.undo_actions.maxlen:
-				self.undo_actions.popleft()
+			# Key input ; waits for a key, then gathers all the keys typed until the next frame
+			# While the status of the background compilation is about to change, only waits for a short time so that it is
+			# shown as soon as it changes
+			if self.background_compiler is not None and (
+				self.background_compiler.busy or
+				self._drawn_footer is None or self._drawn_footer[-1] != self.get_background_status() or
+				(self.preview is not None and self.preview.result is not self.background_compiler.result)
+			):
+				self.stdscr.timeout(BACKGROUND_STATUS_REFRESH_MS)
+			try:
+				first_key = self.stdscr.getkey()
+			except curses.error:
+				# No key was typed : only the background compilation can have changed, along with the preview
+				self.display_preview()
+				self.apply_stylings()
+				continue
+			finally:
+				self.stdscr.timeout(-1)
+			keys = self.read_pending_keys(first_key)
+
+			# If the terminal was resized, everything has to be redrawn
+			if "KEY_RESIZE" in keys:
+				self.rows, self.cols = self.stdscr.getmaxyx()
+				self.request_full_redraw()
+
+			# Handles the regular keys all at once, up to the command symbol
+			regular_keys = keys[:-1] if keys[-1] == self.command_symbol else keys
+			if regular_keys:
+				# Erases the message left by the last command
+				if self._status_line_dirty:
+					self.stdscr.move(self.rows - 1, 0)
+					self.stdscr.clrtoeol()
+					self._status_line_dirty = False
+
+				# Plugins drawing on keypress expect a blank screen, as we can't know what they draw
+				if self._plugins_draw_on_keypress():
+					self.stdscr.erase()
+					self._forget_drawn_regions()
+
+				self.handle_regular_keys(regular_keys)
 
 			# If system key is pressed
-			if key == self.command_symbol:
+			if keys[-1] == self.command_symbol:
 				self.handle_command_key()
 
-			# If it is a regular key
-			else:
-				# Screen clearing
-				self.stdscr.clear()
-
-				# Handles the input as regular keys
-				if not self.input_locked:
-					self.handle_regular_key(key)
-
-				# Calls the plugins update_on_keypress function
-				for plugin in self.plugins.values():
-					if hasattr(plugin[1], "update_on_keypress"):
-						plugin[1].update_on_keypress(key)
+				# Commands can draw anywhere on the screen, so every region has to be drawn again
+				self._forget_drawn_regions()
+				self._status_line_dirty = True
 
-				# Clamping the index
-				self.current_index = max(min(self.current_index, len(self.current_text)), 0)
+			# Compiles the code in the background once the edits settle, if it was edited or the options changed since the
+			# last request ; only the chunks of the buffer are copied here, the text itself is built by the worker
+			if self.background_compiler is not None:
+				options = self.get_compile_options()
+				if self._background_request != (self.buffer.version, options):
+					self._background_request = (self.buffer.version, options)
+					self.background_compiler.request(self.buffer.snapshot(), options)
 
-			# Displays the current text
+			# Displays the current text, only redrawing the rows that changed
 			# TODO Longer lines
 			self.display_text()
 
-			# Visual stylings, e.g. adds a full line over the input
+			# Visual stylings, e.g. adds a full line over the input ; also refreshes the screen
 			self.apply_stylings()
+			self._last_frame_time = time.monotonic()
 
-			# Screen refresh after input
-			self.stdscr.refresh()
+
+	def read_pending_keys(self, first_key: str) -> list:
+		"""
+		Reads all the keys already waiting to be processed, e.g. when text is pasted into the terminal or a key is held
+		down, so they can be handled with a single redraw. If the last frame is too recent for the maximum frame rate,
+		also waits for more keys until the next frame is due.
+		Stops at the command symbol, as the command reads the next keys itself.
+		:param first_key: The key that was just read.
+		:return: The list of the keys, in order.
+		"""
+		keys = [first_key]
+		next_frame_time = self._last_frame_time + (1 / self.max_fps if self.max_fps > 0 else 0)
+		try:
+			while keys[-1] != self.command_symbol:
+				# Only waits for more keys until the next frame is due
+				self.stdscr.timeout(max(0, math.ceil((next_frame_time - time.monotonic()) * 1000)))
+				keys.append(self.stdscr.getkey())
+		except curses.error:
+			pass  # No key was pending
+		finally:
+			# Switches back to blocking input
+			self.stdscr.timeout(-1)
+		return keys
+
+
+	@staticmethod
+	def _is_text_key(key: str) -> bool:
+		"""
+		Returns whether the key simply adds its character to the text.
+		"""
+		return not (key in ("\b", "\0") or key.startswith("KEY_") or key.startswith("CTL_") or len(key) != 1)
+
+
+	def handle_regular_keys(self, keys: list):
+		"""
+		Handles several regular keys, inserting each run of consecutive characters as a single edit.
+		:param keys: The keys pressed by the user, in order.
+		"""
+		i = 0
+		while i < len(keys):
+			# Finds the run of characters starting at this key
+			run_end = i + 1
+			if self._is_text_key(keys[i]):
+				while run_end < len(keys) and self._is_text_key(keys[run_end]):
+					run_end += 1
+
+			# Handles the input as regular keys
+			if not self.input_locked:
+				if run_end - i > 1:
+					self.add_char_to_text("".join(keys[i:run_end]))
+				else:
+					self.handle_regular_key(keys[i])
+
+			# Calls the plugins update_on_keypress function
+			for key in keys[i:run_end]:
+				for plugin in self.plugins.values():
+					if hasattr(plugin[1], "update_on_keypress"):
+						plugin[1].update_on_keypress(key)
+
+			# Clamping the index
+			self.current_index = max(min(self.current_index, len(self.buffer)), 0)
+			i = run_end
 
 
 	def handle_regular_key(self, key: str):
@@ -259,64 +425,50 @@ class App:
 		:param key: The key pressed by the user.
 		"""
 		# If the key IS a backspace character, we remove the last character from the text
-		if key in ("\b", "\0") or key.startswith("KEY_") or key.startswith("CTL_") or len(key) != 1:
+		if not self._is_text_key(key):
 			if key in ("KEY_BACKSPACE", "\b", "\0"):
 				if self.current_index > 0:
-					# Makes the action undoable
-					self.undo_actions.append(
-						{
-							"action_type": "removed_char",
-							"char": self.current_text[self.current_index - 1],
-							"index": self.current_index - 1,
-							"adder": 0
-						}
-					)
 					# Removes the character from the text
-					self.current_text = self.current_text[:self.current_index - 1] + self.current_text[
-					                                                                 self.current_index:]
+					removed_char = self.buffer.delete(self.current_index - 1, self.current_index)
+					# Makes the action undoable
+					self.undo_actions.append(UndoAction(
+						"removed_char", self.current_index - 1, removed_char, "", self.current_index, self.current_index - 1
+					))
 					self.current_index -= 1
 			elif key == "KEY_DC":  # Delete key
-				if self.current_index < len(self.current_text):
-					# Makes the action undoable
-					self.undo_actions.append(
-						{
-							"action_type": "removed_char",
-							"char": self.current_text[self.current_index],
-							"index": self.current_index,
-							"adder": 0
-						}
-					)
+				if self.current_index < len(self.buffer):
 					# Removes the character from the text
-					self.current_text = self.current_text[:self.current_index] + self.current_text[
-					                                                             self.current_index + 1:]
+					removed_char = self.buffer.delete(self.current_index, self.current_index + 1)
+					# Makes the action undoable
+					self.undo_actions.append(UndoAction(
+						"removed_char", self.current_index, removed_char, "", self.current_index, self.current_index
+					))
 			elif key in ("KEY_UP", "KEY_DOWN"):
-				text = self.current_text + "\n"
-				indexes = tuple(index for index in range(len(text)) if text.startswith('\n', index))
-				closest_index = min(indexes, key=lambda x: abs(x - self.current_index))
-				closest_index = indexes.index(closest_index)
-				closest_index = closest_index + (-1) ** (key == "KEY_UP")
-				try:
-					if closest_index <= 0:
-						if "\n" in self.current_text:
-							self.current_index = self.current_text.index("\n")
-						else:
-							self.current_index = len(self.current_text)
-					else:
-						self.current_index = indexes[closest_index]
-				except IndexError:
-					pass
+				# Finds the end of the line closest to the cursor, either the current one or the previous one
+				current_row = self.buffer.position_of(self.current_index)[0]
+				closest_row = current_row
+				if current_row > 0 and \
+						self.current_index - self.buffer.line_end(current_row - 1) <= self.buffer.line_end(current_row) - self.current_index:
+					closest_row = current_row - 1
+
+				# Moves the cursor to the end of the line above or below it
+				closest_row = closest_row + (-1) ** (key == "KEY_UP")
+				if closest_row <= 0:
+					self.current_index = self.buffer.line_end(0)
+				elif closest_row < self.buffer.line_count:
+					self.current_index = self.buffer.line_end(closest_row)
 			elif key == "KEY_LEFT":
 				self.current_index -= 1
 			elif key == "KEY_RIGHT":
 				self.current_index += 1
 			elif key == "CTL_LEFT":
 				self.current_index -= 1
-				while self.current_index >= 0 and self.current_text[self.current_index] in string.ascii_letters:
+				while self.current_index >= 0 and self.buffer.char_at(self.current_index) in string.ascii_letters:
 					self.current_index -= 1
 			elif key == "CTL_RIGHT":
 				self.current_index += 1
-				while self.current_index < len(self.current_text) and self.current_text[
-					self.current_index] in string.ascii_letters:
+				while self.current_index < len(self.buffer) and self.buffer.char_at(
+					self.current_index) in string.ascii_letters:
 					self.current_index += 1
 			elif key == "KEY_NPAGE":
 				self.min_display_line -= 1
@@ -328,8 +480,10 @@ class App:
 					self.min_display_line = self.lines - 1
 			elif key == "KEY_F(1)":
 				self.commands["h"][0]()
+				self._forget_drawn_regions()
 			elif key == "KEY_F(4)":
 				self.commands["q"][0]()
+				self._forget_drawn_regions()
 			elif key == "KEY_SEND":  # The key used to type '<', for some reason
 				self.add_char_to_text("<")
 			elif key == "CTL_END":  # The key used to type '>', for some reason
@@ -396,18 +550,13 @@ class App:
 		:param function: A function to call (a command).
 		:param key: The prefix of the command.
 		"""
-		try:
-			# Remembering the current state of the text so the command can be undone
-			# However, not doing this if this is the undo command
-			if key != "z":
-				self.undo_actions.append(
-					{
-						"action_type": "command",
-						"current_text": self.current_text,
-						"current_index": self.current_index
-					}
-				)
+		# Remembering the current state of the text so the changes of the command can be found afterwards
+		text_before, index_before = self.current_text, self.current_index
+		last_action_before = self.undo_actions[-1] if self.undo_actions else None
+		# The edits made by the command must not be merged into the last action
+		self.undo_actions.close_group()
 
+		try:
 			# Actually launching the command
 			function()
 
@@ -421,8 +570,25 @@ class App:
 			self.log(e)
 			print_exception(e)
 			# We also undo the action just in case
-			if key != "z":
-				self.undo()
+			if key not in ("z", "y"):
+				self.undo_actions.discard_after(last_action_before)
+				self.current_text, self.current_index = text_before, index_before
+				self.request_full_redraw()
+			return None
+
+		# Makes the command undoable, unless this is the undo or redo command
+		if key not in ("z", "y"):
+			# The undo actions added by the command itself are replaced by the action of the whole command
+			self.undo_actions.discard_after(last_action_before)
+
+			# Only stores the part of the text that was changed by the command ; a command that did not change the text
+			# (compiling, toggling an option...) leaves the history and the actions to redo as they were
+			start, old_end, new_end = find_text_difference(text_before, self.current_text)
+			if old_end != start or new_end != start:
+				self.undo_actions.append(UndoAction(
+					"command", start, text_before[start:old_end], self.current_text[start:new_end], index_before,
+					self.current_index
+				))
 
 
 	def _init_plugins(self):
@@ -435,6 +601,8 @@ class App:
 				if not plugin[1].was_initialized:
 					plugin[1].init()
 					plugin[1].was_initialized = True
+					# The plugin might have changed the keywords
+					self.invalidate_keywords()
 			# Writes a message to the screen showing all imported plugins
 			self.stdscr.addstr(
 				self.rows - 4 - i,
@@ -459,48 +627,11 @@ class App:
 		"""
 		Loads the base compilers.
 		"""
-		self.compilers["algorithmic"] = AlgorithmicCompiler(
-			{
-				"for": "Pour",
-				"if": "Si",
-				"while": "Tant Que",
-				"switch": "Selon",
-				"arr": "Tableau",
-				"case": "Cas",
-				"default": "Autrement",
-				"fx": "Fonction",
-				"proc": "Procédure",
-				"const": "Constante"
-			},
-			{
-				"int": "Entier",
-				"float": "Réel",
-				"string": "Chaîne de caractères",
-				"bool": "Booléen",
-				"char": "Caractère"
-			},
-			["print", "input", "end", "elif", "else", "fx_start", "vars", "precond", "data", "datar", "result",
-			 "return", "desc", "CODE_RETOUR", "init", "struct", "const", "delete"],
-			self.stdscr,
-			self.translations,
-			self.get_translation,
-			self,
-			self.tab_char
-		)
-		self.compilers["C++"] = CppCompiler(
-			('for', 'if', 'while', 'switch', 'arr', 'case', 'default', 'fx', 'proc', 'struct'),
-			{
-				"int": "int",
-				"float": "float",
-				"string": "std::string",
-				"bool": "bool",
-				"char": "char"
-			},
-			["print", "input", "end", "elif", "else", "fx_start", "vars", "precond", "data", "datar", "result",
-			 "return", "desc", "CODE_RETOUR", "init", "const", "delete"],
-			self.stdscr,
-			self
-		)
+		self.compilers.update(create_compilers(self.get_compile_options(), self.translations))
+
+		# Both compilers share the same cache, as the backend is part of its keys
+		for compiler in self.compilers.values():
+			compiler.cache = self.compile_cache
 
 	def _on_crash_recover(self):
 		"""
@@ -529,8 +660,25 @@ class App:
 		os.remove(CRASH_FILE_PATH)
 
 
+	@property
+	def current_text(self) -> str:
+		"""
+		The text being displayed in the window, materialised from the buffer.
+		Editing it through self.buffer is much faster than reassigning it.
+		"""
+		return self.buffer.text
+
+
+	@current_text.setter
+	def current_text(self, value: str):
+		self.buffer.set_text(value)
+
+
 	@property
 	def color_control_flow_fused(self):
+		"""
+		Kept for compatibility ; use keyword_colors instead, which is not rebuilt on each access.
+		"""
 		return [
 			*self.color_control_flow["statement"],
 			*self.color_control_flow["function"],
@@ -538,6 +686,64 @@ class App:
 		]
 
 
+	@property
+	def keyword_colors(self) -> MappingProxyType:
+		"""
+		A read-only dictionary giving the name of the color pair of each keyword.
+		It is built once from color_control_flow, and only rebuilt after a call to invalidate_keywords().
+		"""
+		if self._keyword_colors is None:
+			self._build_keyword_tables()
+		return self._keyword_colors
+
+
+	@property
+	def variable_types(self) -> frozenset:
+		"""
+		The set of the basic variable types, built along with keyword_colors.
+		"""
+		if self._variable_types is None:
+			self._build_keyword_tables()
+		return self._variable_types
+
+
+	def _build_keyword_tables(self):
+		"""
+		Builds the keyword colors lookup table and the set of variable types from color_control_flow.
+		"""
+		keyword_colors = {}
+		# The later colors take precedence if a keyword is in several of them
+		for color in ("variable", "instruction", "function", "statement"):
+			for keyword in self.color_control_flow[color]:
+				keyword_colors[keyword] = color
+		self._keyword_colors = MappingProxyType(keyword_colors)
+		self._variable_types = frozenset(self.color_control_flow["variable"])
+
+
+	def invalidate_keywords(self):
+		"""
+		Forces the keyword lookup tables and the syntax highlighting cache to be rebuilt.
+		Has to be called after color_control_flow is modified.
+		"""
+		self._keyword_colors = None
+		self._variable_types = None
+		self._highlight_cache.clear()
+		self.request_full_redraw()
+
+
+	def register_keyword(self, keyword: str, color: str):
+		"""
+		Adds a new keyword to the syntax highlighting.
+		:param keyword: The keyword to highlight.
+		:param color: The color of the keyword ; one of 'statement', 'function', 'variable' or 'instruction'.
+		"""
+		if color not in self.color_control_flow:
+			raise ValueError(f"Unknown keyword color : {color}")
+		if keyword not in self.color_control_flow[color]:
+			self.color_control_flow[color] = (*self.color_control_flow[color], keyword)
+		self.invalidate_keywords()
+
+
 	def _declare_color_pairs(self):
 		"""
 		Declares all the curses color pairs based on the theme.
@@ -645,22 +851,24 @@ class App:
 		# Remembers if an action was undone for later
 		undone_action = False
 
+		# Puts back the text replaced by the action
+		if isinstance(last_action, UndoAction):
+			self.buffer.delete(last_action.index, last_action.index + len(last_action.added_text))
+			self.buffer.insert(last_action.index, last_action.removed_text)
+			self.current_index = last_action.cursor_before
+			undone_action = True
+
+		# Otherwise, it is an action pushed as a dict by a plugin
 		# If the last action is a character addition
-		if last_action["action_type"] == "added_char":
-			self.current_text = self.current_text[:last_action["index"]] + \
-									self.current_text[last_action["index"] + len(last_action["char"]):]
+		elif last_action["action_type"] == "added_char":
+			self.buffer.delete(last_action["index"], last_action["index"] + len(last_action["char"]))
 			# Also refreshes the screen
 			undone_action = True
 
 		# If the last action was to remove a character, we add it back
 		elif last_action["action_type"] == "removed_char":
 			# Inserting the character back into the text
-			current_text = list(self.current_text)
-			current_text.insert(
-				last_action["index"], last_action["char"]
-			)
-			current_text = "".join(current_text)
-			self.current_text = current_text
+			self.buffer.insert(last_action["index"], last_action["char"])
 
 			# Putting the cursor back to where the character was
 			self.current_index = last_action["index"] + last_action["adder"]
@@ -685,10 +893,28 @@ class App:
 
 		# Refreshes the screen
 		if undone_action:
-			self.stdscr.clear()
+			self.request_full_redraw()
 			self.display_text()
 
 
+	def redo(self):
+		"""
+		Redoes the last undone action.
+		"""
+		# Gets the last undone action, if there is one
+		action = self.undo_actions.pop_redo()
+		if action is None: return None
+
+		# Replaces the text again
+		self.buffer.delete(action.index, action.index + len(action.removed_text))
+		self.buffer.insert(action.index, action.added_text)
+		self.current_index = action.cursor_after
+
+		# Refreshes the screen
+		self.request_full_redraw()
+		self.display_text()
+
+
 	def quit(self, force_quit: bool = False, auto_quicksave: bool = False) -> None:
 		"""
 		Exits the app.
@@ -741,90 +967,215 @@ class App:
 		return len(str(self.lines)) + 1 + self.left_placement_shift
 
 
+	def request_full_redraw(self):
+		"""
+		Makes the next frame clear the screen and redraw everything, e.g. after a resize or a theme reload.
+		Plugins drawing outside of update_on_syntax_highlight can call it to get rid of what they drew.
+		"""
+		self._full_redraw = True
+
+
+	def _forget_drawn_regions(self):
+		"""
+		Forgets what was drawn on the screen, so every region is drawn again on the next frame, without clearing
+		the screen first.
+		"""
+		self._drawn_rows.clear()
+		self._drawn_footer = None
+		if self.preview is not None:
+			self.preview.forget_drawn_rows()
+
+
+	def _plugins_draw_on_keypress(self) -> bool:
+		"""
+		Returns whether a loaded plugin may draw on the screen when a key is pressed, in which case the screen has
+		to be erased before each keypress like it used to.
+		"""
+		from plugin import Plugin  # Note : A bit dirty to put an import here, but required for it to work
+		return any(
+			len(plugin) > 1
+			and type(plugin[1]).update_on_keypress is not Plugin.update_on_keypress
+			and getattr(plugin[1], "needs_full_redraw", True)
+			for plugin in self.plugins.values()
+		)
+
+
 	def display_text(self):
 		"""
 		Displays the text in current_text.
+		Only the rows whose content, line number, cursor or scrollbar changed since the last frame are redrawn.
 		"""
 		# Calculates the size of the line numbers
 		self.calculate_line_numbers()
 
+		# Clears the screen if a full redraw was requested
+		if self._full_redraw:
+			self.stdscr.clear()
+			self._forget_drawn_regions()
+			self._full_redraw = False
+
 		# Gets the position of the cursor on the window
+		cursor_row, cursor_column = self.buffer.position_of(self.current_index)
 		self.cur = (
-			self.current_text[:self.current_index].count('\n') - self.min_display_line + self.top_placement_shift,
-			self.current_index - (self.current_text[:self.current_index].rfind('\n')) + self.get_lineno_length() - 1,
-			self.current_text[self.current_index]
+			cursor_row - self.min_display_line + self.top_placement_shift,
+			cursor_column + self.get_lineno_length(),
+			self.buffer.char_at(self.current_index)
 				if
-					self.current_index < len(self.current_text)  # If the current index is after the end of the text
-					and self.current_text[self.current_index].isprintable()  # Or if the character is not printable
+					self.current_index < len(self.buffer)  # If the current index is after the end of the text
+					and self.buffer.char_at(self.current_index).isprintable()  # Or if the character is not printable
 				else
 			" "
 		)
-		for i, line in enumerate(
-				self.current_text.split("\n")[self.min_display_line:self.min_display_line + (self.rows - 3) - self.top_placement_shift]
-		):
-			line = line[self.min_display_char:]
-			# Getting the splitted line for syntax highlighting
-			splitted_line = line.split(" ")
-
-			# Writing the line to the screen
-			if self.get_lineno_length() + len(line) < self.cols - self.left_placement_shift - 1:  # -1 is for the scrollbar
-				# If the line's length does not overflow off the screen, we write it entirely
-				self.stdscr.addstr(i + self.top_placement_shift, self.get_lineno_length(), line)
-			else:
-				# If the line's length overflows off the screen, we write only the part that stays in the screen
-				self.stdscr.addstr(i + self.top_placement_shift, self.get_lineno_length(), line[:self.cols - self.get_lineno_length() - self.left_placement_shift])
 
-			# Tests the beginning of the line to add a color, syntax highlighting
-			self.syntax_highlighting(line, splitted_line, i)
+		# Only fetches the visible lines from the buffer
+		visible_rows = (self.rows - 3) - self.top_placement_shift
+		visible_lines = self.buffer.lines(self.min_display_line, self.min_display_line + visible_rows)
+		scrollbar_rows = self.calculate_scrollbar()
+		editor_width = self.get_editor_width()
+		for i in range(max(visible_rows, 0)):
+			screen_row = i + self.top_placement_shift
+			line = visible_lines[i] if i < len(visible_lines) else None
+
+			# Skips the row if it is drawn exactly the same way as last frame
+			row_state = (
+				line, self.min_display_line + i, self.min_display_line + i in self.marked_lines,
+				self.cur[1] if self.cur[0] == screen_row else None, screen_row in scrollbar_rows,
+				self.get_lineno_length(), self.left_placement_shift, self.min_display_char, editor_width
+			)
+			if self._drawn_rows.get(screen_row) == row_state:
+				continue
+			self._drawn_rows[screen_row] = row_state
 
-			# Calls the plugins update_on_syntax_highlight function
-			for plugin_name, plugin in tuple(self.plugins.items()):
-				if len(plugin) > 1:
-					if hasattr(plugin[1], "update_on_syntax_highlight"):
-						plugin[1].update_on_syntax_highlight(line, splitted_line, i)
-				else:
-					del self.plugins[plugin_name]
+			# Erases the row, then draws it again
+			self.stdscr.move(screen_row, self.left_placement_shift)
+			self.stdscr.clrtoeol()
+			if line is not None:
+				self._display_line(line, i)
+
+			# Draws the part of the scrollbar on this row
+			if screen_row in scrollbar_rows:
+				try:
+					self.stdscr.addstr(screen_row, editor_width - 1, " ", curses.A_REVERSE)
+				except curses.error:
+					pass
 
 		# Placing cursor
-		if 0 <= self.cur[1] < self.cols and 0 <= self.cur[0] < self.rows - 3:
+		if 0 <= self.cur[1] < editor_width and 0 <= self.cur[0] < self.rows - 3:
 			try:
 				self.stdscr.addstr(*self.cur, curses.A_REVERSE)
 			except curses.error:
 				pass
 
+		# Shows the compiled code of the visible lines next to them
+		self.display_preview()
+
+
+	def get_editor_width(self) -> int:
+		"""
+		Returns the amount of columns the text takes, on the left of the preview if it is shown.
+		"""
+		if self.preview is None:
+			return self.cols
+		return self.cols - self.cols // 2
+
+
+	def display_preview(self):
+		"""
+		Shows the last code compiled in the background in the preview, following the line of the cursor.
+		"""
+		if self.preview is None or self.background_compiler is None:
+			return None
+
+		# Creates the window of the preview again if the terminal was resized
+		geometry = (
+			max(self.rows - 3 - self.top_placement_shift, 1), max(self.cols - self.get_editor_width(), 1),
+			self.top_placement_shift, self.get_editor_width()
+		)
+		if geometry != self._preview_geometry:
+			self._preview_geometry = geometry
+			self.preview.set_window(curses.newwin(*geometry))
+
+		# Shows the compiled code of the cursor's line on the same row as the cursor
+		self.preview.set_result(self.background_compiler.result)
+		cursor_row = self.buffer.position_of(self.current_index)[0]
+		self.preview.follow(cursor_row, cursor_row - self.min_display_line)
+		self.preview.draw()
+
+
+	def _display_line(self, line: str, i: int):
+		"""
+		Draws the given line along with its line number, and applies the syntax highlighting.
+		:param line: The line to draw.
+		:param i: The index of the line in the window.
+		"""
+		line = line[self.min_display_char:]
+		# Getting the splitted line for syntax highlighting
+		splitted_line = line.split(" ")
+
+		# Writing the line to the screen with its syntax highlighting
+		self.syntax_highlighting(line, splitted_line, i)
+
+		# Calls the plugins update_on_syntax_highlight function
+		for plugin_name, plugin in tuple(self.plugins.items()):
+			if len(plugin) > 1:
+				if hasattr(plugin[1], "update_on_syntax_highlight"):
+					plugin[1].update_on_syntax_highlight(line, splitted_line, i)
+			else:
+				del self.plugins[plugin_name]
+
+		# Puts the line number at the edge of the screen
+		style = curses.A_REVERSE
+		if self.min_display_line + i in self.marked_lines:  # Gives the line a different color if it marked
+			style |= curses.color_pair(self.color_pairs["statement"])
+		self.stdscr.addstr(
+			i + self.top_placement_shift, self.left_placement_shift,
+			str(self.min_display_line + i + 1).zfill(len(str(self.lines))), style
+		)
+
 
 	def apply_stylings(self) -> None:
 		"""
-		Apply all the stylings to the screen.
+		Apply all the stylings to the screen, then refreshes it.
+		The footer is only redrawn if it changed since the last frame.
 		"""
-		# Applies the bar at the bottom of the screen
-		try:
-			self.stdscr.addstr(self.rows - 3, 0, "▓" * self.cols)
-		except curses.error: pass
+		background_status = self.get_background_status()
+		footer_state = (
+			self.rows, self.cols, self.command_symbol,
+			tuple((key_name, name, hidden) for key_name, (_, name, hidden) in self.commands.items()),
+			background_status
+		)
+		if footer_state != self._drawn_footer:
+			self._drawn_footer = footer_state
 
-		# Adds the commands list at the bottom of the screen
-		self.display_commands_list()
+			# Applies the bar at the bottom of the screen
+			try:
+				self.stdscr.addstr(self.rows - 3, 0, "▓" * self.cols)
+			except curses.error: pass
 
-		# Calculates the scrollbar
-		self.calculate_scrollbar()
+			# Shows the status of the background compilation on the right of the bar
+			if background_status:
+				background_status = f" {background_status} "[:self.cols - 2]
+				self.stdscr.addstr(self.rows - 3, self.cols - len(background_status) - 1, background_status)
 
-		# Gets the amount of lines in the text
-		self.calculate_line_numbers()
-		# Puts the line numbers at the edge of the screen
-		for i in range(self.min_display_line, min(self.lines, self.min_display_line + (self.rows - 3) - self.top_placement_shift)):
-			style = curses.A_REVERSE
-			if i in self.marked_lines:  # Gives the line a different color if it marked
-				style |= curses.color_pair(self.color_pairs["statement"])
-			self.stdscr.addstr(i - self.min_display_line + self.top_placement_shift, self.left_placement_shift, str(i + 1).zfill(len(str(self.lines))), style)
+			# Adds the commands list at the bottom of the screen
+			self.stdscr.move(self.rows - 2, 0)
+			self.stdscr.clrtoeol()
+			self.display_commands_list()
 
-		self.stdscr.refresh()
+		# Sends all the changes to the terminal at once, with the preview on top of the editor
+		self.stdscr.noutrefresh()
+		if self.preview is not None and self._preview_geometry is not None:
+			self.preview.refresh()
+		curses.doupdate()
 
 
-	def calculate_scrollbar(self):
+	def calculate_scrollbar(self) -> set:
 		"""
-		Calculate and display the scrollbar.
+		Calculate the scrollbar.
+		:return: The set of the rows of the screen on which the scrollbar is displayed.
 		"""
-		total_lines_of_code = self.current_text.count("\n")
+		scrollbar_rows = set()
+		total_lines_of_code = self.buffer.line_count - 1
 		scrollbar_max_height = self.rows - 3 - self.top_placement_shift
 		if total_lines_of_code > scrollbar_max_height:
 			scrollbar_height = int(scrollbar_max_height / total_lines_of_code * scrollbar_max_height)
@@ -832,12 +1183,8 @@ class App:
 				self.min_display_line / total_lines_of_code * scrollbar_max_height)
 			for i in range(scrollbar_height):
 				if scrollbar_pos + i < self.rows - 3:
-					self.stdscr.addstr(
-						scrollbar_pos + i,
-						self.cols - 1,
-						" ",
-						curses.A_REVERSE
-					)
+					scrollbar_rows.add(scrollbar_pos + i)
+		return scrollbar_rows
 
 	def display_commands_list(self):
 		"""
@@ -882,6 +1229,9 @@ class App:
 			for pair_name, fallback_value in self.color_pairs.items()
 		}
 		self._declare_color_pairs()
+		# Redraws the whole screen with the new colors
+		self.invalidate_keywords()
+		self.display_text()
 		# Adds a message at the bottom to warn the theme was reloaded
 		self.stdscr.addstr(self.rows - 1, 4, self.get_translation("theme_reloaded"))
 
@@ -943,7 +1293,7 @@ class App:
 		Calculates the amount of lines in the text.
 		Saves it into the correct variable and returns it.
 		"""
-		self.lines = self.current_text.count("\n") + 1
+		self.lines = self.buffer.line_count
 		return self.lines
 
 
@@ -986,16 +1336,12 @@ class App:
 		:param key: A character to add to the text.
 		"""
 		# Remembers the action as an undoable action
-		self.undo_actions.append(
-			{
-				"action_type": "added_char",
-				"char": key,
-				"index": self.current_index
-			}
-		)
+		self.undo_actions.append(UndoAction(
+			"added_char", self.current_index, "", key, self.current_index, self.current_index + len(key)
+		))
 
 		# Adds the given character to the text
-		self.current_text = self.current_text[:self.current_index] + key + self.current_text[self.current_index:]
+		self.buffer.insert(self.current_index, key)
 		self.current_index += len(key)
 
 
@@ -1027,13 +1373,14 @@ class App:
 		"""
 		if not name: return False
 		if not self.use_ptrs_and_malloc and name[-1] == '*': return False
-		if name[-1] != '*': return name in self.color_control_flow["variable"]
-		else: return name[:-1] in self.color_control_flow["variable"]
+		if name[-1] != '*': return name in self.variable_types
+		else: return name[:-1] in self.variable_types
 
 
 	def syntax_highlighting(self, line, splitted_line, i):
 		"""
-		Creates a syntax highlighting for the given line.
+		Draws the given line with its syntax highlighting, using one call to addstr per run of color.
+		The runs of color of each line are cached, so an unchanged line is not tokenized again.
 		:param line: The line to use for parsing.
 		:param splitted_line: A split version of the line (split on spaces)
 		:param i: The index of the line in the window.
@@ -1041,358 +1388,257 @@ class App:
 		# Caches the amount of needed spaces on the left side of the screen
 		minlen = self.get_lineno_length()
 		mintop = i + self.top_placement_shift
-
-		# Colors the statement
-		start_statement = splitted_line[0]
-		if start_statement in self.color_control_flow_fused or self._type_in_var_types(start_statement):
-			if start_statement in self.color_control_flow["statement"]:
-				c_pair = "statement"
-			elif start_statement in self.color_control_flow["function"]:
-				c_pair = "function"
-			elif start_statement in self.color_control_flow["instruction"]:
-				c_pair = "instruction"
+		max_column = self.get_editor_width() - self.left_placement_shift
+
+		# Fetches the runs of the line from the cache, or computes them
+		cache_key = (line, self.use_ptrs_and_malloc, tuple(self.color_pairs.items()))
+		runs = self._highlight_cache.get(cache_key)
+		if runs is None:
+			runs = self._compute_highlight_runs(line, splitted_line)
+			self._highlight_cache[cache_key] = runs
+			# Evicts the least recently used line if the cache is full
+			if len(self._highlight_cache) > SYNTAX_HIGHLIGHT_CACHE_SIZE:
+				self._highlight_cache.popitem(last=False)
+		else:
+			self._highlight_cache.move_to_end(cache_key)
+
+		# Writes each run of the line with its color, stopping at the edge of the screen
+		for column, text, flag in runs:
+			if minlen + column >= max_column:
+				break
+			if flag is None:
+				self.stdscr.addstr(mintop, minlen + column, text[:max_column - minlen - column])
 			else:
-				c_pair = "variable"
-			# Overwrites the beginning of the line with the given color if possible
-			self.stdscr.addstr(mintop, minlen, start_statement, curses.color_pair(self.color_pairs[c_pair]))
-			if start_statement[-1] == '*':
-				self.stdscr.addstr(
-					mintop, minlen + len(start_statement) - 1,
-					'*', curses.color_pair(self.color_pairs["statement"])
-				)
+				self.stdscr.addstr(mintop, minlen + column, text[:max_column - minlen - column], flag)
 
-		# Finds all '[' and ']' signs and gives them the statement color
-		for current_symbol in '[]':
-			symbol_indexes = tuple(i for i, ltr in enumerate(line) if ltr == current_symbol)
-			for index in symbol_indexes:
-				if minlen + index < self.cols - 1:
-					self.stdscr.addstr(
-						mintop,
-						minlen + index, line[index],
-						curses.color_pair(self.color_pairs["statement"])
-					)
-
-		# Finds all strings between quotes (single or double) and highlights them green
-		quotes_indexes = tuple(i for i, ltr in enumerate(line) if ltr == "\"")
-		for j, index in enumerate(quotes_indexes):
-			if j % 2 == 0:
-				try:
-					self.stdscr.addstr(
-						mintop,
-						minlen + index, line[index:quotes_indexes[j + 1] + 1],
-						curses.color_pair(self.color_pairs["strings"] if "=" not in splitted_line[1] else 5)
-					)
-				except IndexError:
-					if len(splitted_line) > 1:
-						self.stdscr.addstr(
-							mintop,
-							minlen + index, line[index:],
-							curses.color_pair(self.color_pairs["strings"] if "=" not in splitted_line[1] else 5)
-						)
-				except curses.error: pass
-
-		# Finds all equal signs to highlight them in statement color
-		try:
-			if "=" in splitted_line[1]:
-				self.stdscr.addstr(
-					mintop, minlen + 1 + len(splitted_line[0]),
-					splitted_line[1],
-					curses.color_pair(self.color_pairs["statement"])
-				)
 
-				# Adds support for the new keyword
-				if self.use_ptrs_and_malloc and splitted_line[2] == "new":
-					self.stdscr.addstr(
-						mintop, minlen + sum(len(e) + 1 for e in splitted_line[:2]),
-						"new",
-						curses.color_pair(self.color_pairs["statement"])
-					)
-
-					# Adds a way to highlight if the variable is a standard variable type
-					if "[" in splitted_line[3]:
-						var_type = splitted_line[3].split("[")[0]
-					else:
-						var_type = splitted_line[3]
-
-					if self._type_in_var_types(var_type):
-						self.stdscr.addstr(
-							mintop, minlen + sum(len(e) + 1 for e in splitted_line[:3]),
-							var_type,
-							curses.color_pair(self.color_pairs["variable"])
-						)
-						if var_type[-1] == '*':
-							self.stdscr.addstr(
-								mintop, minlen + sum(len(e) + 1 for e in splitted_line[:3]) + len(var_type) - 1,
-								'*',
-								curses.color_pair(self.color_pairs["statement"])
-							)
-
-			elif self._type_in_var_types(splitted_line[0]) and splitted_line[2] == "=":
-				self.stdscr.addstr(
-					mintop, minlen + sum(len(e) + 1 for e in splitted_line[:2]),
-					"=",
-					curses.color_pair(self.color_pairs["statement"])
-				)
+	def _compute_highlight_runs(self, line: str, splitted_line: list) -> list:
+		"""
+		Computes the syntax highlighting of the given line, in a single pass over its tokens.
+		The rules applying to words (the statement, the types, the instructions' parameters...) first give a few
+		segments of color. Then the line is split once from left to right into tokens (quotes, brackets, '&', built-in
+		function calls, and the text in between), and each token takes the color of the segment it is in or its own,
+		whichever has the highest priority. The runs are emitted as the tokens are read, merging the consecutive tokens
+		of the same color.
+		:param line: The line to use for parsing.
+		:param splitted_line: A split version of the line (split on spaces)
+		:return: A list of non-overlapping tuples (column, text, curses attribute) covering the whole line.
+			The attribute is None for the parts of the line drawn with the default color.
+		"""
+		statement_color = curses.color_pair(self.color_pairs["statement"])
+		# The strings are only colored if the line has several words, and in another color for assignations
+		strings_color = None
+		if len(splitted_line) > 1:
+			strings_color = curses.color_pair(self.color_pairs["strings"] if "=" not in splitted_line[1] else 5)
+		# The priority and color of each kind of token
+		token_colors = {
+			"ampersand": (HIGHLIGHT_PRIORITIES["ampersand"], statement_color),
+			"builtin": (HIGHLIGHT_PRIORITIES["builtin"], curses.color_pair(self.color_pairs["special_string"])),
+			"string": (HIGHLIGHT_PRIORITIES["string"], strings_color),
+			"bracket": (HIGHLIGHT_PRIORITIES["bracket"], statement_color),
+			"text": (0, None)
+		}
 
-				# Adds support for the new keyword
-				if self.use_ptrs_and_malloc and splitted_line[3] == "new" and splitted_line[0][-1] == '*':
-					self.stdscr.addstr(
-						mintop, minlen + sum(len(e) + 1 for e in splitted_line[:3]),
-						"new",
-						curses.color_pair(self.color_pairs["statement"])
-					)
-
-					# Adds a way to highlight if the variable is a standard variable type
-					if "[" in splitted_line[4]:
-						var_type = splitted_line[4].split("[")[0]
+		# Gets the segments of color given by the words ; they can go past the end of the line, which is then extended
+		segments, line_length = self._get_highlight_segments(splitted_line)
+		text = line.ljust(line_length)
+
+		runs = []
+		segment_index = 0  # The index of the first segment not ending before the current token
+		in_string = False  # Whether the current token is between quotes
+
+		for match in HIGHLIGHT_TOKEN_REGEX.finditer(text):
+			kind = match.lastgroup
+			start, token_end = match.span()
+
+			# Gets the color of the token itself ; the quotes are part of the string they open or close, and the
+			# extension of the line is never in a string
+			if kind == "quote":
+				in_string = not in_string
+				token_priority, token_color = token_colors["string" if strings_color is not None else "text"]
+			elif in_string and strings_color is not None and start < len(line) and kind in ("text", "bracket"):
+				token_priority, token_color = token_colors["string"]
+			else:
+				token_priority, token_color = token_colors[kind]
+
+			# Splits the token where segments start or end
+			while start < token_end:
+				while segment_index < len(segments) and segments[segment_index][1] <= start:
+					segment_index += 1
+
+				# Inside a segment, takes its color if it has a higher priority than the token
+				if segment_index < len(segments) and segments[segment_index][0] <= start:
+					segment_start, segment_end, priority, color, replacement = segments[segment_index]
+					end = min(token_end, segment_end)
+					if priority > token_priority:
+						part = text[start:end] if replacement is None else replacement
 					else:
-						var_type = splitted_line[4]
-
-					if self._type_in_var_types(var_type):
-						self.stdscr.addstr(
-							mintop, minlen + sum(len(e) + 1 for e in splitted_line[:4]),
-							var_type,
-							curses.color_pair(self.color_pairs["variable"])
-						)
-						if var_type[-1] == '*':
-							self.stdscr.addstr(
-								mintop, minlen + sum(len(e) + 1 for e in splitted_line[:4]) + len(var_type) - 1,
-								'*',
-								curses.color_pair(self.color_pairs["statement"])
-							)
-
-
-		except IndexError:
-			pass  # If there is no space in the line
-
-		# Finds all '&' signs and gives them the statement color
-		symbol_indexes = tuple(i for i, ltr in enumerate(line) if ltr == "&")
-		for index in symbol_indexes:
-			self.stdscr.addstr(
-				mintop,
-				minlen + index, line[index],
-				curses.color_pair(self.color_pairs["statement"])
-			)
+						color, part = token_color, text[start:end]
+
+				# Otherwise takes the color of the token, up to the next segment
+				else:
+					end = token_end if segment_index == len(segments) else min(token_end, segments[segment_index][0])
+					color, part = token_color, text[start:end]
+
+				# Extends the last run if it has the same color
+				if runs and runs[-1][2] == color:
+					runs[-1] = (runs[-1][0], runs[-1][1] + part, color)
+				else:
+					runs.append((start, part, color))
+				start = end
 
+		return runs
 
-		# Function to find all the instances of a substring in a string
-		def find_all(full_string: str, search: str):
+
+	def _get_highlight_segments(self, splitted_line: list) -> tuple:
+		"""
+		Applies the highlighting rules based on the words of the line.
+		:param splitted_line: The line, split on spaces.
+		:return: A tuple (segments, line length). The segments are non-overlapping tuples (column, end column, priority,
+			curses attribute, replacement text or None), sorted by column ; where several rules apply, the rule written
+			last wins. The line length is the length of the line, extended up to the end of the last segment.
+		"""
+		pieces = []
+		# The column of each word
+		columns = [0]
+		for word in splitted_line[:-1]:
+			columns.append(columns[-1] + len(word) + 1)
+
+		def add(column: int, text: str, color_name: str, rule: str, replacement: str = None):
 			"""
-			Finds all instances of a substring in a string.
-			:param full_string: The string to search into.
-			:param search: The string of whom to find all the instances.
-			:return: A generator containing all the indexes of the substring.
+			Gives the color to the text at the given column. An empty text colors nothing, but still extends the line
+			up to its column.
+			:param color_name: The name of the color pair, or None to draw the text without color.
+			:param replacement: The text drawn instead of the line's, if any.
 			"""
-			start = 0
-			while True:
-				start = full_string.find(search, start)
-				if start == -1: return
-				yield start
-				start += len(search)
-
+			pieces.append((
+				column, column + len(text), HIGHLIGHT_PRIORITIES[rule],
+				curses.A_NORMAL if color_name is None else curses.color_pair(self.color_pairs[color_name]),
+				replacement
+			))
 
-		# Finds all instances of built-in functions to color them green
-		for builtin_function in ("puissance", "racine", "aleatoire", "alea", "len"):
-			for builtin_function_index in find_all(line, f"{builtin_function}("):
-				self.stdscr.addstr(
-					mintop, minlen + builtin_function_index,
-					builtin_function,
-					curses.color_pair(self.color_pairs["special_string"])
-				)
+		def add_array_type(column: int, word: str):
+			"""
+			Colors an array type of the form 'arr_<type>_<size>'.
+			"""
+			add(column, "arr", "statement", "instruction")
+			add(column + 3, "_", "function", "instruction", "_")
+			# The type, if the word has one
+			if "_" in word:
+				array_type = word.split("_")[1]
+				add(column + 4, word[4:4 + len(array_type)], "variable", "instruction")
+				add(column + 4 + len(array_type), "_", "function", "instruction", "_")
 
+		# Colors the statement
+		start_statement = splitted_line[0]
+		c_pair = self.keyword_colors.get(start_statement)
+		if c_pair is None and self._type_in_var_types(start_statement):
+			c_pair = "variable"
+		if c_pair is not None:
+			add(0, start_statement, c_pair, "keyword")
+			if start_statement[-1] == '*':
+				add(len(start_statement) - 1, '*', "statement", "keyword")
+
+		# Colors the assignations, and the 'new' keyword along with its type
+		if len(splitted_line) > 1 and "=" in splitted_line[1]:
+			add(columns[1], splitted_line[1], "statement", "assignation")
+			new_index = 2
+		elif len(splitted_line) > 2 and self._type_in_var_types(splitted_line[0]) and splitted_line[2] == "=":
+			add(columns[2], "=", "statement", "assignation")
+			new_index = 3 if splitted_line[0][-1] == '*' else None
+		else:
+			new_index = None
+		if new_index is not None and self.use_ptrs_and_malloc and len(splitted_line) > new_index and \
+				splitted_line[new_index] == "new":
+			add(columns[new_index], "new", "statement", "assignation")
+			if len(splitted_line) > new_index + 1:
+				var_type = splitted_line[new_index + 1].split("[")[0]
+				if self._type_in_var_types(var_type):
+					add(columns[new_index + 1], var_type, "variable", "assignation")
+					if var_type[-1] == '*':
+						add(columns[new_index + 1] + len(var_type) - 1, '*', "statement", "assignation")
 
 		# If the instruction is a function declaration, we highlight each types in the declaration
 		if splitted_line[0] == "fx" and len(splitted_line) > 1:
 			# Highlighting the function's return type; as statement if void or variable otherwise
 			if splitted_line[1] == "void" or self._type_in_var_types(splitted_line[1]):
-				self.stdscr.addstr(
-					mintop, minlen + 3,
-					splitted_line[1],
-					curses.color_pair(self.color_pairs["variable" if splitted_line[1] != "void" else "statement"])
-				)
-
+				add(3, splitted_line[1], "variable" if splitted_line[1] != "void" else "statement", "instruction")
 			# Or if it is a structure
 			elif splitted_line[1].startswith("struct"):
-				self.stdscr.addstr(
-					mintop, minlen + 3,
-					"struct",
-					curses.color_pair(self.color_pairs["instruction"])
-				)
-				self.stdscr.addstr(
-					mintop, minlen + 10,
-					splitted_line[1][7:],
-					curses.color_pair(self.color_pairs["special_string"])
-				)
+				add(3, "struct", "instruction", "instruction")
+				add(10, splitted_line[1][7:], "special_string", "instruction")
 
 			# Highlighting each argument's type
 			for j in range(3, len(splitted_line), 2):
 				if splitted_line[j] == "void" or self._type_in_var_types(splitted_line[1]):
-					self.stdscr.addstr(
-						mintop, minlen + 1 + len(" ".join(splitted_line[:j])),
-						splitted_line[j], curses.color_pair(self.color_pairs["variable"])
-					)
-
-				# If the argument's type is array
+					add(columns[j], splitted_line[j], "variable", "instruction")
 				elif splitted_line[j].startswith("arr"):
-					# Highlighting the array type in red
-					self.stdscr.addstr(
-						mintop, minlen + 1 + len(" ".join(splitted_line[:j])),
-						"arr", curses.color_pair(self.color_pairs["statement"])
-					)
-					# Highlighting the underscore
-					self.stdscr.addstr(
-						mintop, minlen + 1 + len(" ".join(splitted_line[:j])) + 3,
-						"_", curses.color_pair(self.color_pairs["function"])
-					)
-					# Highlighting the var type in yellow
-					try:
-						self.stdscr.addstr(
-							mintop, minlen + 1 + len(" ".join(splitted_line[:j])) + 4,
-							splitted_line[j][4:4 + len(splitted_line[j].split("_")[1])], curses.color_pair(self.color_pairs["variable"])
-						)
-					except IndexError: pass
-					# Highlighting the underscore
-					try:
-						self.stdscr.addstr(
-							mintop, minlen + 1 + len(" ".join(splitted_line[:j])) + 4 + len(splitted_line[j].split("_")[1]),
-							"_", curses.color_pair(self.color_pairs["function"])
-						)
-					except IndexError: pass
-
-				# If the argument is a structure
+					add_array_type(columns[j], splitted_line[j])
 				elif splitted_line[j].startswith("struct"):
-					self.stdscr.addstr(
-						mintop, minlen + 1 + len(" ".join(splitted_line[:j])),
-						"struct", curses.color_pair(self.color_pairs["instruction"])
-					)
-					self.stdscr.addstr(
-						mintop, minlen + 8 + len(" ".join(splitted_line[:j])),
-						splitted_line[j][7:],
-						curses.color_pair(self.color_pairs["special_string"])
-					)
-
+					add(columns[j], "struct", "instruction", "instruction")
+					add(columns[j] + 7, splitted_line[j][7:], "special_string", "instruction")
 
 		# If the instruction is an array, we highlight the array's type and its size
 		elif splitted_line[0] == "arr" and len(splitted_line) > 1:
-			if splitted_line[1] in self.color_control_flow["variable"]:
-				self.stdscr.addstr(
-					mintop, minlen + 4,
-					splitted_line[1],
-					curses.color_pair(self.color_pairs["variable"])
-				)
-
-			if len(splitted_line) > 3:
-				for j in range(3, len(splitted_line)):
-					if splitted_line[j].isdigit():
-						self.stdscr.addstr(
-							mintop, minlen + len(" ".join(splitted_line[:j])) + 1,
-							splitted_line[j],
-							curses.color_pair(self.color_pairs["special_string"])
-						)
+			if splitted_line[1] in self.variable_types:
+				add(4, splitted_line[1], "variable", "instruction")
+			for j in range(3, len(splitted_line)):
+				if splitted_line[j].isdigit():
+					add(columns[j], splitted_line[j], "special_string", "instruction")
 
 		# If the instruction is a constant
 		elif splitted_line[0] == "const" and len(splitted_line) > 1:
-			if splitted_line[1] in self.color_control_flow["variable"]:
-				self.stdscr.addstr(
-					mintop, minlen + 6,
-					splitted_line[1],
-					curses.color_pair(self.color_pairs["variable"])
-				)
-
+			if splitted_line[1] in self.variable_types:
+				add(6, splitted_line[1], "variable", "instruction")
 			if len(splitted_line) > 3 and "=" in splitted_line[3]:
-				self.stdscr.addstr(
-					mintop, minlen + len(" ".join(splitted_line[:3])) + 1,
-					splitted_line[3],
-					curses.color_pair(self.color_pairs["statement"])
-				)# If the instruction is a function declaration, we highlight each types in the declaration
+				add(columns[3], splitted_line[3], "statement", "instruction")
 
-		# If the instruction is a structure
+		# If the instruction is a structure, we highlight its name and the type of each field
 		elif splitted_line[0] == "struct" and len(splitted_line) > 1:
-			# Highlighting the structure's name
-			self.stdscr.addstr(
-				mintop, minlen + 7,
-				splitted_line[1],
-				curses.color_pair(self.color_pairs["special_string"])
-			)
-
-			# Highlighting each argument's type
+			add(7, splitted_line[1], "special_string", "instruction")
 			for j in range(2, len(splitted_line), 2):
-				if splitted_line[j] in self.color_control_flow["variable"]:
-					self.stdscr.addstr(
-						mintop, minlen + 1 + len(" ".join(splitted_line[:j])),
-						splitted_line[j], curses.color_pair(self.color_pairs["variable"])
-					)
-
-				# If the argument's type is array
+				if splitted_line[j] in self.variable_types:
+					add(columns[j], splitted_line[j], "variable", "instruction")
 				elif splitted_line[j].startswith("arr"):
-					# Highlighting the array type in red
-					self.stdscr.addstr(
-						mintop, minlen + 1 + len(" ".join(splitted_line[:j])),
-						"arr", curses.color_pair(self.color_pairs["statement"])
-					)
-					# Highlighting the underscore
-					self.stdscr.addstr(
-						mintop, minlen + 1 + len(" ".join(splitted_line[:j])) + 3,
-						"_", curses.color_pair(self.color_pairs["function"])
-					)
-					# Highlighting the var type in yellow
-					try:
-						self.stdscr.addstr(
-							mintop, minlen + 1 + len(" ".join(splitted_line[:j])) + 4,
-							splitted_line[j][4:4 + len(splitted_line[j].split("_")[1])], curses.color_pair(self.color_pairs["variable"])
-						)
-					except IndexError: pass
-					# Highlighting the underscore
-					try:
-						self.stdscr.addstr(
-							mintop, minlen + 1 + len(" ".join(splitted_line[:j])) + 4 + len(splitted_line[j].split("_")[1]),
-							"_", curses.color_pair(self.color_pairs["function"])
-						)
-					except IndexError: pass
-
+					add_array_type(columns[j], splitted_line[j])
 
-		# If the instruction is a structure initialization
+		# If the instruction is a structure initialization, we highlight the structure type and each argument : the
+		# fields of the structure, the numbers and the strings
 		elif splitted_line[0] == "init" and len(splitted_line) > 1:
-			# Highlighting the structure type
-			self.stdscr.addstr(
-				mintop, minlen + 5,
-				splitted_line[1],
-				curses.color_pair(self.color_pairs["special_string"])
-			)
-
-			# Highlighting each of the arguments if they correspond to a field of the structure, or a number
+			add(5, splitted_line[1], "special_string", "instruction")
 			for j in range(3, len(splitted_line)):
-				# Defining a default flag as being... Well, normal.
-				flag = curses.A_NORMAL
-
-				# Highlighting if the argument is a field of the structure (thus if its index is odd)
 				if j % 2 == 1:
-					# Highlighting as variable
-					flag = curses.color_pair(self.color_pairs["variable"])
-
-				# Highlighting the argument as a statement if it is a number
+					color_name = "variable"
 				elif splitted_line[j].isdigit():
-					flag = curses.color_pair(self.color_pairs["statement"])
-
-				# Highlighting as a special string if the argument is a string
+					color_name = "statement"
 				elif len(splitted_line[j]) > 0 and splitted_line[j][0] in "\"'":
-					flag = curses.color_pair(self.color_pairs["special_string"])
-
-				# Overwrites the text
-				self.stdscr.addstr(
-					mintop, minlen + 5 + sum(len(e) + 1 for e in splitted_line[1:j]),
-					splitted_line[j],
-					flag
-				)
+					color_name = "special_string"
+				else:
+					color_name = None
+				add(columns[j], splitted_line[j], color_name, "instruction")
 
 		# If the instruction is a delete statement
 		elif self.use_ptrs_and_malloc and splitted_line[0] == "delete" and len(splitted_line) >= 2:
 			if splitted_line[1] == "arr":
-				self.stdscr.addstr(
-					mintop, minlen + 7,
-					"arr",
-					curses.color_pair(self.color_pairs["statement"])
-				)
+				add(7, "arr", "statement", "instruction")
+
+		line_length = max([columns[-1] + len(splitted_line[-1])] + [piece[1] for piece in pieces])
+		# The pieces of the rules usually do not overlap : they are then the segments
+		segments = sorted(pieces, key=lambda piece: piece[0])
+		if all(segments[i][1] <= segments[i + 1][0] for i in range(len(segments) - 1)):
+			return [segment for segment in segments if segment[0] != segment[1]], line_length
+
+		# Otherwise, gives each part between two ends of pieces the color of the last rule covering it ; a rule is
+		# applied after the rules of lower priority, and its pieces in the order they were added
+		ordered_pieces = sorted(pieces, key=lambda piece: piece[2])
+		boundaries = sorted({column for piece in pieces for column in piece[:2]})
+		segments = []
+		for start, end in zip(boundaries, boundaries[1:]):
+			covering_pieces = [piece for piece in ordered_pieces if piece[0] <= start < piece[1]]
+			if covering_pieces:
+				_, _, priority, color, replacement = covering_pieces[-1]
+				segments.append((start, end, priority, color, replacement))
+		return segments, line_length
 
 
 	def toggle_std_use(self):
@@ -1406,6 +1652,89 @@ class App:
 		self.plugins_config["BASE_CONFIG"]["using_namespace_std"] = self.using_namespace_std
 
 
+	def start_background_compilation(self):
+		"""
+		Starts compiling the code in the background while typing.
+		"""
+		self.background_compiler = BackgroundCompiler(self.compilers, self.compile_lock, self.background_compilation_delay)
+		self.background_compiler.start()
+		self._background_request = None
+
+
+	def toggle_background_compilation(self):
+		"""
+		Toggles the compilation of the code in the background while typing.
+		"""
+		if self.background_compiler is None:
+			self.start_background_compilation()
+		else:
+			self.background_compiler.stop()
+			self.background_compiler = None
+			# The preview shows the code compiled in the background
+			if self.preview is not None:
+				self.preview = None
+				self.request_full_redraw()
+		self.stdscr.addstr(self.rows - 1, 4, self.get_translation(
+			"toggle_background_compilation", state=self.background_compiler is not None
+		))
+		self.plugins_config["BASE_CONFIG"]["background_compilation"] = self.background_compiler is not None
+
+
+	def toggle_preview(self):
+		"""
+		Cycles the preview next to the editor between the Algorithmic code, the C++ code, and no preview.
+		The code is compiled in the background, which is enabled for as long as the preview is shown if it was not.
+		"""
+		if self.preview is None:
+			compiler_name, language = "algorithmic", "algo"
+		elif self.preview.compiler_name == "algorithmic":
+			compiler_name, language = "C++", "cpp"
+		else:
+			compiler_name, language = None, None
+
+		if compiler_name is None:
+			self.preview = None
+			# Stops compiling in the background if it was only done for the preview
+			if not self.plugins_config["BASE_CONFIG"]["background_compilation"] and self.background_compiler is not None:
+				self.background_compiler.stop()
+				self.background_compiler = None
+		else:
+			if self.background_compiler is None:
+				self.start_background_compilation()
+			self.preview = PreviewPane(None, compiler_name, language, self.get_output_styles())
+
+		# The text takes another width, so everything is drawn again
+		self._preview_geometry = None
+		self.request_full_redraw()
+		self.stdscr.addstr(self.rows - 1, 4, self.get_translation(
+			"toggle_preview", state=compiler_name is not None and compiler_name
+		))
+
+
+	def get_background_status(self) -> str:
+		"""
+		Returns the status of the background compilation shown in the footer : the errors of each compiler and the
+		compilation time, or an empty string if it is disabled.
+		"""
+		if self.background_compiler is None:
+			return ""
+		if self.background_compiler.busy:
+			return self.get_translation("background_compilation", "compiling")
+		result = self.background_compiler.result
+		if result is None:
+			return ""
+
+		statuses = []
+		for compiler_name, diagnostics in result.diagnostics.items():
+			if len(diagnostics) == 0:
+				state = self.get_translation("background_compilation", "ok")
+			else:
+				state = self.get_translation("background_compilation", "errors", errors_count=len(diagnostics))
+			statuses.append(f"{compiler_name.capitalize()} : {state}")
+		statuses.append(self.get_translation("background_compilation", "duration", duration=result.duration * 1000))
+		return "  ".join(statuses)
+
+
 	def toggle_use_ptrs_and_malloc(self):
 		"""
 		Toggles the use of pointers and memory allocations during the compilation..
@@ -1594,7 +1923,7 @@ class App:
 
 	def change_max_undo_size(self):
 		"""
-		Changes the maximum depth of the undo method.
+		Changes the maximum memory used by the undo actions, in bytes.
 		"""
 		# Requests user input for a size
 		self.stdscr.addstr(self.rows - 2, 0, self.get_translation("change_max_undo_size", "input"))
@@ -1602,10 +1931,9 @@ class App:
 
 		# Tests if the input is a valid number
 		if given_size.isdigit():
-			# Converts the input to a number, saves it into the config, then regenerates the undo stack
-			new_size = int(given_size)
-			self.undo_actions = deque(self.undo_actions, maxlen=new_size + 1)
-			self.plugins_config["BASE_CONFIG"]["max_undo_size"] = new_size
+			# Converts the input to a number, saves it into the config, then forgets the actions over the new limit
+			self.undo_actions.max_bytes = int(given_size)
+			self.plugins_config["BASE_CONFIG"]["max_undo_bytes"] = self.undo_actions.max_bytes
 
 
 		# Warns the user it is not a valid number
@@ -1700,7 +2028,7 @@ class App:
 		Allows the user to mark a line.
 		"""
 		# Finds the index of the current line
-		current_line_index = self.current_text[:self.current_index].count('\n')
+		current_line_index = self.buffer.position_of(self.current_index)[0]
 
 		# Toggles the mark on this line
 		if current_line_index in self.marked_lines:
@@ -1717,39 +2045,202 @@ class App:
 			self.execute_command(self.commands[self.last_used_command][0], self.last_used_command)
 
 
+	def get_syntax_tree(self) -> SyntaxTree:
+		"""
+		Returns the parsed current text. The text is only parsed again if it changed since the last call, so that
+		compiling the same code to several languages only parses it once, and then only the lines that changed are split.
+		"""
+		current_text = self.current_text
+		if self._syntax_tree is None or self._syntax_tree_source != current_text:
+			self._syntax_tree = parse_program(current_text, self._syntax_tree)
+			self._syntax_tree_source = current_text
+		return self._syntax_tree
+
+
+	def get_compile_options(self) -> CompileOptions:
+		"""
+		Returns the options of the compilers, based on the current settings.
+		"""
+		return CompileOptions(
+			tab_char=self.tab_char,
+			use_ptrs_and_malloc=self.use_ptrs_and_malloc,
+			using_namespace_std=self.using_namespace_std,
+			use_struct_keyword=self.use_struct_keyword,
+			language=self.language
+		)
+
+
+	def show_compilation_errors(self, diagnostics: DiagnosticsCollector):
+		"""
+		Marks the lines of the errors found by a compiler, and lists every error to the user. Selecting an error moves the
+		cursor to it.
+		:param diagnostics: The errors of the compilation.
+		"""
+		# Replaces the marks of the previous compilation's errors, keeping the lines marked by the user
+		for line_number in self.error_marked_lines:
+			if line_number in self.marked_lines:
+				self.marked_lines.remove(line_number)
+		self.error_marked_lines = [
+			line_number for line_number in diagnostics.line_numbers if line_number not in self.marked_lines
+		]
+		self.marked_lines.extend(self.error_marked_lines)
+
+		# Nothing to show if the compilation succeeded
+		if len(diagnostics) == 0:
+			return None
+
+		def go_to(diagnostic: Diagnostic):
+			# Moves the cursor to the error
+			if diagnostic.line_number is not None:
+				self.go_to_line(diagnostic.line_number, diagnostic.column)
+
+		# Lists the errors, as lists so that the menu can shorten the longest ones
+		display_menu(
+			self.stdscr,
+			(
+				*[
+					[f"[{diagnostic.code}] {diagnostic.message}", partial(go_to, diagnostic)]
+					for diagnostic in diagnostics
+				],
+				[self.get_translation("compilation_errors", "close"), lambda: None]
+			),
+			label=self.get_translation("compilation_errors", "label", errors_count=len(diagnostics)),
+			space_out_last_option=True
+		)
+
+
+	def go_to_line(self, line_number: int, column: int = 0):
+		"""
+		Moves the cursor to the given line, scrolling to it if it is not visible.
+		:param line_number: The index of the line.
+		:param column: The column of the cursor on the line, stopping at the end of the line.
+		"""
+		if not 0 <= line_number < self.buffer.line_count:
+			return None
+		self.current_index = min(self.buffer.line_start(line_number) + column, self.buffer.line_end(line_number))
+		visible_rows = (self.rows - 3) - self.top_placement_shift
+		if not self.min_display_line <= line_number < self.min_display_line + visible_rows:
+			self.min_display_line = max(line_number - visible_rows // 2, 0)
+
+
+	def go_to_compiled_line(self):
+		"""
+		Asks the user for a line of the last compiled code (e.g. from an error of the C++ compiler or a crash), and
+		moves the cursor to the source line it comes from.
+		"""
+		# Requests user input for a line number
+		self.stdscr.addstr(self.rows - 2, 0, self.get_translation("go_to_compiled_line", "input"))
+		given_line = input_text(self.stdscr)
+
+		# Finds the source line of the compiled line, the lines being numbered from 1 like in the compilers' messages
+		source_line = None
+		if given_line.isdigit() and self.last_source_map is not None:
+			source_line = self.last_source_map.source_line_of(int(given_line) - 1)
+
+		if source_line is not None:
+			self.go_to_line(source_line)
+
+		# Warns the user the line has no source line
+		else:
+			self.stdscr.clear()
+			self.stdscr.addstr(self.rows - 2, 0, self.get_translation("go_to_compiled_line", "no_source").format(
+				line_number=given_line
+			))
+			self.stdscr.getch()
+
+
+	def get_output_styles(self) -> dict:
+		"""
+		Returns the curses attribute of each element of the compiled code, for the views showing it.
+		"""
+		styles = {
+			pair_name: curses.color_pair(self.color_pairs[pair_name])
+			for pair_name in ("statement", "function", "variable", "instruction", "strings")
+		}
+		styles["comment"] = curses.color_pair(self.color_pairs["special_string"])
+		return styles
+
+
+	def show_compiled_code(self, compiled_code: str, language: str, source_map: Optional[SourceMap] = None) -> Optional[int]:
+		"""
+		Shows the compiled code in a scrollable and searchable view, colored based on its language.
+		:param compiled_code: The compiled code.
+		:param language: The language of the code, 'algo' or 'cpp'.
+		:param source_map: The map of the compiled lines to the source lines, to go to the source of a line.
+		:return: The index of the source line the user chose to go to, or None if they just quit the view.
+		"""
+		self.stdscr.clear()
+		return OutputPager(
+			self.stdscr, compiled_code, language, self.get_output_styles(),
+			label={"algo": "Algorithmic", "cpp": "C++"}[language],
+			help_text=self.get_translation("output_pager", "help"),
+			not_found_text=self.get_translation("output_pager", "not_found"),
+			source_map=source_map,
+			source_text=self.get_translation("output_pager", "source")
+		).show()
+
+
+	def run_compiler(self, compiler_name: str) -> Tuple[Optional[str], DiagnosticsCollector]:
+		"""
+		Compiles the current text with the given compiler and the current settings, or takes the result of the
+		background compilation if it already compiled the same text with the same settings.
+		Also updates self.instructions_list, and self.last_source_map if the compilation succeeded.
+		:param compiler_name: The name of the compiler, 'algorithmic' or 'C++'.
+		:return: A tuple (compiled code or None if an error occurred, errors of the compilation).
+		"""
+		options = self.get_compile_options()
+		result = None
+		if self.background_compiler is not None:
+			result = self.background_compiler.get_result(self.current_text, options)
+
+		# Reuses the background compilation
+		if result is not None:
+			final_compiled_code = result.compiled_codes[compiler_name]
+			diagnostics = result.diagnostics[compiler_name]
+			source_map = result.source_maps[compiler_name]
+			self.instructions_list = result.instructions_lists[compiler_name]
+
+		# Otherwise compiles the parsed code, waiting for the background compilation to release the compilers
+		else:
+			compiler = self.compilers[compiler_name]
+			with self.compile_lock:
+				final_compiled_code = compiler.compile(self.get_syntax_tree(), options)
+			diagnostics = compiler.diagnostics
+			source_map = compiler.source_map
+			self.instructions_list = compiler.instructions_list
+
+		if final_compiled_code is not None:
+			self.last_source_map = source_map
+		return final_compiled_code, diagnostics
+
+
 	def compile(self, noshow:bool=False) -> Union[None, str]:
 		"""
 		Compiles the inputted text into algorithmic code.
 		:param noshow: Whether not to show the compiled code.
 		"""
-		# Creates a list if instructions by splitting the text into lines
-		self.instructions_list = self.current_text.split("\n")
-
-		# Updates the compiler's tab char
-		self.compilers["algorithmic"].tab_char = self.tab_char
+		# Compiles the code with the current settings, unless it was already compiled in the background
+		final_compiled_code, diagnostics = self.run_compiler("algorithmic")
 
-		# Compiles the code through the Compiler class's compile method
-		final_compiled_code = self.compilers["algorithmic"].compile(self.instructions_list)
+		# Shows all the errors at once, and marks their lines
+		if noshow is False:
+			self.show_compilation_errors(diagnostics)
 
 		if noshow is False:
 			if final_compiled_code is not None:
-				# Shows the compilation result to the user
-				self.stdscr.clear()
-				try:
-					self.stdscr.addstr(0, 0, final_compiled_code)
-
-					# Calls each plugins' update_on_compilation method
-					for plugin in self.plugins.values():
-						if hasattr(plugin[1], "update_on_compilation"):
-							plugin[1].update_on_compilation(final_compiled_code, "algo")
+				# Calls each plugins' update_on_compilation method
+				for plugin in self.plugins.values():
+					if hasattr(plugin[1], "update_on_compilation"):
+						plugin[1].update_on_compilation(final_compiled_code, "algo")
 
-					# Refreshes the screen and awaits user input (pause)
-					self.stdscr.refresh()
-					self.stdscr.getch()
-				except curses.error: pass
+				# Shows the compilation result to the user, until they quit the view or go to the source of a line
+				source_line = self.show_compiled_code(final_compiled_code, "algo", self.last_source_map)
 
-				# Saves the compiled code based on the user's choice
-				self.save(final_compiled_code)
+				# Otherwise saves the compiled code based on the user's choice
+				if source_line is not None:
+					self.go_to_line(source_line)
+				else:
+					self.save(final_compiled_code)
 
 			# Clears the screen and reapplies each stylings
 			self.stdscr.clear()
@@ -1763,35 +2254,27 @@ class App:
 		"""
 		Compiles everything to C++ code ; might not always work.
 		"""
-		# Creates a list if instructions by splitting the text into lines
-		self.instructions_list = self.current_text.split("\n")
-
-		# Modifies the std::string use of std:: based on its use
-		self.compilers["C++"].var_types["string"] = ("std::" if self.using_namespace_std is False else "") + "string"
-		self.compilers["C++"].use_struct_keyword = self.use_struct_keyword
+		# Compiles the code with the current settings, unless it was already compiled in the background
+		final_compiled_code, diagnostics = self.run_compiler("C++")
 
-		# Compiles the code through the Compiler class's compile method
-		final_compiled_code = self.compilers["C++"].compile(self.instructions_list)
+		# Shows all the errors at once, and marks their lines
+		self.show_compilation_errors(diagnostics)
 
 		# Only does this part if no error was raised (if final_compiled_code is not None)
 		if final_compiled_code is not None:
-			# Shows the compilation result to the user
-			self.stdscr.clear()
-			self.stdscr.refresh()
-			try:
-				self.stdscr.addstr(0, 0, final_compiled_code)
-			except curses.error: pass
-
 			# Calls each plugins' update_on_compilation method
 			for plugin in self.plugins.values():
 				if hasattr(plugin[1], "update_on_compilation"):
 					plugin[1].update_on_compilation(final_compiled_code, "cpp")
 
-			# Adds a pause
-			self.stdscr.getch()
+			# Shows the compilation result to the user, until they quit the view or go to the source of a line
+			source_line = self.show_compiled_code(final_compiled_code, "cpp", self.last_source_map)
 
-			# Saves the compiled code based on the user's choice
-			self.save(final_compiled_code)
+			# Otherwise saves the compiled code based on the user's choice
+			if source_line is not None:
+				self.go_to_line(source_line)
+			else:
+				self.save(final_compiled_code)
 
 		# Clears the screen and reapplies each stylings
 		self.stdscr.clear()
@@ -0,0 +1,318 @@
+"""
+Contains the OutputPager class, which shows the compiled code in a scrollable view.
+The position of each line in the text is indexed once, so that only the lines visible on the screen are ever sliced,
+colored and drawn : the cost of a frame does not depend on the length of the compiled code.
+Given the source map of the code, the view also tells which source line the selected line comes from, and can jump to it.
+"""
+import curses
+import re
+from bisect import bisect_right
+from typing import Dict, List, Optional
+
+from source_map import SourceMap
+from utils import input_text
+
+# The words colored in each language the code is compiled to, by name of the color pair they are drawn with
+OUTPUT_KEYWORDS = {
+	"algo": {
+		"statement": (
+			"Si", "Sinon", "Pour", "allant", "de", "à", "avec", "un", "pas", "Tant", "Que", "SELON", "Cas", "Autrement",
+			"Fin", "ET", "OU", "NON"
+		),
+		"function": ("Fonction", "Procédure", "Début", "Retourner", "Structure", "Constante"),
+		"variable": (
+			"Entier", "Entiers", "Réel", "Réels", "Chaîne", "caractères", "Booléen", "Booléens", "Caractère", "Caractères",
+			"Tableau"
+		),
+		"instruction": ("Afficher", "Saisir", "Libérer", "Allouer")
+	},
+	"cpp": {
+		"statement": (
+			"if", "else", "for", "while", "switch", "case", "default", "break", "const", "delete", "new", "using",
+			"namespace"
+		),
+		"function": ("return", "struct", "main", "sizeof", "srand", "rand", "pow", "sqrt"),
+		"variable": ("int", "float", "double", "char", "bool", "void", "string", "std"),
+		"instruction": ("cout", "cin", "nullptr", "true", "false")
+	}
+}
+
+TAB_SIZE = 4  # The amount of columns of a tab character
+
+# Matches the elements colored in a line of compiled code
+OUTPUT_TOKEN_REGEX = re.compile(
+	r'(?P<strings>"(?:\\.|[^"\\])*"?|\'(?:\\.|[^\'\\])*\'?)'
+	r'|(?P<comment>//.*|#.*)'
+	r'|(?P<word>[^\W\d]\w*)'
+)
+
+
+class OutputPager:
+	def __init__(self, stdscr, text: str, language: Optional[str] = None, styles: Optional[Dict[str, int]] = None,
+	             label: str = "", help_text: str = "PgUp/PgDn/Home/End  / : search  n/N : next/previous  g : go to source  q : quit",
+	             not_found_text: str = "'{search_string}' not found", source_map: Optional[SourceMap] = None,
+	             source_text: str = "source line {line_number}"):
+		"""
+		Creates a view of the given text.
+		:param stdscr: The standard screen.
+		:param text: The text to show, usually the compiled code.
+		:param language: The language of the text, as a key of OUTPUT_KEYWORDS, to color it. If None, it is not colored.
+		:param styles: The curses attribute of each color pair name ('statement', 'function', 'variable', 'instruction',
+			'strings', 'comment'). The missing ones are drawn with the default color.
+		:param label: A text shown in the status bar, e.g. the name of the language.
+		:param help_text: The keys of the view, shown in the status bar.
+		:param not_found_text: The message shown when the searched string is not found ; {search_string} is replaced by it.
+		:param source_map: The map of the text's lines to their source lines, or None if the text has no source.
+		:param source_text: The source line of the selected line, shown in the status bar ; {line_number} is replaced by it.
+		"""
+		self.stdscr = stdscr
+		self.label = label
+		self.help_text = help_text
+		self.not_found_text = not_found_text
+		self.source_map = source_map
+		self.source_text = source_text
+		self.styles = {} if styles is None else styles
+
+		self.text = ""
+		self.line_starts: List[int] = [0]  # The index of the first character of each line, computed once
+		self.set_text(text)
+
+		# The color pair name of each keyword of the language
+		self.keywords: Dict[str, str] = {}
+		if language is not None:
+			for pair_name, words in OUTPUT_KEYWORDS[language].items():
+				for word in words:
+					self.keywords[word] = pair_name
+
+		self.top_line = 0  # The index of the first line shown
+		self.cursor_line = 0  # The index of the selected line, which the searches start from
+		self.search_string = ""  # The last searched string
+		self.message = ""  # A message shown once in the status bar
+
+
+	def set_text(self, text: str):
+		"""
+		Changes the text shown, and indexes its lines.
+		"""
+		self.text = text
+		self.line_starts = [0]
+		position = text.find("\n")
+		while position != -1:
+			self.line_starts.append(position + 1)
+			position = text.find("\n", position + 1)
+
+
+	@property
+	def line_count(self) -> int:
+		"""
+		The amount of lines of the text.
+		"""
+		return len(self.line_starts)
+
+
+	def get_line(self, line_index: int) -> str:
+		"""
+		Returns the line at the given index, without its line break.
+		"""
+		end = self.line_starts[line_index + 1] - 1 if line_index + 1 < len(self.line_starts) else len(self.text)
+		return self.text[self.line_starts[line_index]:end]
+
+
+	def get_visible_rows(self) -> int:
+		"""
+		Returns the amount of lines of text fitting on the screen, above the status bar.
+		"""
+		return max(self.stdscr.getmaxyx()[0] - 1, 1)
+
+
+	def scroll_to(self, line_index: int):
+		"""
+		Scrolls so that the first line shown is the given one, staying within the text.
+		"""
+		self.top_line = max(min(line_index, self.line_count - self.get_visible_rows()), 0)
+
+
+	def move_cursor(self, line_index: int):
+		"""
+		Selects the given line, staying within the text, and scrolls just enough for it to be visible.
+		"""
+		self.cursor_line = max(min(line_index, self.line_count - 1), 0)
+		if self.cursor_line < self.top_line:
+			self.scroll_to(self.cursor_line)
+		elif self.cursor_line >= self.top_line + self.get_visible_rows():
+			self.scroll_to(self.cursor_line - self.get_visible_rows() + 1)
+
+
+	def get_source_line(self) -> Optional[int]:
+		"""
+		Returns the index of the source line the selected line comes from, or None if it has none.
+		"""
+		if self.source_map is None:
+			return None
+		return self.source_map.source_line_of(self.cursor_line)
+
+
+	def show(self) -> Optional[int]:
+		"""
+		Shows the text until the user quits the view with 'q', Enter or Escape, or goes to the source with 'g'.
+		:return: The index of the source line of the selected line if the user chose to go to it, None otherwise.
+		"""
+		key = ""
+		source_line = None
+		while key not in ("q", "\n", "\x1b"):
+			self.draw()
+			key = self.stdscr.getkey()
+			# Quits the view to go to the source line, if the selected line has one
+			if key == "g":
+				source_line = self.get_source_line()
+				if source_line is not None:
+					break
+			self.handle_key(key)
+		self.stdscr.clear()
+		return source_line
+
+
+	def handle_key(self, key: str):
+		"""
+		Moves the selected line, scrolls or searches based on the given key.
+		"""
+		visible_rows = self.get_visible_rows()
+		if key == "KEY_UP":
+			self.move_cursor(self.cursor_line - 1)
+		elif key == "KEY_DOWN":
+			self.move_cursor(self.cursor_line + 1)
+		elif key == "KEY_PPAGE":
+			self.scroll_to(self.top_line - visible_rows)
+			self.move_cursor(self.cursor_line - visible_rows)
+		elif key == "KEY_NPAGE":
+			self.scroll_to(self.top_line + visible_rows)
+			self.move_cursor(self.cursor_line + visible_rows)
+		elif key == "KEY_HOME":
+			self.move_cursor(0)
+		elif key == "KEY_END":
+			self.move_cursor(self.line_count - 1)
+		elif key == "/":
+			self.search(self.ask_search_string())
+		elif key == "n":
+			self.search(self.search_string)
+		elif key == "N":
+			self.search(self.search_string, backwards=True)
+
+
+	def ask_search_string(self) -> str:
+		"""
+		Asks the user for the string to search for in the status bar.
+		"""
+		rows, cols = self.stdscr.getmaxyx()
+		self.stdscr.move(rows - 1, 0)
+		self.stdscr.clrtoeol()
+		self.stdscr.addstr(rows - 1, 0, "/")
+		return input_text(self.stdscr, 1, rows - 1)
+
+
+	def search(self, search_string: str, backwards: bool = False):
+		"""
+		Selects the next (or previous) line containing the given string, wrapping around the text.
+		:param search_string: The string to search for. Nothing happens if it is empty.
+		:param backwards: Whether to search towards the start of the text.
+		"""
+		if search_string == "":
+			return None
+		self.search_string = search_string
+
+		# Searches the text itself from the selected line, then finds the line of the match from the index of lines
+		if not backwards:
+			start = self.line_starts[self.cursor_line + 1] if self.cursor_line + 1 < self.line_count else len(self.text)
+			position = self.text.find(search_string, start)
+			if position == -1:
+				position = self.text.find(search_string)
+		else:
+			position = self.text.rfind(search_string, 0, self.line_starts[self.cursor_line])
+			if position == -1:
+				position = self.text.rfind(search_string)
+
+		if position == -1:
+			self.message = self.not_found_text.format(search_string=search_string)
+			return None
+		self.cursor_line = bisect_right(self.line_starts, position) - 1
+
+		# Shows the match around the top third of the screen if it is not visible
+		if not self.top_line <= self.cursor_line < self.top_line + self.get_visible_rows():
+			self.scroll_to(self.cursor_line - self.get_visible_rows() // 3)
+
+
+	def get_runs(self, line: str) -> list:
+		"""
+		Computes the colors of a line.
+		:return: A list of tuples (column, text, curses attribute) covering the whole line.
+		"""
+		if not self.keywords:
+			return [(0, line, curses.A_NORMAL)]
+
+		runs = []
+		column = 0
+		for match in OUTPUT_TOKEN_REGEX.finditer(line):
+			if match.lastgroup == "word":
+				pair_name = self.keywords.get(match.group())
+				if pair_name is None:
+					continue
+			else:
+				pair_name = match.lastgroup
+			style = self.styles.get(pair_name)
+			if style is None:
+				continue
+			# Adds the uncolored text before the colored element
+			if match.start() > column:
+				runs.append((column, line[column:match.start()], curses.A_NORMAL))
+			runs.append((match.start(), match.group(), style))
+			column = match.end()
+		if column < len(line):
+			runs.append((column, line[column:], curses.A_NORMAL))
+		return runs
+
+
+	def draw(self):
+		"""
+		Draws the visible lines and the status bar.
+		"""
+		rows, cols = self.stdscr.getmaxyx()
+		visible_rows = self.get_visible_rows()
+		max_column = cols - 1
+
+		for row in range(visible_rows):
+			self.stdscr.move(row, 0)
+			self.stdscr.clrtoeol()
+			line_index = self.top_line + row
+			if line_index >= self.line_count:
+				continue
+			# The tabs are expanded, so that each character of the line takes one column
+			line = self.get_line(line_index).expandtabs(TAB_SIZE)
+
+			# Writes each run of the line with its color, stopping at the edge of the screen ; the selected line is bold
+			cursor_style = curses.A_BOLD if line_index == self.cursor_line else curses.A_NORMAL
+			for column, text, style in self.get_runs(line):
+				if column >= max_column:
+					break
+				self.stdscr.addstr(row, column, text[:max_column - column], style | cursor_style)
+
+			# Highlights the occurrences of the searched string
+			if self.search_string:
+				position = line.find(self.search_string)
+				while position != -1 and position < max_column:
+					self.stdscr.addstr(
+						row, position, line[position:position + len(self.search_string)][:max_column - position],
+						curses.A_REVERSE
+					)
+					position = line.find(self.search_string, position + len(self.search_string))
+
+		# Draws the status bar, with the selected line and its source line
+		status = f" {self.label}  {self.cursor_line + 1}/{self.line_count}  "
+		source_line = self.get_source_line()
+		if source_line is not None:
+			status += self.source_text.format(line_number=source_line + 1) + "  "
+		status += self.message or self.help_text
+		self.message = ""
+		self.stdscr.move(rows - 1, 0)
+		self.stdscr.clrtoeol()
+		self.stdscr.addstr(rows - 1, 0, status[:max_column], curses.A_REVERSE)
+		self.stdscr.refresh()
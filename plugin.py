@@ -23,6 +23,7 @@ class Plugin:
 		self.config: dict = {}  # The config data of the plugin
 		self.translations: dict = {}  # The translations of your app
 		self.was_initialized: bool = False  # Whether the init() method was called. If True, will not call the method. If False, will turn to True upon call of init().
+		self.needs_full_redraw: bool = True  # Whether the screen has to be erased before each keypress because update_on_keypress() draws on it. Set it to False if the plugin draws nothing there, or calls self.app.request_full_redraw() when it needs to.
 
 	def init(self):
 		"""
@@ -32,8 +33,8 @@ class Plugin:
 
 	def update_on_syntax_highlight(self, line: str, splitted_line: list, i: int):
 		"""
-		Gets called every frame, right after the syntax highlighting of the current line is complete.
-		Gets called n times each frame, where n is the amount of lines in the program.
+		Gets called right after the syntax highlighting of the current line is complete.
+		Only the lines that changed since the last frame are redrawn, so it is not called for every line each frame.
 		"""
 		pass
 
@@ -112,6 +113,14 @@ class Plugin:
 		# If a command with the same prefix exists, it replaces it
 		self.app.options_list.append((name, current_value, callback))
 
+	def register_keyword(self, keyword: str, color: str):
+		"""
+		Adds a new keyword to the syntax highlighting of the app.
+		:param keyword: The keyword to highlight.
+		:param color: The color of the keyword ; one of 'statement', 'function', 'variable' or 'instruction'.
+		"""
+		self.app.register_keyword(keyword, color)
+
 	def create_pair(self, fg: int, bg: int) -> int:
 		"""
 		Creates a new color pair with the given colors, and returns its ID. UNAVAILABLE IN __init__ !
@@ -0,0 +1,147 @@
+"""
+Contains the PreviewPane class, which shows the compiled code next to the editor while typing.
+The code comes from the background compiler, whose compilers only compile again the units that changed since the last
+compilation. The pane follows the line of the editor's cursor through the source map of the code, and remembers what
+each row shows, so that a frame only draws again the rows whose compiled line changed.
+"""
+import curses
+from typing import Dict, Optional
+
+from background_compiler import CompilationResult
+from output_pager import OutputPager, TAB_SIZE
+from source_map import SourceMap
+
+PREVIEW_BORDER = "│"  # The character separating the pane from the editor, drawn on each row
+
+
+class PreviewPane(OutputPager):
+	def __init__(self, window, compiler_name: str, language: str, styles: Optional[Dict[str, int]] = None):
+		"""
+		Creates a new pane.
+		:param window: The curses window of the pane.
+		:param compiler_name: The name of the compiler whose code is shown, 'algorithmic' or 'C++'.
+		:param language: The language of the code, as a key of OUTPUT_KEYWORDS, to color it.
+		:param styles: The curses attribute of each color pair name, like in OutputPager.
+		"""
+		self.lines = [""]  # The lines of the compiled code
+		super().__init__(window, "", language, styles)
+		self.compiler_name = compiler_name
+		self.source_map: Optional[SourceMap] = None  # The map of the compiled code shown
+		self.result: Optional[CompilationResult] = None  # The background compilation shown
+		self.source_line: Optional[int] = None  # The source line of the editor's cursor, whose compiled lines are bold
+		self._drawn_rows = {}  # The state of each row as it was last drawn, to only draw the rows that changed
+
+
+	def set_text(self, text: str):
+		"""
+		Changes the code shown. It is only split into lines, as the pane is not searched, which is faster than indexing
+		the lines for large codes.
+		"""
+		self.text = text
+		self.lines = text.split("\n")
+
+
+	@property
+	def line_count(self) -> int:
+		"""
+		The amount of lines of the code.
+		"""
+		return len(self.lines)
+
+
+	def get_line(self, line_index: int) -> str:
+		"""
+		Returns the line at the given index.
+		"""
+		return self.lines[line_index]
+
+
+	def get_visible_rows(self) -> int:
+		"""
+		Returns the amount of lines fitting in the pane, which has no status bar.
+		"""
+		return max(self.stdscr.getmaxyx()[0], 1)
+
+
+	def set_window(self, window):
+		"""
+		Moves the pane to another window, e.g. when the terminal is resized.
+		"""
+		self.stdscr = window
+		self.forget_drawn_rows()
+
+
+	def forget_drawn_rows(self):
+		"""
+		Makes the next frame draw every row, e.g. when something was drawn over the pane.
+		"""
+		self._drawn_rows.clear()
+
+
+	def set_result(self, result: Optional[CompilationResult]):
+		"""
+		Shows the code of a background compilation. If the compilation failed, the last code compiled is kept.
+		"""
+		if result is None or result is self.result:
+			return None
+		self.result = result
+		compiled_code = result.compiled_codes.get(self.compiler_name)
+		if compiled_code is not None:
+			self.set_text(compiled_code)
+			self.source_map = result.source_maps[self.compiler_name]
+
+
+	def follow(self, source_line: int, row: int):
+		"""
+		Scrolls so that the compiled code of the given source line is on the given row, like the line in the editor.
+		:param source_line: The index of the source line, usually the line of the cursor.
+		:param row: The row of the source line in the editor.
+		"""
+		self.source_line = source_line
+		if self.source_map is None:
+			return None
+		compiled_line = self.source_map.nearest_compiled_line(source_line)
+		if compiled_line is not None:
+			self.cursor_line = compiled_line
+			self.scroll_to(compiled_line - row)
+
+
+	def draw(self):
+		"""
+		Draws the rows of the pane whose line changed since the last frame.
+		"""
+		rows, cols = self.stdscr.getmaxyx()
+		max_column = cols - 1
+
+		for row in range(self.get_visible_rows()):
+			line_index = self.top_line + row
+			line = self.get_line(line_index) if line_index < self.line_count else None
+			is_current = line is not None and self.source_line is not None and self.source_map is not None and \
+				self.source_map.source_line_of(line_index) == self.source_line
+
+			# Skips the row if it is drawn exactly the same way as last frame
+			row_state = (line, is_current, cols)
+			if self._drawn_rows.get(row) == row_state:
+				continue
+			self._drawn_rows[row] = row_state
+
+			# Erases the row, then draws the border and the line
+			self.stdscr.move(row, 0)
+			self.stdscr.clrtoeol()
+			self.stdscr.addstr(row, 0, PREVIEW_BORDER)
+			if line is None:
+				continue
+			line = line.expandtabs(TAB_SIZE)
+			current_style = curses.A_BOLD if is_current else curses.A_NORMAL
+			for column, text, style in self.get_runs(line):
+				if column + 1 >= max_column:
+					break
+				self.stdscr.addstr(row, column + 1, text[:max_column - column - 1], style | current_style)
+
+
+	def refresh(self):
+		"""
+		Sends the pane to the screen along with the editor, on top of it.
+		"""
+		self.stdscr.touchwin()
+		self.stdscr.noutrefresh()
@@ -0,0 +1,199 @@
+"""
+Contains the SourceMap class, which links each line of a compiled code to the line of the source code it comes from.
+The map is run-length encoded : consecutive compiled lines coming from the same source line, or from consecutive source
+lines, are stored as a single run, so that a map usually takes a few integers per block of code rather than per line.
+"""
+from array import array
+from bisect import bisect_right
+from typing import List, Optional
+
+NO_SOURCE = -1  # The source line of the compiled lines generated by the compiler itself (includes, main...)
+
+
+class SourceMap:
+	def __init__(self):
+		# Each run starts at a compiled line, with the source line of that compiled line, and the amount by which the
+		# source line increases on each following compiled line of the run (0 or 1)
+		self.run_starts = array("l")
+		self.run_sources = array("l")
+		self.run_steps = array("b")
+		self.line_count = 0  # The amount of compiled lines mapped
+		# The result of nearest_compiled_line for each source line, computed when first needed
+		self._nearest_lines: Optional[array] = None
+
+
+	def append(self, source_line: int = NO_SOURCE, count: int = 1):
+		"""
+		Maps the next compiled lines.
+		:param source_line: The index of the source line they come from, or NO_SOURCE.
+		:param count: The amount of compiled lines coming from this source line.
+		"""
+		self._nearest_lines = None
+		for _ in range(count):
+			self._append_line(source_line)
+
+
+	def _append_line(self, source_line: int):
+		"""
+		Maps the next compiled line, extending the last run when possible.
+		"""
+		compiled_line = self.line_count
+		self.line_count += 1
+
+		if self.run_starts:
+			run_length = compiled_line - self.run_starts[-1]
+			previous_source = self.run_sources[-1] + self.run_steps[-1] * (run_length - 1)
+			# A run of a single line can take either step
+			if run_length == 1 and source_line != NO_SOURCE and self.run_sources[-1] != NO_SOURCE and \
+					source_line - previous_source in (0, 1):
+				self.run_steps[-1] = source_line - previous_source
+				return None
+			# Otherwise the line has to follow the step of the run
+			if source_line == previous_source + self.run_steps[-1] and (source_line != NO_SOURCE or self.run_steps[-1] == 0):
+				return None
+
+		self.run_starts.append(compiled_line)
+		self.run_sources.append(source_line)
+		self.run_steps.append(0)
+
+
+	def extend(self, source_map: "SourceMap"):
+		"""
+		Maps the next compiled lines like the lines of another map.
+		"""
+		self._nearest_lines = None
+		for run, run_start in enumerate(source_map.run_starts):
+			run_end = source_map.run_starts[run + 1] if run + 1 < len(source_map.run_starts) else source_map.line_count
+			run_source, run_step = source_map.run_sources[run], source_map.run_steps[run]
+			for offset in range(run_end - run_start):
+				self._append_line(run_source + run_step * offset)
+
+
+	def source_line_of(self, compiled_line: int) -> Optional[int]:
+		"""
+		Returns the index of the source line the given compiled line comes from, or None if it was generated by the
+		compiler or is out of the map.
+		"""
+		if not 0 <= compiled_line < self.line_count:
+			return None
+		run = bisect_right(self.run_starts, compiled_line) - 1
+		source_line = self.run_sources[run]
+		if source_line == NO_SOURCE:
+			return None
+		return source_line + self.run_steps[run] * (compiled_line - self.run_starts[run])
+
+
+	def compiled_lines_of(self, source_line: int) -> List[int]:
+		"""
+		Returns the indexes of the compiled lines coming from the given source line, in ascending order.
+		"""
+		compiled_lines = []
+		for run, run_start in enumerate(self.run_starts):
+			run_end = self.run_starts[run + 1] if run + 1 < len(self.run_starts) else self.line_count
+			run_source = self.run_sources[run]
+			if run_source == NO_SOURCE:
+				continue
+			if self.run_steps[run] == 0:
+				if run_source == source_line:
+					compiled_lines.extend(range(run_start, run_end))
+			elif run_source <= source_line < run_source + run_end - run_start:
+				compiled_lines.append(run_start + source_line - run_source)
+		return compiled_lines
+
+
+	def nearest_compiled_line(self, source_line: int) -> Optional[int]:
+		"""
+		Returns the first compiled line coming from the given source line or, if it has none (e.g. a blank line), the
+		last compiled line coming from the closest source line before it. Used to show the compiled code along with its
+		source.
+		:return: The index of the compiled line, or None if no source line up to the given one has any.
+		"""
+		if source_line < 0:
+			return None
+		# Finds the line of each source line once, as the runs may come in any order and overlap each other
+		if self._nearest_lines is None:
+			self._nearest_lines = self._find_nearest_lines()
+		nearest_line = self._nearest_lines[min(source_line, len(self._nearest_lines) - 1)]
+		return None if nearest_line == NO_SOURCE else nearest_line
+
+
+	def _find_nearest_lines(self) -> array:
+		"""
+		Computes the result of nearest_compiled_line for each source line up to the last one mapped, followed by the
+		result for the source lines after it.
+		"""
+		# Finds the first and last compiled lines of each source line
+		last_source_line = max((
+			run_source + self.run_steps[run] * (self._run_end(run) - self.run_starts[run] - 1)
+			for run, run_source in enumerate(self.run_sources) if run_source != NO_SOURCE
+		), default=NO_SOURCE)
+		first_lines = array("l", [NO_SOURCE]) * (last_source_line + 1)
+		last_lines = array("l", [NO_SOURCE]) * (last_source_line + 1)
+		for run, run_start in enumerate(self.run_starts):
+			run_source, run_step = self.run_sources[run], self.run_steps[run]
+			if run_source == NO_SOURCE:
+				continue
+			run_end = self._run_end(run)
+			# A run of step 0 is a single source line, whose first and last lines are the run's
+			if run_step == 0:
+				compiled_lines = ((run_source, run_start, run_end - 1),)
+			else:
+				compiled_lines = (
+					(run_source + offset, run_start + offset, run_start + offset) for offset in range(run_end - run_start)
+				)
+			for other_line, first_line, last_line in compiled_lines:
+				if first_lines[other_line] == NO_SOURCE or first_line < first_lines[other_line]:
+					first_lines[other_line] = first_line
+				last_lines[other_line] = max(last_lines[other_line], last_line)
+
+		# A source line without compiled lines takes the last line of the closest source line before it ; the first lines
+		# are replaced in place, with one more item for the source lines after the last one
+		nearest_lines = first_lines
+		nearest_lines.append(NO_SOURCE)
+		previous_last_line = NO_SOURCE
+		for other_line in range(last_source_line + 2):
+			if other_line <= last_source_line and first_lines[other_line] != NO_SOURCE:
+				previous_last_line = last_lines[other_line]
+			else:
+				nearest_lines[other_line] = previous_last_line
+		return nearest_lines
+
+
+	def _run_end(self, run: int) -> int:
+		"""
+		Returns the compiled line right after the given run.
+		"""
+		return self.run_starts[run + 1] if run + 1 < len(self.run_starts) else self.line_count
+
+
+	def encode(self) -> str:
+		"""
+		Returns the map as a compact string, e.g. to store it along with the compiled code.
+		"""
+		return ";".join(
+			f"{start},{source},{step}" for start, source, step in zip(self.run_starts, self.run_sources, self.run_steps)
+		) + f";{self.line_count}"
+
+
+	@classmethod
+	def decode(cls, encoded_map: str) -> "SourceMap":
+		"""
+		Creates a map from the string returned by encode().
+		"""
+		source_map = cls()
+		*runs, line_count = encoded_map.split(";")
+		for run in runs:
+			start, source, step = run.split(",")
+			source_map.run_starts.append(int(start))
+			source_map.run_sources.append(int(source))
+			source_map.run_steps.append(int(step))
+		source_map.line_count = int(line_count)
+		return source_map
+
+
+	def __len__(self) -> int:
+		return self.line_count
+
+
+	def __repr__(self) -> str:
+		return f"SourceMap({len(self.run_starts)} runs, {self.line_count} lines)"
@@ -0,0 +1,293 @@
+"""
+Contains the front-end shared by the compilers : the lexer splitting each line into tokens, and the parser building
+a SyntaxTree out of the source code.
+The source code is parsed once, then each compiler walks the same SyntaxTree to emit its own language, so compiling
+the code to several languages, or with different options, does not parse it again.
+"""
+import re
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+# The instructions opening a block closed by an 'end' instruction
+BLOCK_OPENERS = frozenset(("for", "while", "if", "switch", "case", "default", "fx"))
+# The lines outside of any block are grouped into units ending after a line whose hash is a multiple of this, i.e. of
+# about this many lines. The ends only depend on the lines themselves, so inserting a line only changes its own unit.
+UNIT_LINES_DIVISOR = 8
+
+# Matches each lexical element of a line ; a string literal is matched until its closing quote, or the end of the line
+TOKEN_REGEX = re.compile(
+	r'(?P<string>"(?:\\.|[^"\\])*"?|\'(?:\\.|[^\'\\])*\'?)'
+	r'|(?P<number>\d+(?:\.\d+)?)'
+	r'|(?P<name>[^\W\d]\w*)'
+	r'|(?P<space> )'
+	r'|(?P<bracket>[()\[\]{}])'
+	r'|(?P<operator>[-+*/%=<>!&|^~.,:;?@#$]+)'
+	r'|(?P<other>.)'
+)
+
+
+class Token(str):
+	"""
+	A word of a line of code, as split on spaces. It behaves like a string, so it can be used as the words of the line
+	were before, but also knows its kind, its column in the line, and the lexical elements it is made of.
+	"""
+	kind: str  # 'string', 'number', 'name', 'bracket', 'operator', 'other', 'compound' if made of several elements, or 'empty'
+	column: int  # The index of the first character of the token in the line
+	parts: tuple  # The lexical elements of the token, as tokens themselves (a token of one element is its own part)
+
+	def __new__(cls, text: str, kind: str, column: int, parts: tuple = None):
+		token = super().__new__(cls, text)
+		token.kind = kind
+		token.column = column
+		token.parts = (token,) if parts is None else parts
+		return token
+
+
+	def __reduce__(self):
+		# A token of one element is its own part
+		return Token, (str(self), self.kind, self.column, None if self.parts == (self,) else self.parts)
+
+
+def tokenize_line(line: str) -> List[Token]:
+	"""
+	Splits the line into tokens in a single pass.
+	The tokens are the words of the line separated by spaces, like line.split(' '), except that a string literal is
+	never split, even if it contains spaces.
+	:param line: A line of code.
+	:return: The list of the tokens of the line.
+	"""
+	tokens = []
+	parts = []
+	word_start = 0
+
+	def close_word(end: int):
+		"""
+		Creates the token of the word made of the current parts.
+		"""
+		if len(parts) == 1:
+			tokens.append(parts[0])
+		else:
+			tokens.append(Token(line[word_start:end], "compound" if parts else "empty", word_start, tuple(parts)))
+
+	for match in TOKEN_REGEX.finditer(line):
+		# Spaces separate the words
+		if match.lastgroup == "space":
+			close_word(match.start())
+			parts = []
+			word_start = match.end()
+		else:
+			parts.append(Token(match.group(), match.lastgroup, match.start()))
+	close_word(len(line))
+	return tokens
+
+
+def join_tokens(tokens: list, replacements: dict = None) -> str:
+	"""
+	Joins the tokens back with spaces, replacing the parts that are not string literals.
+	:param tokens: A list of tokens, or of strings.
+	:param replacements: A dict giving, for a substring of the code, what to replace it with. String literals are left untouched.
+	:return: The joined string.
+	"""
+	if not replacements:
+		return " ".join(tokens)
+
+	words = []
+	for token in tokens:
+		word = []
+		# Plain strings (e.g. added by a compiler) are considered as code
+		for part in getattr(token, "parts", (token,)):
+			if getattr(part, "kind", None) != "string":
+				for old, new in replacements.items():
+					part = part.replace(old, new)
+			word.append(part)
+		words.append("".join(word))
+	return " ".join(words)
+
+
+class Parameter:
+	"""
+	A typed parameter of a function, or a field of a structure, written as '<type> <name>'.
+	The type can be a basic type ('int'), a pointer ('int*'), a constant ('const_int'), an array ('arr_int_5_5')
+	or a structure ('struct_Person').
+	"""
+	__slots__ = ("type", "name", "is_pointer", "is_const", "base_type", "array_type", "array_dims", "struct_name")
+
+	def __init__(self, type_token: Token, name: Optional[Token]):
+		"""
+		Parses the type of the parameter.
+		:param type_token: The type of the parameter, as written in the code.
+		:param name: The name of the parameter, or None if it is missing.
+		"""
+		self.type = type_token  # The type as written in the code
+		self.name = name  # The name of the parameter, or None if it is missing
+
+		# Removes the pointer and constant markers from the type
+		base_type = str(type_token)
+		self.is_pointer = base_type.endswith("*")
+		if self.is_pointer:
+			base_type = base_type[:-1]
+		self.is_const = base_type.startswith("const_")
+		if self.is_const:
+			base_type = base_type[6:]
+		self.base_type = base_type  # The type without its pointer and constant markers
+
+		# Arrays are written arr_<type>_<dimension 1>_<dimension 2>...
+		self.array_type: Optional[str] = None  # The type of the elements if the parameter is an array
+		self.array_dims: Tuple[str, ...] = ()  # The dimensions if the parameter is an array
+		if base_type.startswith("arr"):
+			array_parts = base_type.split("_")
+			if len(array_parts) > 1:
+				self.array_type = array_parts[1]
+				self.array_dims = tuple(array_parts[2:])
+
+		# Structures are written struct_<name>
+		self.struct_name: Optional[str] = base_type[7:] if base_type.startswith("struct_") else None
+
+
+	@property
+	def is_array(self) -> bool:
+		"""
+		Whether the parameter is an array.
+		"""
+		return self.base_type.startswith("arr")
+
+
+def parse_parameters(tokens: Sequence[Token]) -> Tuple[Parameter, ...]:
+	"""
+	Groups the tokens two by two into typed parameters.
+	:param tokens: The tokens, going '<type> <name> <type> <name>...'.
+	:return: The parameters ; the name of the last one is None if it is missing.
+	"""
+	return tuple(
+		Parameter(tokens[i], tokens[i + 1] if i + 1 < len(tokens) else None)
+		for i in range(0, len(tokens), 2)
+	)
+
+
+class Instruction:
+	"""
+	A line of the source code, already split into tokens.
+	"""
+	__slots__ = ("line_number", "tokens", "name", "params", "return_type", "parameters")
+
+	def __init__(self, line_number: int, tokens: List[Token]):
+		"""
+		Parses a line of code.
+		:param line_number: The index of the line in the source code.
+		:param tokens: The tokens of the line.
+		"""
+		self.line_number = line_number
+		self.tokens: Tuple[Token, ...] = tuple(tokens)
+		self.name: Token = self.tokens[0]  # The name of the instruction, i.e. its first word
+		self.params: Tuple[Token, ...] = self.tokens[1:]  # The params of the instruction, i.e. the words after its name
+		self.return_type: Optional[Parameter] = None  # For a function, its return type along with its name
+		self.parameters: Tuple[Parameter, ...] = ()  # For a function or a structure, its typed parameters or fields
+
+		# Functions are written 'fx <return type> <name> <parameters...>', structures 'struct <name> <fields...>'
+		if self.name in ("fx", "struct"):
+			# Ignores the extra spaces at the end of the line
+			declaration = self.params
+			while declaration and declaration[-1] == "":
+				declaration = declaration[:-1]
+			if self.name == "fx" and len(declaration) >= 2:
+				self.return_type = Parameter(declaration[0], declaration[1])
+				self.parameters = parse_parameters(declaration[2:])
+			elif self.name == "struct":
+				self.parameters = parse_parameters(declaration[1:])
+
+
+class SyntaxTree:
+	"""
+	The parsed source code : one instruction per line.
+	The code is also split into units : each statement written outside of any block, i.e. each function, structure,
+	constant, or block or line of the main code, can be compiled independently of the rest of the code.
+	"""
+	__slots__ = ("lines", "instructions", "units", "_tokens_by_line")
+
+	def __init__(self, lines: Sequence[str], previous: "SyntaxTree" = None):
+		"""
+		Parses the given lines of code.
+		:param lines: The lines of the source code.
+		:param previous: The tree of a previous version of the code ; the lines that did not change are not split again.
+		"""
+		self.lines: Tuple[str, ...] = tuple(lines)
+
+		# Splits each line into tokens, reusing the tokens of the lines already split in the previous tree
+		known_tokens = previous._tokens_by_line if previous is not None else {}
+		previous_lines = previous.lines if previous is not None else ()
+		self._tokens_by_line: Dict[str, List[Token]] = {}
+		instructions = []
+		for line_number, line in enumerate(self.lines):
+			tokens = self._tokens_by_line.get(line)
+			if tokens is None:
+				tokens = known_tokens.get(line)
+				self._tokens_by_line[line] = tokens = tokenize_line(line) if tokens is None else tokens
+
+			# The lines that did not change nor move keep their instruction
+			if line_number < len(previous_lines) and previous_lines[line_number] == line:
+				instructions.append(previous.instructions[line_number])
+			else:
+				instructions.append(Instruction(line_number, tokens))
+		self.instructions: Tuple[Instruction, ...] = tuple(instructions)
+
+		# Finds the units of the code
+		self.units: Dict[int, int] = self._find_units()  # The index after the last line of each unit, by first line
+
+
+	def _find_units(self) -> Dict[int, int]:
+		"""
+		Finds the statements written outside of any block : each block (a function, a procedure, or a block of the main
+		code) from its opener to its matching 'end', and the other lines (structures, constants, and lines of the main
+		code), grouped into a few lines up to the next blank line or block.
+		:return: A dict giving, for the first line of each unit, the index after its last line. The blocks that are
+			never closed are not units.
+		"""
+		units = {}
+		depth = 0
+		unit_start = None  # The first line of the block being read
+		lines_start = None  # The first line of the group of lines outside of any block being read
+		for instruction in self.instructions:
+			line_number = instruction.line_number
+			# Ends the group of lines before a blank line or a block
+			if lines_start is not None and (instruction.name == "" or instruction.name in BLOCK_OPENERS):
+				units[lines_start] = line_number
+				lines_start = None
+
+			if instruction.name in BLOCK_OPENERS:
+				if depth == 0:
+					unit_start = line_number
+				depth += 1
+			elif instruction.name == "end" and depth > 0:
+				depth -= 1
+				if depth == 0 and unit_start is not None:
+					units[unit_start] = line_number + 1
+					unit_start = None
+			elif depth == 0 and instruction.name != "":
+				if lines_start is None:
+					lines_start = line_number
+				if hash(self.lines[line_number]) % UNIT_LINES_DIVISOR == 0:
+					units[lines_start] = line_number + 1
+					lines_start = None
+
+		if lines_start is not None:
+			units[lines_start] = len(self.instructions)
+		return units
+
+
+	def __len__(self) -> int:
+		return len(self.instructions)
+
+
+	def __getitem__(self, line_number: int) -> Instruction:
+		return self.instructions[line_number]
+
+
+def parse_program(source: Union[str, Sequence[str]], previous: SyntaxTree = None) -> SyntaxTree:
+	"""
+	Parses the source code into a SyntaxTree.
+	:param source: The source code, either as a string or as a list of lines.
+	:param previous: The tree of a previous version of the code, to only split the lines that changed since.
+	:return: The SyntaxTree of the code.
+	"""
+	if isinstance(source, str):
+		source = source.split("\n")
+	return SyntaxTree(source, previous)
@@ -0,0 +1,96 @@
+"""
+Tests of the CompileCache, in memory and on disk.
+"""
+import os
+
+from compile_cache import CACHE_FILE_EXTENSION, CompileCache
+
+
+def make_keys(count: int) -> list:
+	"""
+	Returns the keys of as many different sources.
+	"""
+	return [CompileCache.make_key([f"print {index}"], "C++") for index in range(count)]
+
+
+def cache_files(directory) -> list:
+	"""
+	Returns the names of the files of the cache in the directory, sorted.
+	"""
+	return sorted(filename for filename in os.listdir(directory) if filename.endswith(CACHE_FILE_EXTENSION))
+
+
+def test_make_key():
+	key = CompileCache.make_key(["a", "b"], "C++", True)
+	assert len(key) == 64
+	assert key == CompileCache.make_key(["a", "b"], "C++", True)
+	assert key != CompileCache.make_key(["a", "b"], "C++", False)
+	assert key != CompileCache.make_key(["a\nb"], "C++") != CompileCache.make_key(["ab"], "C++", True)
+
+
+def test_memory_lru():
+	cache = CompileCache(max_entries=2)
+	first_key, second_key, third_key = make_keys(3)
+	cache.put(first_key, "1")
+	cache.put(second_key, "2")
+	assert cache.get(first_key) == "1"
+
+	# The second key is now the least recently used one
+	cache.put(third_key, "3")
+	assert cache.get(second_key) is None
+	assert cache.get(first_key) == "1" and cache.get(third_key) == "3"
+	assert cache.stats() == {"hits": 3, "memory_hits": 3, "disk_hits": 0, "misses": 1, "entries": 2}
+
+	cache.clear()
+	assert cache.get(first_key) is None
+	assert cache.stats() == {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 1, "entries": 0}
+
+
+def test_disk_round_trip(tmp_path):
+	key, = make_keys(1)
+	CompileCache(directory=str(tmp_path)).put(key, "int main() {\r\n}\n")
+
+	# Another session finds the code on disk, exactly as it was, then keeps it in memory
+	cache = CompileCache(directory=str(tmp_path))
+	assert cache.get(key) == "int main() {\r\n}\n"
+	assert cache.get(key) == "int main() {\r\n}\n"
+	assert (cache.disk_hits, cache.memory_hits) == (1, 1)
+	assert cache_files(tmp_path) == [key + CACHE_FILE_EXTENSION]
+
+
+def test_disk_eviction(tmp_path):
+	(tmp_path / "notes.txt").write_text("x" * 1000)
+	keys = make_keys(4)
+	cache = CompileCache(max_entries=1, directory=str(tmp_path), max_disk_bytes=250)
+	for index, key in enumerate(keys[:3]):
+		cache.put(key, str(index) * 100)
+		# Makes the files' ages distinct, whatever the resolution of the file system's times
+		os.utime(tmp_path / (key + CACHE_FILE_EXTENSION), (index, index))
+
+	# Only the two most recently used files fit, and the unrelated file neither counts nor is removed
+	assert cache_files(tmp_path) == sorted(key + CACHE_FILE_EXTENSION for key in keys[1:3])
+	assert cache._disk_size == 200
+
+	# Reading a file makes it recently used, so the other one is removed instead
+	assert cache.get(keys[1]) == "1" * 100
+	cache.put(keys[3], "3" * 100)
+	assert cache_files(tmp_path) == sorted(key + CACHE_FILE_EXTENSION for key in (keys[1], keys[3]))
+	assert cache._disk_size == 200
+
+	cache.clear()
+	assert cache_files(tmp_path) == [] and cache._disk_size == 0
+	assert (tmp_path / "notes.txt").exists()
+
+
+def test_overwrite_size(tmp_path):
+	key, other_key = make_keys(2)
+	cache = CompileCache(directory=str(tmp_path), max_disk_bytes=250)
+	cache.put(key, "a" * 100)
+	cache.put(key, "b" * 120)
+	cache.put(key, "c" * 110)
+	assert cache._disk_size == 110 == cache._get_disk_size()
+
+	# Overwriting an entry does not make the cache think it is full
+	cache.put(other_key, "d" * 100)
+	assert cache._disk_size == 210
+	assert len(cache_files(tmp_path)) == 2
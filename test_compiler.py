@@ -0,0 +1,139 @@
+"""
+Tests of the incremental compilation : compiling a code again after an edit, reusing the units that did not change, must
+give exactly what a fresh compiler gives.
+"""
+import json
+import os
+import random
+
+import pytest
+
+from compiler import CompileOptions
+from compiler_factory import create_compilers
+from syntax_tree import parse_program
+
+SAMPLE_PROGRAM = """const int MAX = 10
+struct Person string name int age arr_int_5 notes
+fx int carre int x
+desc Returns the square
+data x
+result x squared
+vars
+int y
+fx_start
+y = x * x
+return y
+end
+fx void affiche string msg arr_int_5 t
+vars
+int i
+fx_start
+for i 0 4
+print msg & t[i] & (ENDL)
+end
+end
+fx struct_Person creer string n int a
+vars
+fx_start
+init Person p name n age a
+return p
+end
+int a b c
+string s = "hello world ET OU"
+a = 5
+b += 3
+
+float f = puissance(2, 3) + racine(4)
+c = aleatoire() % 10
+if a > b ET NON c
+print "a is big" & (ENDL)
+elif a == b OU c
+print "equal"
+else
+input a
+end
+while a < 10
+a += 1
+end
+switch a
+case 1
+print "one"
+end
+default
+print "other"
+end
+end
+arr int t 5
+print len(t) & len(t)
+CODE_RETOUR 3"""
+EDITED_LINES = ("CODE_RETOUR 3", "print x", "end", "fx int g int a", "fx_start", "int q", "y = puissance(y, 2)", "")
+
+
+@pytest.fixture(scope="module")
+def translations() -> dict:
+	"""
+	The translations of the error messages, by language.
+	"""
+	translations_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "translations")
+	translations = {}
+	for filename in os.listdir(translations_directory):
+		with open(os.path.join(translations_directory, filename), encoding="utf-8") as file:
+			translations[filename[13:15]] = json.load(file)
+	return translations
+
+
+def compile_all(compilers: dict, code) -> dict:
+	"""
+	Compiles the code with each compiler.
+	:return: The compiled code, the error messages and the source map of each compiler, by name.
+	"""
+	results = {}
+	for compiler_name, compiler in compilers.items():
+		compiled_code = compiler.compile(code)
+		source_map = compiler.source_map.encode() if compiled_code is not None else None
+		results[compiler_name] = (compiled_code, compiler.diagnostics.messages, source_map)
+	return results
+
+
+@pytest.mark.parametrize("options", [
+	CompileOptions(),
+	CompileOptions(tab_char="  ", use_ptrs_and_malloc=True, using_namespace_std=True, use_struct_keyword=True)
+])
+def test_incremental_compilation(translations, options):
+	random_generator = random.Random(0)
+	compilers = create_compilers(options, translations)
+	syntax_tree = None
+	lines = SAMPLE_PROGRAM.split("\n")
+	for _ in range(150):
+		# Edits a few lines, sometimes none, so that the same code is also compiled twice in a row
+		for _ in range(random_generator.randint(0, 3)):
+			line_number = random_generator.randrange(len(lines))
+			edit = random_generator.random()
+			if edit < 0.3:
+				lines.insert(line_number, random_generator.choice(lines))
+			elif edit < 0.5 and len(lines) > 1:
+				del lines[line_number]
+			elif edit < 0.8:
+				lines[line_number] = lines[line_number].replace("1", "2").replace("a", "b")
+			else:
+				lines[line_number] = random_generator.choice(EDITED_LINES)
+
+		code = "\n".join(lines)
+		syntax_tree = parse_program(code, syntax_tree)
+		assert compile_all(compilers, syntax_tree) == compile_all(create_compilers(options, translations), list(lines))
+
+
+def test_reused_units_keep_their_includes(translations):
+	# Both functions need math.h ; once the first one stops using it, the second one, reused as-is, still needs it
+	code = "\n".join((
+		"fx int f int a", "\tres = puissance(a, 2)", "\treturn res", "end", "",
+		"fx int g int b", "\tres = puissance(b, 3)", "\treturn res", "end", "",
+		"int x", "x = f(1)"
+	))
+	edited_code = code.replace("puissance(a, 2)", "a * a")
+	compiler = create_compilers(CompileOptions(), translations)["C++"]
+	syntax_tree = parse_program(code)
+	compiler.compile(syntax_tree)
+	compiled_code = compiler.compile(parse_program(edited_code, syntax_tree))
+	assert "math.h" in compiled_code
+	assert compiled_code == create_compilers(CompileOptions(), translations)["C++"].compile(edited_code)
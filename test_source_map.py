@@ -0,0 +1,154 @@
+"""
+Tests of the SourceMap, checked against a plain list of the source line of each compiled line.
+"""
+import io
+import random
+
+from emitter import Emitter, TeeEmitter
+from source_map import NO_SOURCE, SourceMap
+
+
+def random_source_lines(random_generator: random.Random, count: int) -> list:
+	"""
+	Returns the source line of each compiled line of a made-up compiled code, mostly made of blocks of consecutive
+	lines, like the compilers produce.
+	"""
+	source_lines = []
+	source_line = 0
+	while len(source_lines) < count:
+		choice = random_generator.random()
+		if choice < 0.5:
+			source_line += 1
+			source_lines.append(source_line)
+		elif choice < 0.7:
+			source_lines.append(source_line)
+		elif choice < 0.85:
+			source_lines.append(NO_SOURCE)
+		else:
+			source_line = random_generator.randint(0, 200)
+			source_lines.append(source_line)
+	return source_lines
+
+
+def check_map(source_map: SourceMap, source_lines: list):
+	"""
+	Checks that the map gives the expected source line for each compiled line, and the other way around.
+	"""
+	assert len(source_map) == len(source_lines)
+	for compiled_line, source_line in enumerate(source_lines):
+		assert source_map.source_line_of(compiled_line) == (None if source_line == NO_SOURCE else source_line)
+	for source_line in set(source_lines) - {NO_SOURCE}:
+		assert source_map.compiled_lines_of(source_line) == [
+			compiled_line for compiled_line, other_line in enumerate(source_lines) if other_line == source_line
+		]
+	assert source_map.source_line_of(-1) is None
+	assert source_map.source_line_of(len(source_lines)) is None
+
+
+def test_runs():
+	source_map = SourceMap()
+	source_map.append(NO_SOURCE, 2)
+	source_map.append(0)
+	source_map.append(1)
+	source_map.append(2)
+	source_map.append(2, 3)
+	source_map.append(7)
+	check_map(source_map, [NO_SOURCE, NO_SOURCE, 0, 1, 2, 2, 2, 2, 7])
+	assert list(source_map.run_starts) == [0, 2, 5, 8]
+	assert list(source_map.run_steps) == [0, 1, 0, 0]
+	assert source_map.compiled_lines_of(3) == []
+
+
+def test_random_maps():
+	random_generator = random.Random(0)
+	for _ in range(50):
+		source_lines = random_source_lines(random_generator, random_generator.randint(0, 200))
+		source_map = SourceMap()
+		for source_line in source_lines:
+			source_map.append(source_line)
+		check_map(source_map, source_lines)
+
+		# The encoded map gives back the same runs
+		decoded_map = SourceMap.decode(source_map.encode())
+		assert (decoded_map.run_starts, decoded_map.run_sources, decoded_map.run_steps) == \
+			(source_map.run_starts, source_map.run_sources, source_map.run_steps)
+		check_map(decoded_map, source_lines)
+
+		# Extending a map is like appending the lines of the other map
+		extended_map = SourceMap()
+		extended_map.append(3)
+		extended_map.extend(source_map)
+		check_map(extended_map, [3] + source_lines)
+
+
+def test_emitter_mapping():
+	stream = io.StringIO()
+	emitter = Emitter(stream, SourceMap())
+	emitter.write("#include <stdio.h>\n\n")
+	emitter.write("int f() {\n", 0)
+	emitter.write("\treturn ", 1)
+	emitter.write("2;", 2)
+	emitter.write("\n}\n", 1)
+	emitter.write_joined(", ", ["a", "b"], [3, 4])
+	emitter.write("\n")
+
+	# A line is mapped to its first fragment, and the final line break maps no line
+	check_map(emitter.source_map, [NO_SOURCE, NO_SOURCE, 0, 1, 1, 3])
+	assert emitter.length == len(stream.getvalue())
+	assert stream.getvalue().count("\n") == len(emitter.source_map)
+
+	# A text written with its own map keeps the source lines of that map
+	text_map = SourceMap()
+	text_map.append(5, 2)
+	emitter.write_mapped("a\nb\nc\n", text_map)
+	check_map(emitter.source_map, [NO_SOURCE, NO_SOURCE, 0, 1, 1, 3, 5, 5, NO_SOURCE])
+
+
+def test_tee_emitter():
+	stream = io.StringIO()
+	file_emitter, copy_emitter = Emitter(stream, SourceMap()), Emitter(None, SourceMap())
+	tee_emitter = TeeEmitter(file_emitter, copy_emitter)
+	tee_emitter.write("a\n", 0)
+	tee_emitter.write_joined("\n", ["b", "c"], [1, 2])
+	tee_emitter.write_mapped("\nd\n", None)
+	assert stream.getvalue() == copy_emitter.getvalue() == "a\nb\nc\nd\n"
+	assert file_emitter.source_map.encode() == copy_emitter.source_map.encode()
+	assert tee_emitter.length == len(stream.getvalue())
+
+
+def test_nearest_compiled_line():
+	source_map = SourceMap()
+	source_map.append(NO_SOURCE, 2)
+	source_map.append(1)
+	source_map.append(2)
+	source_map.append(2)
+	source_map.append(NO_SOURCE)
+	source_map.append(5, 2)
+	assert [source_map.nearest_compiled_line(source_line) for source_line in range(8)] == [None, 2, 3, 4, 4, 6, 7, 7]
+
+	# The runs of a map can overlap, e.g. when a line is compiled again after the lines following it
+	for runs, source_line, expected_line in (
+		(((9, 7, 1), (11, 7, 0)), 8, 10),
+		(((3, 1, 1), (5, 2, 0), (10, 1, 0)), 2, 4),
+		(((0, 5, 0), (2, 1, 1), (4, 9, 0)), 4, 3),
+		(((0, 3, 1), (3, 2, 0)), 7, 2),
+	):
+		encoded_map = ";".join(",".join(map(str, run)) for run in runs) + f";{runs[-1][0] + 2}"
+		assert SourceMap.decode(encoded_map).nearest_compiled_line(source_line) == expected_line
+
+	random_generator = random.Random(0)
+	for _ in range(50):
+		source_lines = random_source_lines(random_generator, random_generator.randint(0, 100))
+		source_map = SourceMap()
+		for source_line in source_lines:
+			source_map.append(source_line)
+		for source_line in range(-1, 202):
+			# The first line of the source line, or the last line of the closest source line before it
+			previous_lines = [other_line for other_line in source_lines if 0 <= other_line <= source_line]
+			if not previous_lines:
+				expected_line = None
+			elif max(previous_lines) == source_line:
+				expected_line = source_lines.index(source_line)
+			else:
+				expected_line = len(source_lines) - 1 - source_lines[::-1].index(max(previous_lines))
+			assert source_map.nearest_compiled_line(source_line) == expected_line
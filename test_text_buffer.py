@@ -0,0 +1,98 @@
+"""
+Tests of the TextBuffer, checked against the same edits made on a plain string.
+"""
+import random
+
+import pytest
+
+from text_buffer import TextBuffer
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+	"""
+	Makes the chunks tiny, so that the edits cross, split and merge chunks all the time.
+	"""
+	monkeypatch.setattr(TextBuffer, "CHUNK_SIZE", 4)
+
+
+def check_buffer(buffer: TextBuffer, text: str):
+	"""
+	Checks that every way of reading the buffer agrees with the expected text.
+	"""
+	lines = text.split("\n")
+	assert len(buffer) == len(text)
+	assert buffer.text == text
+	assert buffer.line_count == len(lines)
+	assert buffer.lines(0, len(lines)) == lines
+	for row, line in enumerate(lines):
+		assert buffer.get_line(row) == line
+		assert buffer.line_start(row) == sum(len(previous_line) + 1 for previous_line in lines[:row])
+		assert buffer.line_end(row) == buffer.line_start(row) + len(line)
+	for index in range(len(text) + 1):
+		row = text.count("\n", 0, index)
+		assert buffer.position_of(index) == (row, index - text.rfind("\n", 0, index) - 1)
+		assert buffer.char_at(index) == text[index:index + 1]
+
+
+def test_empty_buffer():
+	buffer = TextBuffer()
+	check_buffer(buffer, "")
+	assert buffer.get_line(3) == ""
+	assert buffer.lines(2, 5) == []
+
+
+def test_random_edits(small_chunks):
+	random_generator = random.Random(0)
+	text = "fx int f\n\tint a\nend\n"
+	buffer = TextBuffer(text)
+	for _ in range(500):
+		if random_generator.random() < 0.6:
+			index = random_generator.randint(0, len(text))
+			added_text = "".join(random_generator.choice("ab \n") for _ in range(random_generator.randint(1, 12)))
+			buffer.insert(index, added_text)
+			text = text[:index] + added_text + text[index:]
+		else:
+			start = random_generator.randint(0, len(text))
+			end = random_generator.randint(start, min(len(text), start + 15))
+			assert buffer.delete(start, end) == text[start:end]
+			text = text[:start] + text[end:]
+
+		# Reading without materialising the text first, then through every accessor
+		start = random_generator.randint(0, len(text))
+		assert buffer.slice(start, start + 10) == text[start:start + 10]
+		check_buffer(buffer, text)
+
+
+def test_indexes_are_clamped(small_chunks):
+	buffer = TextBuffer("abc\ndef")
+	buffer.insert(-5, ">")
+	buffer.insert(100, "<")
+	assert buffer.text == ">abc\ndef<"
+	assert buffer.delete(-3, 2) == ">a"
+	assert buffer.delete(4, 100) == "ef<"
+	assert buffer.slice(-1, 100) == "bc\nd"
+	assert buffer.char_at(-1) == buffer.char_at(4) == ""
+
+
+def test_version_counts_edits():
+	buffer = TextBuffer("abc")
+	version = buffer.version
+	buffer.insert(1, "")
+	buffer.delete(2, 2)
+	assert buffer.version == version
+	buffer.insert(1, "x")
+	buffer.delete(0, 1)
+	buffer.set_text("abc")
+	assert buffer.version == version + 3
+
+
+def test_snapshot(small_chunks):
+	buffer = TextBuffer("fx int f\nend")
+	snapshot = buffer.snapshot()
+	buffer.insert(2, "abc")
+	edited_snapshot = buffer.snapshot()
+	buffer.delete(0, 9)
+	buffer.set_text("x")
+	assert snapshot() == "fx int f\nend"
+	assert edited_snapshot() == "fxabc int f\nend"
@@ -0,0 +1,137 @@
+"""
+Tests of the undo history, and of the merging of consecutive keystrokes.
+"""
+from undo import UNDO_ACTION_OVERHEAD, UNDO_GROUP_DELAY, UndoAction, UndoHistory
+
+
+def typed(index: int, text: str, timestamp: float = 0.) -> UndoAction:
+	"""
+	Returns the action of typing the given text at the given index.
+	"""
+	action = UndoAction("added_char", index, "", text, index, index + len(text))
+	action.timestamp = timestamp
+	return action
+
+
+def removed(index: int, text: str, cursor_before: int, timestamp: float = 0.) -> UndoAction:
+	"""
+	Returns the action of removing the given text at the given index, with backspace or the delete key.
+	"""
+	action = UndoAction("removed_char", index, text, "", cursor_before, index)
+	action.timestamp = timestamp
+	return action
+
+
+def test_typing_is_merged_by_word():
+	action = typed(0, "a")
+	assert action.merge(typed(1, "b", 0.1))
+	assert action.merge(typed(2, " ", 0.2))
+	assert action.merge(typed(3, " ", 0.3))
+	assert (action.added_text, action.cursor_after, action.timestamp) == ("ab  ", 4, 0.3)
+
+	# A new word, a keystroke elsewhere or after the delay starts a new action
+	assert not action.merge(typed(4, "c", 0.4))
+	assert not typed(0, "a").merge(typed(5, "b"))
+	assert not typed(0, "a").merge(typed(1, "b", UNDO_GROUP_DELAY + 0.1))
+	assert action.added_text == "ab  "
+
+
+def test_removals_are_merged():
+	# Backspace grows the action to the left
+	action = removed(5, "c", 6)
+	assert action.merge(removed(4, "b", 5, 0.1))
+	assert action.merge(removed(3, "a", 4, 0.2))
+	assert (action.index, action.removed_text, action.cursor_before, action.cursor_after) == (3, "abc", 6, 3)
+
+	# The delete key grows it to the right
+	action = removed(3, "a", 3)
+	assert action.merge(removed(3, "b", 3, 0.1))
+	assert (action.index, action.removed_text) == (3, "ab")
+
+	# Removals are never merged with typing
+	assert not action.merge(typed(3, "x", 0.2))
+	assert not typed(3, "x").merge(removed(3, "x", 4, 0.1))
+
+
+def test_undo_and_redo():
+	history = UndoHistory()
+	first, second = typed(0, "a"), typed(5, "b")
+	history.append(first)
+	history.append(second)
+	assert list(history) == [first, second]
+	assert history.size == first.size + second.size
+
+	assert history.pop() is second
+	assert history.pop() is first
+	assert len(history) == 0 and history.size == 0
+	assert history.pop_redo() is first
+	assert history.pop_redo() is second
+	assert history.pop_redo() is None
+	assert list(history) == [first, second]
+
+	# A command that changed nothing is not recorded, and the undone actions can still be redone
+	history.pop()
+	history.append(UndoAction("command", 3, "", "", 3, 3))
+	assert list(history) == [first]
+	assert history.pop_redo() is second
+
+	# A new action forgets the undone ones
+	history.pop()
+	history.append(typed(9, "c"))
+	assert history.pop_redo() is None
+
+
+def test_groups():
+	history = UndoHistory()
+	history.append(typed(0, "a"))
+	history.append(typed(1, "b", 0.1))
+	assert len(history) == 1 and history[0].added_text == "ab"
+	assert history.size == UNDO_ACTION_OVERHEAD + 2
+
+	# Closing the group, undoing or running a command stops the merging
+	history.close_group()
+	history.append(typed(2, "c", 0.2))
+	assert len(history) == 2
+	history.append(UndoAction("command", 0, "abc", "", 3, 0))
+	history.append(typed(0, "d", 0.3))
+	assert len(history) == 4
+	history.pop()
+	history.append(typed(0, "d", 0.3))
+	assert len(history) == 4
+
+	# The dicts of older plugins are kept as-is
+	legacy_action = {"action_type": "added_char", "text": "e"}
+	history.append(legacy_action)
+	history.append(typed(1, "e", 0.4))
+	assert history[-2] is legacy_action and len(history) == 6
+
+
+def test_discard_after():
+	history = UndoHistory()
+	first = typed(0, "a")
+	history.append(first)
+	history.close_group()
+	history.append(typed(1, "b"))
+	history.append(typed(9, "c"))
+	history.discard_after(typed(0, "a"))
+	assert len(history) == 3
+	history.discard_after(first)
+	assert list(history) == [first] and history.size == first.size
+	assert history.pop_redo() is None
+	history.discard_after(None)
+	assert len(history) == 0 and history.size == 0
+
+
+def test_trimming():
+	history = UndoHistory(max_bytes=3 * UNDO_ACTION_OVERHEAD)
+	actions = [typed(index * 10, "a") for index in range(5)]
+	for action in actions:
+		history.append(action)
+	assert list(history) == actions[-2:]
+	assert history.size == 2 * (UNDO_ACTION_OVERHEAD + 1)
+
+	# Lowering the limit forgets the oldest actions, but the last one is always kept
+	history.max_bytes = 0
+	assert list(history) == actions[-1:]
+	history.append(typed(100, "b" * 1000))
+	assert len(history) == 1 and history.size == UNDO_ACTION_OVERHEAD + 1000
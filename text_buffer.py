@@ -0,0 +1,336 @@
+"""
+Contains the TextBuffer class, the data structure holding the text of the editor.
+The text is stored as a rope of bounded-size chunks, so that inserting or deleting text only rebuilds the chunk
+being edited instead of the whole document.
+The amount of line breaks in each chunk is indexed as well, so that going from an index to a (row, column)
+position and back only takes a binary search.
+"""
+from functools import partial
+from typing import Callable, List, Optional
+
+
+class _FenwickTree:
+	"""
+	A binary indexed tree, used to keep the prefix sums of the chunks' sizes up to date in O(log n).
+	"""
+	def __init__(self, values: List[int]):
+		"""
+		Builds the tree from the given values in O(n).
+		:param values: The values of each element of the tree.
+		"""
+		self._size = len(values)
+		self._tree = [0] + list(values)
+		for i in range(1, self._size + 1):
+			parent = i + (i & -i)
+			if parent <= self._size:
+				self._tree[parent] += self._tree[i]
+
+		# Highest power of two lower or equal to the size, used to walk down the tree
+		self._top_bit = 1 << (self._size.bit_length() - 1) if self._size else 0
+
+
+	def add(self, index: int, delta: int):
+		"""
+		Adds delta to the element at the given index.
+		"""
+		index += 1
+		while index <= self._size:
+			self._tree[index] += delta
+			index += index & -index
+
+
+	def prefix_sum(self, index: int) -> int:
+		"""
+		Returns the sum of the elements before the given index.
+		"""
+		total = 0
+		while index > 0:
+			total += self._tree[index]
+			index -= index & -index
+		return total
+
+
+	def find(self, target: int) -> int:
+		"""
+		Returns the index of the first element such that the sum of the elements up to and including it is
+		strictly greater than target. Returns the amount of elements if there is no such element.
+		"""
+		index = 0
+		bit = self._top_bit
+		while bit:
+			next_index = index + bit
+			if next_index <= self._size and self._tree[next_index] <= target:
+				index = next_index
+				target -= self._tree[next_index]
+			bit >>= 1
+		return index
+
+
+class TextBuffer:
+	CHUNK_SIZE = 1024  # The size of the chunks the text is split into ; a chunk can grow up to twice this size before being split
+
+	def __init__(self, text: str = ""):
+		"""
+		Creates a new buffer containing the given text.
+		:param text: The initial text of the buffer. Empty by default.
+		"""
+		self._chunks: List[str] = []  # The chunks of text, in order
+		self._lengths: Optional[_FenwickTree] = None  # The prefix sums of the length of each chunk
+		self._newlines: Optional[_FenwickTree] = None  # The prefix sums of the amount of line breaks in each chunk
+		self._length = 0  # The total length of the text
+		self._text_cache: Optional[str] = None  # The materialised text, or None if it has to be rebuilt
+		self.version = 0  # Increased on each edit, to know whether the text changed without materialising it
+		self.set_text(text)
+
+
+	def set_text(self, text: str):
+		"""
+		Replaces the whole contents of the buffer with the given text.
+		:param text: The new text of the buffer.
+		"""
+		self._chunks = [text[i:i + self.CHUNK_SIZE] for i in range(0, len(text), self.CHUNK_SIZE)] or [""]
+		self._length = len(text)
+		self._rebuild_index()
+		self._text_cache = text
+		self.version += 1
+
+
+	def __len__(self) -> int:
+		return self._length
+
+
+	def __str__(self) -> str:
+		return self.text
+
+
+	@property
+	def text(self) -> str:
+		"""
+		The whole text of the buffer. It is only materialised when asked for, and cached until the next edit.
+		"""
+		if self._text_cache is None:
+			self._text_cache = "".join(self._chunks)
+		return self._text_cache
+
+
+	def snapshot(self) -> Callable[[], str]:
+		"""
+		Returns a function giving the text as it is now, whatever the edits made afterwards. Only the list of chunks is
+		copied, so that it is cheap to take on each edit ; the text is only materialised when the function is called,
+		which can be done by another thread.
+		"""
+		if self._text_cache is not None:
+			text = self._text_cache
+			return lambda: text
+		return partial("".join, list(self._chunks))
+
+
+	def _rebuild_index(self):
+		"""
+		Rebuilds the index of the chunks. Only called when chunks are added or removed.
+		"""
+		self._lengths = _FenwickTree([len(chunk) for chunk in self._chunks])
+		self._newlines = _FenwickTree([chunk.count("\n") for chunk in self._chunks])
+
+
+	def _locate(self, index: int) -> tuple:
+		"""
+		Finds the chunk containing the given index.
+		:param index: An index in the text, between 0 and the length of the text (included).
+		:return: A tuple (chunk index, index inside of the chunk).
+		"""
+		if index >= self._length:
+			return len(self._chunks) - 1, len(self._chunks[-1])
+		chunk_index = self._lengths.find(index)
+		return chunk_index, index - self._lengths.prefix_sum(chunk_index)
+
+
+	def _clamp(self, index: int) -> int:
+		"""
+		Clamps the index between 0 and the length of the text.
+		"""
+		return max(0, min(index, self._length))
+
+
+	def insert(self, index: int, text: str):
+		"""
+		Inserts the given text at the given index.
+		:param index: Where to insert the text.
+		:param text: The text to insert.
+		"""
+		if not text:
+			return
+		index = self._clamp(index)
+		chunk_index, local_index = self._locate(index)
+		chunk = self._chunks[chunk_index]
+		new_chunk = chunk[:local_index] + text + chunk[local_index:]
+		self._length += len(text)
+		self._text_cache = None
+		self.version += 1
+
+		# If the chunk is still small enough, we only update its size
+		if len(new_chunk) <= self.CHUNK_SIZE * 2:
+			self._chunks[chunk_index] = new_chunk
+			self._lengths.add(chunk_index, len(text))
+			self._newlines.add(chunk_index, text.count("\n"))
+
+		# Otherwise we split it into several chunks
+		else:
+			self._chunks[chunk_index:chunk_index + 1] = [
+				new_chunk[i:i + self.CHUNK_SIZE] for i in range(0, len(new_chunk), self.CHUNK_SIZE)
+			]
+			self._rebuild_index()
+
+
+	def delete(self, start: int, end: int) -> str:
+		"""
+		Deletes the text between the two given indexes.
+		:param start: The index of the first character to delete.
+		:param end: The index after the last character to delete.
+		:return: The deleted text.
+		"""
+		start, end = self._clamp(start), self._clamp(end)
+		if start >= end:
+			return ""
+		removed = self.slice(start, end)
+		start_chunk, start_local = self._locate(start)
+		end_chunk, end_local = self._locate(end)
+		self._length -= end - start
+		self._text_cache = None
+		self.version += 1
+
+		# If the deletion happens inside a single chunk, we only update its size
+		if start_chunk == end_chunk:
+			chunk = self._chunks[start_chunk]
+			self._chunks[start_chunk] = chunk[:start_local] + chunk[end_local:]
+			if self._chunks[start_chunk] != "" or len(self._chunks) == 1:
+				self._lengths.add(start_chunk, start - end)
+				self._newlines.add(start_chunk, -removed.count("\n"))
+				return removed
+
+		# Otherwise we merge what remains of the first and last chunks
+		else:
+			self._chunks[start_chunk:end_chunk + 1] = [
+				self._chunks[start_chunk][:start_local] + self._chunks[end_chunk][end_local:]
+			]
+
+		# Removes the empty chunks left behind
+		self._chunks = [chunk for chunk in self._chunks if chunk != ""] or [""]
+		self._rebuild_index()
+		return removed
+
+
+	def slice(self, start: int, end: int) -> str:
+		"""
+		Returns the text between the two given indexes.
+		:param start: The index of the first character.
+		:param end: The index after the last character.
+		"""
+		start, end = self._clamp(start), self._clamp(end)
+		if start >= end:
+			return ""
+		if self._text_cache is not None:
+			return self._text_cache[start:end]
+
+		chunk_index, local_index = self._locate(start)
+		parts = []
+		remaining = end - start
+		while remaining > 0:
+			part = self._chunks[chunk_index][local_index:local_index + remaining]
+			parts.append(part)
+			remaining -= len(part)
+			chunk_index += 1
+			local_index = 0
+		return "".join(parts)
+
+
+	def char_at(self, index: int) -> str:
+		"""
+		Returns the character at the given index, or an empty string if the index is outside of the text.
+		"""
+		if not 0 <= index < self._length:
+			return ""
+		return self.slice(index, index + 1)
+
+
+	@property
+	def line_count(self) -> int:
+		"""
+		The amount of lines in the text.
+		"""
+		return self._newlines.prefix_sum(len(self._chunks)) + 1
+
+
+	def position_of(self, index: int) -> tuple:
+		"""
+		Returns the position of the given index in the text.
+		:param index: An index in the text.
+		:return: A tuple (row, column).
+		"""
+		index = self._clamp(index)
+		chunk_index, local_index = self._locate(index)
+		chunk = self._chunks[chunk_index]
+		row = self._newlines.prefix_sum(chunk_index) + chunk.count("\n", 0, local_index)
+
+		# If the line starts inside of this chunk, we find the column right away
+		last_newline = chunk.rfind("\n", 0, local_index)
+		if last_newline != -1:
+			return row, local_index - last_newline - 1
+		return row, index - self.line_start(row)
+
+
+	def line_start(self, row: int) -> int:
+		"""
+		Returns the index of the first character of the given line.
+		If the row is after the last line, returns the length of the text.
+		:param row: The index of the line.
+		"""
+		if row <= 0:
+			return 0
+		if row >= self.line_count:
+			return self._length
+
+		# Finds the chunk containing the line break ending the previous line
+		chunk_index = self._newlines.find(row - 1)
+		newline_number = row - 1 - self._newlines.prefix_sum(chunk_index)
+		chunk = self._chunks[chunk_index]
+
+		# Finds this line break inside of the chunk
+		local_index = chunk.find("\n")
+		for _ in range(newline_number):
+			local_index = chunk.find("\n", local_index + 1)
+		return self._lengths.prefix_sum(chunk_index) + local_index + 1
+
+
+	def line_end(self, row: int) -> int:
+		"""
+		Returns the index of the line break ending the given line, or the length of the text for the last line.
+		:param row: The index of the line.
+		"""
+		if row + 1 >= self.line_count:
+			return self._length
+		return self.line_start(row + 1) - 1
+
+
+	def lines(self, start_row: int, end_row: int) -> List[str]:
+		"""
+		Returns the lines between the two given rows, without their line breaks.
+		Only the requested lines are read from the buffer.
+		:param start_row: The index of the first line.
+		:param end_row: The index after the last line.
+		"""
+		start_row = max(start_row, 0)
+		end_row = min(end_row, self.line_count)
+		if start_row >= end_row:
+			return []
+		return self.slice(self.line_start(start_row), self.line_end(end_row - 1)).split("\n")
+
+
+	def get_line(self, row: int) -> str:
+		"""
+		Returns the line at the given row, without its line break.
+		:param row: The index of the line.
+		"""
+		if not 0 <= row < self.line_count:
+			return ""
+		return self.slice(self.line_start(row), self.line_end(row))
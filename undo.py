@@ -0,0 +1,249 @@
+"""
+Contains the undo history of the editor.
+Each edit is stored as a compact record of the text it replaced, and consecutive keystrokes are merged into a
+single record, so that the history can go back far without keeping a copy of the text for each key pressed.
+"""
+import time
+from collections import deque
+from typing import Optional, Union
+
+UNDO_ACTION_OVERHEAD = 200  # The approximate size in bytes of an undo action, not counting its text
+UNDO_GROUP_DELAY = 1.  # The maximum time between two keystrokes for them to be merged in the same undo action, in seconds
+
+
+class UndoAction:
+	"""
+	An edit of the text : the text between index and index + len(removed_text) was replaced by added_text.
+	"""
+	__slots__ = ("action_type", "index", "removed_text", "added_text", "cursor_before", "cursor_after", "timestamp")
+
+	def __init__(self, action_type: str, index: int, removed_text: str, added_text: str, cursor_before: int, cursor_after: int):
+		"""
+		Creates a new undo action.
+		:param action_type: The kind of edit ; 'added_char', 'removed_char' or 'command'.
+		:param index: The index of the beginning of the edit.
+		:param removed_text: The text that was removed by the edit.
+		:param added_text: The text that was added by the edit.
+		:param cursor_before: The position of the cursor before the edit.
+		:param cursor_after: The position of the cursor after the edit.
+		"""
+		self.action_type = action_type
+		self.index = index
+		self.removed_text = removed_text
+		self.added_text = added_text
+		self.cursor_before = cursor_before
+		self.cursor_after = cursor_after
+		self.timestamp = time.monotonic()  # When the last edit of the action was made
+
+
+	@property
+	def size(self) -> int:
+		"""
+		The approximate size of the action in memory, in bytes.
+		"""
+		return UNDO_ACTION_OVERHEAD + len(self.removed_text) + len(self.added_text)
+
+
+	def merge(self, other: "UndoAction") -> bool:
+		"""
+		Merges the given keystroke into this action if it directly follows it, was typed shortly after, and does not
+		start a new word.
+		:param other: The action right after this one.
+		:return: Whether the other action was merged into this one.
+		"""
+		if other.action_type != self.action_type or other.timestamp - self.timestamp > UNDO_GROUP_DELAY:
+			return False
+
+		# Typing right after the previously typed text, unless a new word starts
+		if self.action_type == "added_char" and other.index == self.index + len(self.added_text):
+			if self.added_text[-1:].isspace() and not other.added_text[:1].isspace():
+				return False
+			self.added_text += other.added_text
+
+		# Backspace right before the previously removed text
+		elif self.action_type == "removed_char" and other.index + len(other.removed_text) == self.index:
+			self.index = other.index
+			self.removed_text = other.removed_text + self.removed_text
+
+		# Delete key at the same place as the previously removed text
+		elif self.action_type == "removed_char" and other.index == self.index:
+			self.removed_text += other.removed_text
+
+		else:
+			return False
+
+		self.cursor_after = other.cursor_after
+		self.timestamp = other.timestamp
+		return True
+
+
+class UndoHistory:
+	"""
+	The list of the actions that can be undone, along with the actions that were undone and can be redone.
+	The oldest actions are forgotten when the history uses more memory than allowed.
+	Plugins can still append the dicts used by older versions of the editor ; they are kept as-is, and never merged.
+	"""
+	def __init__(self, max_bytes: int = 1 << 20):
+		"""
+		Creates an empty history.
+		:param max_bytes: The approximate maximum amount of memory used by the history, in bytes.
+		"""
+		self._max_bytes = max_bytes  # The approximate maximum amount of memory used by the history, in bytes
+		self._actions: deque = deque()  # The actions that can be undone, from the oldest to the most recent
+		self._redo_actions: list = []  # The actions that were undone, from the oldest undone to the last undone
+		self._size = 0  # The approximate size of the undo actions, in bytes
+		self._group_closed = True  # If True, the next action will not be merged into the last one
+
+
+	@staticmethod
+	def action_size(action: Union[UndoAction, dict]) -> int:
+		"""
+		Returns the approximate size of an action in memory, in bytes.
+		"""
+		if isinstance(action, UndoAction):
+			return action.size
+		return UNDO_ACTION_OVERHEAD + sum(len(value) for value in action.values() if isinstance(value, str))
+
+
+	def __len__(self) -> int:
+		return len(self._actions)
+
+
+	def __iter__(self):
+		return iter(self._actions)
+
+
+	def __getitem__(self, index: int) -> Union[UndoAction, dict]:
+		return self._actions[index]
+
+
+	@property
+	def maxlen(self) -> None:
+		"""
+		Kept for compatibility with the deque used by older versions of the editor ; the history has no maximum length.
+		"""
+		return None
+
+
+	@property
+	def max_bytes(self) -> int:
+		"""
+		The approximate maximum amount of memory used by the history, in bytes.
+		Lowering it immediately forgets the oldest actions over the new limit.
+		"""
+		return self._max_bytes
+
+
+	@max_bytes.setter
+	def max_bytes(self, value: int):
+		self._max_bytes = value
+		self._trim()
+
+
+	@property
+	def size(self) -> int:
+		"""
+		The approximate size of the undo actions, in bytes.
+		"""
+		return self._size
+
+
+	def append(self, action: Union[UndoAction, dict]):
+		"""
+		Adds a new action to the history, merging it into the last action if they are part of the same group of
+		keystrokes. Clears the actions that could be redone. An action that changed nothing is ignored, so that it can
+		neither be undone nor prevent redoing.
+		:param action: The action that was just made.
+		"""
+		if isinstance(action, UndoAction) and not action.removed_text and not action.added_text:
+			return None
+		self._redo_actions.clear()
+		last_action = self._actions[-1] if self._actions else None
+
+		# Merges the action into the last one if possible
+		if not self._group_closed and isinstance(action, UndoAction) and isinstance(last_action, UndoAction):
+			last_size = last_action.size
+			if last_action.merge(action):
+				self._size += last_action.size - last_size
+				self._trim()
+				return None
+
+		self._actions.append(action)
+		self._size += self.action_size(action)
+		self._group_closed = not isinstance(action, UndoAction) or action.action_type == "command"
+		self._trim()
+
+
+	def pop(self) -> Union[UndoAction, dict]:
+		"""
+		Removes the last action from the history and returns it, so it can be undone. It can then be redone.
+		"""
+		action = self._actions.pop()
+		self._size = max(self._size - self.action_size(action), 0)
+		if isinstance(action, UndoAction):
+			self._redo_actions.append(action)
+		self._group_closed = True
+		return action
+
+
+	def pop_redo(self) -> Optional[UndoAction]:
+		"""
+		Removes the last undone action and puts it back into the history, so it can be redone.
+		:return: The action, or None if there is nothing to redo.
+		"""
+		if not self._redo_actions:
+			return None
+		action = self._redo_actions.pop()
+		self._actions.append(action)
+		self._size += action.size
+		self._group_closed = True
+		self._trim()
+		return action
+
+
+	def popleft(self) -> Union[UndoAction, dict]:
+		"""
+		Removes the oldest action from the history and returns it.
+		"""
+		action = self._actions.popleft()
+		self._size = max(self._size - self.action_size(action), 0)
+		return action
+
+
+	def close_group(self):
+		"""
+		Prevents the next action from being merged into the last one.
+		"""
+		self._group_closed = True
+
+
+	def discard_after(self, action: Optional[Union[UndoAction, dict]]):
+		"""
+		Removes all the actions added after the given one, without making them redoable.
+		:param action: An action of the history, or None to remove all of them. If it is not in the history anymore,
+			nothing is removed.
+		"""
+		if action is None or any(other_action is action for other_action in self._actions):
+			while self._actions and self._actions[-1] is not action:
+				self._size = max(self._size - self.action_size(self._actions.pop()), 0)
+		self._group_closed = True
+
+
+	def clear(self):
+		"""
+		Forgets all the actions, including the ones that could be redone.
+		"""
+		self._actions.clear()
+		self._redo_actions.clear()
+		self._size = 0
+		self._group_closed = True
+
+
+	def _trim(self):
+		"""
+		Forgets the oldest actions until the history uses less memory than allowed.
+		The last action is always kept, even if it is bigger than the limit.
+		The redo actions do not need to be trimmed, as they were within the limit before being undone.
+		"""
+		while self._size > self._max_bytes and len(self._actions) > 1:
+			self.popleft()
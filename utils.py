@@ -207,6 +207,38 @@ def display_menu(
 
 
 
+def find_text_difference(old_text: str, new_text: str) -> Tuple[int, int, int]:
+	"""
+	Finds the part of the text that changed between two versions of it, by skipping their common beginning and end.
+	The comparisons are done on slices, so that it runs in O(n log n) string comparisons done in C.
+	:param old_text: The text before the change.
+	:param new_text: The text after the change.
+	:return: A tuple (start, old_end, new_end) ; old_text[start:old_end] was replaced by new_text[start:new_end].
+	"""
+	max_length = min(len(old_text), len(new_text))
+
+	# Finds the length of the common beginning with a binary search
+	low, high = 0, max_length
+	while low < high:
+		middle = (low + high + 1) // 2
+		if old_text[:middle] == new_text[:middle]:
+			low = middle
+		else:
+			high = middle - 1
+	start = low
+
+	# Finds the length of the common end the same way, without overlapping the common beginning
+	low, high = 0, max_length - start
+	while low < high:
+		middle = (low + high + 1) // 2
+		if old_text[len(old_text) - middle:] == new_text[len(new_text) - middle:]:
+			low = middle
+		else:
+			high = middle - 1
+
+	return start, len(old_text) - low, len(new_text) - low
+
+
 def get_screen_middle_coords(stdscr) -> tuple[int, int]:
 	"""
 	Returns the middle coordinates of the screen.